@@ -9,35 +9,67 @@ import time
 import sys
 import os
 import json
+import re
 import csv
+import codecs
+import hashlib
+import functools
 import signal
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import threading
+import queue
 import shutil
+import socket
 import tempfile
-import subprocess
 from pathlib import Path
-from io import StringIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import StringIO, BytesIO
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # 尝试导入openai库（用于批处理功能）
 try:
-    from openai import OpenAI
+    from openai import OpenAI, DefaultHttpxClient
     HAS_OPENAI = True
 except ImportError:
     HAS_OPENAI = False
 
-# 尝试导入paramiko（优先使用，Windows上最可靠）
-USE_PARAMIKO = False
+# 尝试导入orjson（JSON编解码比标准库json快，用于逐行分析的请求体和响应解析）
 try:
-    import paramiko
-    USE_PARAMIKO = True
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 尝试导入ijson（超大响应时按事件流只提取需要的字段）
+try:
+    import ijson
+    HAS_IJSON = True
 except ImportError:
-    USE_PARAMIKO = False
+    HAS_IJSON = False
+
+# 尝试导入packaging（版本号比较，支持预发布版本如 1.0.0rc1）
+try:
+    from packaging.version import Version, InvalidVersion
+    HAS_PACKAGING = True
+except ImportError:
+    HAS_PACKAGING = False
+
+# 检查是否安装了paramiko（优先使用，Windows上最可靠）
+# 只检查不导入：paramiko（及其依赖的cryptography）导入较慢，在首次建立SSH连接时才导入
+import importlib.util
+USE_PARAMIKO = importlib.util.find_spec("paramiko") is not None
+
+@functools.lru_cache(maxsize=None)
+def load_paramiko():
+    """导入并返回paramiko模块（首次调用时才导入，之后直接返回缓存的模块）"""
+    import paramiko
+    return paramiko
 
 
-# 默认模型列表
-DEFAULT_MODELS = [
+# 默认模型列表（元组，可直接赋给Combobox的values而无需复制）
+DEFAULT_MODELS = (
     "deepseek-r1",
     "deepseek-chat",
     "llama3",
@@ -46,13 +78,27 @@ DEFAULT_MODELS = [
     "qwen2.5",
     "gemma2",
     "phi3"
-]
+)
 
 # 版本信息
 CURRENT_VERSION = "0.1.1"  # 当前版本号
 GITHUB_REPO_OWNER = "WindyJunsa"
 GITHUB_REPO_NAME = "Papers_Research"
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
+# 程序关闭后替换exe的批处理脚本（{current_exe}: 当前程序路径，{update_file}: 已下载的新版本路径）
+UPDATE_BAT_TEMPLATE = (
+    '@echo off\n'
+    'chcp 65001 >nul\n'  # 设置UTF-8编码
+    'timeout /t 2 /nobreak >nul\n'  # 等待2秒确保程序完全关闭
+    'if exist "{current_exe}" (\n'
+    '    del /f /q "{current_exe}"\n'
+    ')\n'
+    'if exist "{update_file}" (\n'
+    '    move /y "{update_file}" "{current_exe}"\n'
+    '    echo 更新完成！\n'
+    ')\n'
+    'del /f /q "%~f0"\n'  # 删除批处理脚本自身
+)
 
 # 获取程序运行目录（支持打包后的exe）
 def get_app_dir():
@@ -90,16 +136,409 @@ USER_DATA_DIR = get_user_data_dir()
 CONFIG_FILE = os.path.join(APP_DIR, "config.json")
 # 模型缓存文件路径（在exe目录）
 MODELS_CACHE_FILE = os.path.join(APP_DIR, "models_cache.json")
+# 最新Release信息及其ETag的缓存（在用户数据目录），用于检查更新时的条件请求
+UPDATE_CACHE_FILE = os.path.join(USER_DATA_DIR, "update_cache.json")
+# ollama安装包的候选路径（程序启动时确定一次）：优先exe资源目录（PyInstaller打包），其次脚本目录
+OLLAMA_TGZ_PATHS = tuple(
+    os.path.join(base_dir, "ollama-linux-amd64.tgz")
+    for base_dir in (getattr(sys, '_MEIPASS', None), os.path.dirname(os.path.abspath(__file__)))
+    if base_dir
+)
 # 锁定状态文件路径（在用户数据目录，隐藏，用户不容易找到）
 LOCK_FILE = os.path.join(USER_DATA_DIR, ".lock")
 # 解锁码（可以修改）
 UNLOCK_CODE = "unlock_hzq"
 
-# 用于线程安全的锁（用于日志输出和结果收集）
-results_lock = threading.Lock()
+# 软件锁定时需要禁用的widget类型（Treeview不能直接禁用，不在此列）
+_DISABLEABLE_WIDGETS = (ttk.Entry, ttk.Combobox, ttk.Button, tk.Entry, tk.Button,
+                        scrolledtext.ScrolledText, tk.Text)
+
+# SSH通道单次读取的字节数（与SSH默认包窗口一致，减少大流量下的recv调用次数）
+SSH_RECV_BUFSIZE = 65536
+
+# SFTP通道窗口和最大包大小（paramiko默认约2MB窗口/32KB包，在高延迟链路上会限制吞吐量）
+SFTP_WINDOW_SIZE = 2 ** 27
+SFTP_MAX_PACKET_SIZE = 2 ** 18
+# SFTP上传时SSH套接字的发送/接收缓冲区大小
+SFTP_SOCKET_BUFSIZE = 32 * 1024 * 1024
+
+# 一次表格处理中不变的API配置（process_table中构建一次并完成类型转换，各行请求按属性读取）
+# provider至thinking_budget只用于在线API模式；payload_prefix/payload_suffix为预先序列化的请求体（见split_payload_template）
+RunConfig = namedtuple('RunConfig', [
+    'api_mode', 'api_url', 'model_name', 'headers',
+    'provider', 'temperature', 'max_tokens', 'top_p', 'enable_thinking', 'thinking_budget',
+    'payload_prefix', 'payload_suffix'
+], defaults=(None,) * 8)
+
+# 分析请求共用的HTTP会话：线程池内所有线程复用TCP/TLS连接，避免每行重新握手
+_global_session = requests.Session()
+
+def mount_analysis_pool(pool_size):
+    """按并发线程数（至少32）重新挂载 _global_session 的连接池"""
+    pool_size = max(pool_size, 32)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+    )
+    _global_session.mount("http://", adapter)
+    _global_session.mount("https://", adapter)
+
+mount_analysis_pool(32)
+
+# prompt模板中的 {列名} 占位符
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]+)\}")
+
+@functools.lru_cache(maxsize=8)
+def compile_prompt_template(prompt_template):
+    """预编译prompt模板，返回用行数据替换 {列名} 占位符的函数 substitute(row_data)
+    
+    模板只在这里扫描一次，拆分为"文本, 列名, 文本, 列名, ..."片段；
+    每行只需按列名取值拼接。行数据中不存在的列名（如prompt中的JSON示例）原样保留。
+    同一模板的编译结果会被缓存，重复运行时直接复用。
+    """
+    parts = _PLACEHOLDER_RE.split(prompt_template)
+    literals = parts[0::2]
+    names = parts[1::2]
+    
+    def substitute(row_data):
+        pieces = [literals[0]]
+        for name, literal in zip(names, literals[1:]):
+            if name in row_data:
+                value = row_data[name]
+                pieces.append(str(value) if value else "")
+            else:
+                pieces.append(f"{{{name}}}")
+            pieces.append(literal)
+        return "".join(pieces)
+    
+    return substitute
+
+# 未安装orjson时使用的JSON编码器（只创建一次；紧凑分隔符、不转义非ASCII字符，与orjson输出一致）
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def json_dumps_bytes(obj):
+    """将对象编码为紧凑的UTF-8 JSON字节串（有orjson时使用orjson，输出格式与之一致）"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return _JSON_ENCODER.encode(obj).encode('utf-8')
+
+def json_loads(data):
+    """解析JSON文本或字节串（有orjson时使用orjson，其解析错误同样是json.JSONDecodeError）"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def read_json_file(path):
+    """读取JSON文件（有orjson时使用orjson）"""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+def encode_json_file(obj, indent=True):
+    """将对象编码为缩进2格的UTF-8 JSON字节串（有orjson时使用orjson；非ASCII字符不转义）
+    
+    indent为False时输出紧凑格式（用于只由程序读取的缓存文件）。
+    """
+    if not indent:
+        return json_dumps_bytes(obj)
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+def write_file_atomic(path, data):
+    """一次写入临时文件并落盘后原子替换目标文件，避免写入中途崩溃留下不完整的文件
+    
+    临时文件名唯一，多个线程同时保存同一文件时互不干扰（最后完成替换的为准）；
+    覆盖已有文件时保留其权限（如用户收紧过权限的配置文件）。
+    """
+    with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path) or '.', prefix='.tmp_',
+                                     suffix='.tmp', delete=False) as f:
+        tmp_file = f.name
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(tmp_file)
+            raise
+    try:
+        try:
+            os.chmod(tmp_file, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+
+def write_json_file(path, obj, indent=True):
+    """将对象以JSON原子写入文件（默认缩进2格），返回写入的字节串"""
+    data = encode_json_file(obj, indent)
+    write_file_atomic(path, data)
+    return data
+
+# 超过该大小的在线API响应在安装了ijson时按事件流解析
+LARGE_RESPONSE_BYTES = 256 * 1024
+
+def extract_chat_completion(raw):
+    """从OpenAI格式的响应体中取出 (choices[0].message.content, usage.total_tokens)
+    
+    响应较大（含logprobs、推理过程等）且安装了ijson时按事件流提取这两个字段，
+    不为其余内容构建Python对象；否则完整解析。
+    """
+    if HAS_IJSON and len(raw) > LARGE_RESPONSE_BYTES:
+        content = None
+        total_tokens = 0
+        for prefix, event, value in ijson.parse(BytesIO(raw)):
+            if prefix == 'choices.item.message.content' and content is None:
+                content = value
+            elif prefix == 'usage.total_tokens':
+                total_tokens = value
+        return (content or "").strip(), total_tokens
+    
+    result_data = json_loads(raw)
+    # 提取token使用量（只使用total_tokens字段）
+    total_tokens = (result_data.get("usage") or {}).get("total_tokens", 0)
+    if result_data.get("choices"):
+        return result_data["choices"][0]["message"]["content"].strip(), total_tokens
+    return "", total_tokens
+
+def build_completion_payload(cfg, prompt):
+    """按API模式和提供商构建一次请求的请求体"""
+    if cfg.api_mode != 'online':
+        return {
+            "model": cfg.model_name,
+            "prompt": prompt,
+            "stream": True
+        }
+    
+    # 根据提供商构建不同的请求体
+    if cfg.provider == "siliconflow":
+        # 硅基流动API格式
+        payload = {
+            "model": cfg.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "stream": False,
+            "max_tokens": cfg.max_tokens,
+            "enable_thinking": cfg.enable_thinking,
+            "thinking_budget": cfg.thinking_budget,
+            "min_p": 0.05,
+            "stop": None,
+            "temperature": cfg.temperature,
+            "top_p": cfg.top_p,
+            "top_k": 50,
+            "frequency_penalty": 0.5,
+            "n": 1,
+            "response_format": {"type": "json_object"}
+        }
+    else:
+        # 通用格式（custom或siliconflow）
+        payload = {
+            "model": cfg.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": cfg.temperature,
+            "max_tokens": cfg.max_tokens,
+            "top_p": cfg.top_p
+        }
+        if cfg.enable_thinking and cfg.thinking_budget:
+            payload["thinking_budget"] = cfg.thinking_budget
+    
+    return payload
+
+# 请求体模板中prompt位置的占位字符串
+_PROMPT_SENTINEL = "__PROMPT__"
+
+def split_payload_template(cfg):
+    """预先序列化请求体中不变的部分，返回prompt前后的两段字节串
+    
+    每行只需序列化prompt字符串本身（json_dumps_bytes会正确转义），再与这两段拼接。
+    """
+    template = json_dumps_bytes(build_completion_payload(cfg, _PROMPT_SENTINEL))
+    prefix, _, suffix = template.partition(json_dumps_bytes(_PROMPT_SENTINEL))
+    return prefix, suffix
+
+# 批处理API（文件上传/下载等）的超时时间（秒），与openai库的默认值一致
+BATCH_API_TIMEOUT = 600.0
+
+# 批处理jsonl行数达到该值时使用多进程生成。
+# 实测每行（约2KB prompt）编码约12µs（orjson约4µs），而Windows下每个子进程启动时要重新导入整个GUI模块
+# （tkinter/pandas/paramiko等，约1~2秒），加上行数据和结果在进程间的传输，行数较少时多进程反而更慢
+BATCH_JSONL_PROCESS_THRESHOLD = 200000
+
+def encode_batch_jsonl_rows(rows, prompt_template, base_body, start_idx=1):
+    """将一组行编码为批处理jsonl字节串（bytearray，custom_id从 request-{start_idx} 开始编号）
+    
+    定义在模块级以便在子进程中执行（ProcessPoolExecutor）。
+    """
+    substitute = compile_prompt_template(prompt_template)
+    system_message = {"role": "system", "content": "You are a highly advanced and versatile AI assistant"}
+    buffer = bytearray()
+    for idx, row in enumerate(rows, start_idx):
+        # 替换Prompt中的占位符，构建请求体
+        body = {
+            **base_body,
+            "messages": [system_message, {"role": "user", "content": substitute(row)}]
+        }
+        
+        # 构建jsonl行
+        jsonl_entry = {
+            "custom_id": f"request-{idx}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body
+        }
+        
+        buffer += json_dumps_bytes(jsonl_entry)
+        buffer += b"\n"
+    return buffer
+
+# 用于从文本指定位置解析一个JSON值（raw_decode）
+_JSON_DECODER = json.JSONDecoder()
+
+# JSON字符串字面量（包括末尾未闭合的字符串）
+_JSON_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\\?\Z)', re.DOTALL)
+# 字符串内的转义序列：有效转义（\n \r \t \" \\ \/ \uXXXX）整体匹配，其余单独的反斜杠需要补转义
+_JSON_ESCAPE_RE = re.compile(r'\\(?:u[0-9a-fA-F]{4}|[nrt"\\/])|\\')
+
+def _escape_invalid_backslash(match):
+    escape = match.group()
+    return escape if len(escape) > 1 else '\\\\'
+
+def fix_json_backslashes(text):
+    """修复JSON字符串内未转义的反斜杠（字符串外的内容原样保留，由正则引擎完成扫描）"""
+    return _JSON_STRING_RE.sub(lambda m: _JSON_ESCAPE_RE.sub(_escape_invalid_backslash, m.group()), text)
+
+def iter_excel_rows(table_path, skip_rows=0):
+    """以openpyxl只读模式逐行读取Excel活动工作表，逐行生成 {列名: 值} 字典
+    
+    与 pd.read_excel(table_path, skiprows=skip_rows) 的行为保持一致：跳过前 skip_rows 行，
+    下一行作为列名（空列名记为 "Unnamed: 列序号"），全空的行被忽略。
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(table_path, read_only=True, data_only=True)
+    try:
+        rows_iter = wb.active.iter_rows(values_only=True)
+        for _ in range(skip_rows):
+            next(rows_iter, None)
+        header = next(rows_iter, None)
+        if header is None:
+            return
+        columns = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        for values in rows_iter:
+            if any(value is not None for value in values):
+                yield dict(zip(columns, values))
+    finally:
+        wb.close()
+
+def _excel_cell_value(value):
+    """转换为可写入Excel单元格的值（列表、字典等写为字符串）"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def write_excel_rows(output_file, fieldnames, rows):
+    """以openpyxl只写模式流式写入xlsx：第一行为列名，之后每个值列表（按fieldnames顺序）写为一行"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(fieldnames))
+    for values in rows:
+        ws.append([_excel_cell_value(value) for value in values])
+    wb.save(output_file)
+
+# 双重花括号包裹的JSON（如 {{ "title": "..." }}，两层花括号之间允许空白）
+_DOUBLE_BRACE_RE = re.compile(r'\{\s*\{.*\}\s*\}', re.DOTALL)
+
+def _unwrap_double_braces(json_str):
+    """处理双重花括号的情况（如 {{ "title": "..." }}），返回内层JSON文本"""
+    # 找到第二个 {（内层JSON的开始位置）
+    second_brace = json_str.find('{', json_str.find('{') + 1)
+    if second_brace == -1:
+        # 如果找不到第二个 {，直接去掉最外层的一对花括号
+        return json_str[1:-1].strip()
+    # 从第二个 { 开始用 raw_decode 解析内层JSON，由C实现的扫描器找到匹配的 }
+    try:
+        _, inner_end = _JSON_DECODER.raw_decode(json_str, second_brace)
+        return json_str[second_brace:inner_end]
+    except ValueError:
+        pass
+    # 内层JSON无法直接解析（如含未转义的反斜杠），尝试找到倒数第二个 }
+    last_brace = json_str.rfind('}')
+    second_last_brace = json_str.rfind('}', 0, last_brace)
+    if second_last_brace != -1 and second_last_brace > second_brace:
+        return json_str[second_brace:second_last_brace+1]
+    # 最后的方法：去掉最外层的一对花括号
+    return json_str[1:-1].strip()
+
+def _is_double_braced(json_str):
+    return _DOUBLE_BRACE_RE.fullmatch(json_str) is not None
+
+def repair_model_json(result_text):
+    """修复并解析模型返回的非法JSON，按代价从低到高尝试，任一步成功即返回
+    
+    1. 截取第一个 { 到最后一个 } 之间的内容（去掉前后的说明文字）
+    2. 从第一个 { 开始 raw_decode（忽略JSON对象之后多余的内容）
+    3. 双重花括号 {{...}} 时取内层对象
+    4. 修复字符串内未转义的反斜杠后再解析
+    全部失败时抛出最后一步的解析异常。
+    """
+    # 提取JSON对象（找到第一个{到最后一个}，从两端各扫描一次，线性时间）
+    start_idx = result_text.find('{')
+    end_idx = result_text.rfind('}')
+    if start_idx != -1 and end_idx > start_idx:
+        json_str = result_text[start_idx:end_idx+1]
+        try:
+            return json_loads(json_str)
+        except ValueError:
+            pass
+        try:
+            return _JSON_DECODER.raw_decode(result_text, start_idx)[0]
+        except ValueError:
+            pass
+        
+        json_str = json_str.strip()
+        if _is_double_braced(json_str):
+            json_str = _unwrap_double_braces(json_str)
+            try:
+                return json_loads(json_str)
+            except ValueError:
+                pass
+    else:
+        json_str = result_text
+    
+    # 修复未转义的反斜杠
+    fixed_json = fix_json_backslashes(json_str).strip()
+    # 修复后仍是双重花括号时再处理一次
+    if _is_double_braced(fixed_json):
+        fixed_json = _unwrap_double_braces(fixed_json)
+    return json_loads(fixed_json)
+
+def strip_code_fence(text):
+    """去掉模型响应中包裹JSON的 ```json ... ``` 代码块标记"""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text
+
+# 日志级别：低于 LOG_LEVEL 的日志不输出（未知级别按INFO处理）
+LOG_LEVELS = {"INFO": 20, "SUCCESS": 25, "WARN": 30, "ERROR": 40}
+LOG_LEVEL = "INFO"
 
-# 全局配置（用于线程安全的配置访问）
-_global_client_config = {}
+def log_enabled(level):
+    """指定级别的日志是否需要输出"""
+    return LOG_LEVELS.get(level, 20) >= LOG_LEVELS[LOG_LEVEL]
+
+# 日志中需要移除的控制字符（保留换行符和制表符）
+_LOG_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f]')
 
 # 全局变量：ollama 命令的完整路径（如果找到）
 _ollama_path = None
@@ -112,14 +551,220 @@ def get_ollama_cmd():
     # 如果没有设置，返回None，让调用者处理错误
     return None
 
+@functools.lru_cache(maxsize=32)
 def get_full_model_name(base_name, size=""):
     """获取完整的模型名称（如果指定了大小，则使用 model_name:size 格式）"""
     if size:
         return f"{base_name}:{size}"
     return base_name
 
+@functools.lru_cache(maxsize=8)
+def parse_base_url(api_url):
+    """从chat/completions接口地址中提取OpenAI客户端使用的base_url（按地址缓存）"""
+    if "/v1/chat/completions" in api_url:
+        return api_url.replace("/v1/chat/completions", "")
+    return api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
+
+
+def iter_ollama_model_names(output):
+    """逐行提取 ollama list / ollama ps 输出中的模型名称（第一列，跳过表头）"""
+    # 输出格式：
+    # NAME              ID      SIZE    MODIFIED
+    # model_name        abc123  4.5GB   2 hours ago
+    for line in output.strip().splitlines()[1:]:
+        line = line.lstrip()
+        end = len(line)
+        for sep in (' ', '\t'):
+            pos = line.find(sep)
+            if 0 <= pos < end:
+                end = pos
+        if end:
+            yield line[:end]
+
+def ollama_list_has_model(output, model_name):
+    """检查 ollama list 输出中是否包含指定模型（精确匹配或带标签，如 model:latest）"""
+    tagged_prefix = model_name + ":"
+    return any(listed == model_name or listed.startswith(tagged_prefix)
+               for listed in iter_ollama_model_names(output))
+
+
+# 命令输出中"找不到命令"的提示（"not found" 已覆盖 "command not found"）
+_NOT_FOUND_RE = re.compile(r'not found', re.IGNORECASE)
+
+def is_command_not_found(output):
+    """检查SSH命令输出是否表示命令不存在（不区分大小写，无需复制整段输出做lower）"""
+    return _NOT_FOUND_RE.search(output) is not None
+
+def ollama_run_pids_cmd(cmd_name, model_name=""):
+    """构造查找 ollama run 进程PID的shell命令
+    
+    pgrep -x 按进程名精确匹配（比 pgrep -f 扫描所有进程的完整命令行快），
+    再用 ps 检查参数，只保留 run 模式的进程
+    """
+    pattern = f" run {model_name}" if model_name else " run "
+    return (f"for pid in $(pgrep -x {cmd_name}); do "
+            f"ps -o args= -p $pid | grep -qF '{pattern}' && echo $pid; done")
+
+def parse_pid_lines(output):
+    """从SSH命令输出中提取PID列表（只保留纯数字行）
+    
+    run_ssh_command 返回的是stdout和stderr拼接的结果，
+    pgrep/ps的报错等其他输出不能被当作"有进程在运行"。
+    """
+    return [line for line in (raw.strip() for raw in output.splitlines()) if line.isdigit()]
+
+def parse_tags_model_names(response):
+    """从 Ollama /api/tags 响应中提取模型名称列表（解析失败返回None）"""
+    try:
+        return [m.get('name', '') for m in response.json().get('models', [])]
+    except (ValueError, AttributeError):
+        return None
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+def file_sha256(path, limit=None):
+    """计算本地文件（或其前limit字节）的SHA-256"""
+    sha = hashlib.sha256()
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            sha.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return sha.hexdigest()
+
+def cached_file_sha256(path):
+    """获取文件的SHA-256，结果缓存在 <path>.sha256 旁路文件中（旁路文件不比原文件旧时直接读取）"""
+    sidecar_path = path + ".sha256"
+    try:
+        if os.stat(sidecar_path).st_mtime >= os.stat(path).st_mtime:
+            with open(sidecar_path, 'r', encoding='utf-8') as f:
+                digest = f.read(64)
+            if len(digest) == 64:
+                return digest
+    except OSError:
+        pass
+    
+    digest = file_sha256(path)
+    try:
+        with open(sidecar_path, 'w', encoding='utf-8') as f:
+            f.write(digest)
+    except OSError:
+        pass  # 目录不可写（如exe资源临时目录）时不缓存
+    return digest
+
+
+class _UploadProgress:
+    """SFTP上传进度回调：按字节阈值节流，界面更新通过after交给Tk主线程执行"""
+    __slots__ = ('app', 'sftp', 'pvar', 'plabel', 'finished', '_last')
+    
+    UPDATE_BYTES = 1024 * 1024  # 每传输1MB更新一次界面
+    
+    def __init__(self, app, sftp, pvar, plabel):
+        self.app = app
+        self.sftp = sftp
+        self.pvar = pvar
+        self.plabel = plabel
+        self.finished = False
+        self._last = 0
+    
+    def cb(self, transferred, total):
+        # 每传输1MB（或传输完成时）才更新一次进度
+        if transferred - self._last < self.UPDATE_BYTES and transferred != total:
+            return
+        self._last = transferred
+        self.app.root.after(0, self._update_ui, transferred, total)
+    
+    def watch_cancel(self):
+        """在Tk主线程中轮询中断标志，中断时关闭SFTP连接使上传中止"""
+        if self.finished:
+            return
+        if not self.app.is_downloading:
+            try:
+                self.sftp.close()
+            except:
+                pass
+            return
+        self.app.root.after(200, self.watch_cancel)
+    
+    def _update_ui(self, transferred, total):
+        percent = (transferred / total) * 100
+        try:
+            self.pvar.set(percent)
+            self.plabel.config(
+                text=f"{percent:.1f}% ({transferred / 1024 / 1024:.2f} MB / {total / 1024 / 1024:.2f} MB)"
+            )
+        except tk.TclError:
+            pass  # 进度窗口已关闭
+
 
 class ResearchGUI:
+    # 配置文件中各分组的字段与对应Tk变量属性名 {分组: {字段: 变量属性名}}
+    # （api_mode、prompt、crawler.selected_categories 以及加载后的界面刷新在 save_config/load_config 中单独处理）
+    _CONFIG_SCHEMA = {
+        "ssh": {
+            "username": "username_var",
+            "host": "host_var",
+            "ssh_port": "ssh_port_var",
+            "password": "password_var"
+        },
+        "ollama": {
+            "local_port": "local_port_var",
+            "remote_port": "remote_port_var",
+            "model": "model_var",
+            "model_size": "model_size_var",
+            "ollama_path": "ollama_path_var",
+            "ollama_custom_dir": "ollama_custom_dir_var",
+            "gpu": "gpu_var"
+        },
+        "online_api": {
+            "api_key": "online_api_key_var",
+            "api_url": "online_api_url_var",
+            "model": "online_model_var",
+            "provider": "online_api_provider_var",
+            "temperature": "online_api_temperature_var",
+            "max_tokens": "online_api_max_tokens_var",
+            "top_p": "online_api_top_p_var",
+            "enable_thinking": "online_api_enable_thinking_var",
+            "thinking_budget": "online_api_thinking_budget_var"
+        },
+        "table": {
+            "table_file": "table_var",
+            "output_file": "output_file_var",
+            "output_columns": "output_columns_var",
+            "max_workers": "max_workers_var",
+            "api_delay": "api_delay_var",
+            "rows_per_request": "rows_per_request_var"
+        },
+        "batch_processing": {
+            "enabled": "batch_processing_var",
+            "model": "batch_model_var",
+            "output_dir": "batch_output_dir_var",
+            "task_id": "batch_task_id_var",
+            "temperature": "batch_temperature_var",
+            "max_tokens": "batch_max_tokens_var",
+            "top_p": "batch_top_p_var",
+            "enable_thinking": "batch_enable_thinking_var",
+            "thinking_budget": "batch_thinking_budget_var"
+        },
+        "crawler": {
+            "source": "crawler_source_var",
+            "start_date": "crawler_start_date_var",
+            "end_date": "crawler_end_date_var",
+            "output_file": "crawler_output_file_var"
+        },
+        "monitor": {
+            "enabled": "monitor_enabled_var",
+            "rpm_limit": "rpm_limit_var",
+            "tpm_limit": "tpm_limit_var",
+            "total_tokens_limit": "total_tokens_limit_var"
+        }
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title(f"论文调研工具 v{CURRENT_VERSION}")
@@ -151,16 +796,30 @@ class ResearchGUI:
         style.configure("Treeview", anchor="center")
         style.configure("Treeview.Heading", anchor="center")
         
-        # 运行状态
+        # 运行状态（is_running 由 _stop_event 表示：事件置位即为已停止，等待中的工作线程会被立即唤醒）
+        self._stop_event = threading.Event()
         self.is_running = False
         self.ssh_client = None  # paramiko SSH客户端
         self.ssh_tunnel_thread = None  # SSH隧道线程
+        self._tunnel_verified_at = None  # 最近一次确认隧道可用的时间（time.monotonic）
+        self._tunnel_verified_port = None  # 最近一次确认可用的隧道本地端口
+        self._ollama_path_cache = {}  # 已检测到的ollama路径缓存 {(host, username, custom_dir): path}
         self.crawler_is_running = False  # 爬虫运行状态
         self.is_downloading = False  # 下载/上传状态标志
         self._saved_category_selection = None  # 临时保存的分类选择（用于配置加载）
+        self._last_config_hash = None  # 最近一次加载/保存的配置文件内容哈希（内容未变化时跳过保存）
         self.is_locked = False  # 软件锁定状态
         self.ip_warning_count = 0  # 全局警告计数（不区分IP）
         self.pending_update_file = None  # 待更新的文件路径（用于自动替换）
+        self._bg_executor = ThreadPoolExecutor(max_workers=2)  # 后台I/O任务线程池（如模型下载输出读取）
+        # 访问Ollama（经SSH隧道）的HTTP会话：复用连接，连接失败或网关错误时自动退避重试
+        self._ollama_session = requests.Session()
+        ollama_adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=2,
+            max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self._ollama_session.mount("http://", ollama_adapter)
         
         # IP白名单
         self.allowed_ips = ["222.195.78.54", "211.86.155.236", "211.86.152.184","10.8.0.2"]
@@ -183,6 +842,8 @@ class ResearchGUI:
         
         # 初始化模型缓存（必须在创建界面之前初始化）
         self.ollama_models_cache = {}
+        self._sorted_model_names = None  # 排序后的模型名称元组（模型缓存变化时清空）
+        self._sorted_sizes_per_model = {}  # {模型名: 排序后的大小元组}
         
         # 初始化模式选择和在线API配置变量（必须在创建界面之前初始化）
         # 先尝试从config读取，如果没有则使用默认值
@@ -208,6 +869,14 @@ class ResearchGUI:
         self.batch_output_dir_var = tk.StringVar(value="")  # 批处理结果保存目录
         self.batch_task_id_var = tk.StringVar(value="")  # 当前批处理任务ID
         self.batch_status_var = tk.StringVar(value="未开始")  # 批处理任务状态
+        # 批处理使用的OpenAI客户端缓存 {(api_key, base_url): client}，复用连接池；API Key或地址变化时清空
+        self._openai_client_cache = {}
+        # 因API Key或地址变化而移出缓存的客户端：可能仍在后台线程中使用，退出程序时再统一关闭
+        self._retired_openai_clients = []
+        self.online_api_key_var.trace_add("write", lambda *args: self._retire_openai_clients())
+        self.online_api_url_var.trace_add("write", lambda *args: self._retire_openai_clients())
+        # Prompt文本缓存，在<<Modified>>事件中刷新，避免每次读取都从Text控件复制整段文本
+        self._prompt_cache = None
         
         # 批处理支持的模型列表
         self.batch_supported_models = [
@@ -231,14 +900,23 @@ class ResearchGUI:
         self.total_tokens_limit_var = tk.StringVar(value="1000000")  # 总token数上限
         
         # 监控数据存储
-        self.request_times = []  # 请求时间戳列表（用于计算RPM）
-        self.token_counts = []  # 每分钟的token数列表（用于计算TPM）
+        self.request_times = deque()  # 最近1分钟的请求时间戳（用于计算RPM，工作线程append，界面线程淘汰过期项）
+        self.token_counts = deque()  # 最近1分钟的(时间戳, token数)（用于计算TPM）
         self.total_tokens_count = 0  # 总token数
+        self.expired_request_count = 0  # 已移出滑动窗口的请求数
+        self.expired_token_count = 0  # 已移出滑动窗口的token数
         self.monitor_start_time = None  # 监控开始时间（用于计算实际运行时间）
         self.monitor_update_interval = 1000  # 监控更新间隔（毫秒）
+        self._run_config = None  # 当前表格处理的API配置（RunConfig）
+        self.result_log_queue = queue.Queue()  # 表格处理的逐行结果日志（工作线程放入，Tk主线程批量输出）
+        self._log_q = deque()  # 后台线程调用log()产生的已格式化日志行（Tk主线程每100ms合并输出）
+        self._current_executor = None  # 当前表格处理使用的线程池
+        self._executor_closed = True  # 当前线程池是否已关闭
+        self._progress_q = queue.Queue(maxsize=32)  # 表格处理的进度采样 (已完成数, 总行数, 已用时)，由Tk主线程只输出最新一条
         
         # 创建界面
         self.create_widgets()
+        self.root.after(100, self._poll_logs)
         
         # 如果之前隐藏了主窗口，现在显示它
         if not self.root.winfo_viewable():
@@ -462,6 +1140,13 @@ class ResearchGUI:
         self.delay_entry.grid(row=0, column=4, sticky=(tk.W, tk.E), padx=5, pady=5)
         ttk.Label(concurrency_frame, text="(延迟)", font=(self.chinese_font, 8), foreground="gray").grid(row=0, column=5, sticky=tk.W, padx=5, pady=5)
         
+        # 每次请求合并的行数（第二行）
+        ttk.Label(concurrency_frame, text="每请求行数:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.rows_per_request_var = tk.StringVar(value="1")
+        self.rows_per_request_entry = ttk.Entry(concurrency_frame, textvariable=self.rows_per_request_var, width=15)
+        self.rows_per_request_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        ttk.Label(concurrency_frame, text="(多行合并为一次请求，1表示逐行)", font=(self.chinese_font, 8), foreground="gray").grid(row=1, column=2, columnspan=4, sticky=tk.W, padx=5, pady=5)
+        
         # 批处理配置区域
         batch_frame = ttk.LabelFrame(parent, text="批处理配置", padding="10")
         batch_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10, padx=5)
@@ -733,6 +1418,8 @@ class ResearchGUI:
 
 请只返回JSON格式的响应，不要添加其他解释。"""
         self.prompt_text.insert(1.0, default_prompt)
+        self.prompt_text.bind("<<Modified>>", self._on_prompt_modified)
+        self._on_prompt_modified()
         self.prompt_text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 5))
         
         # 列名标签区域
@@ -1609,15 +2296,14 @@ class ResearchGUI:
         if not current_text:
             # 如果输入为空，显示所有模型
             if hasattr(self, 'ollama_models_cache') and self.ollama_models_cache:
-                model_list = sorted(self.ollama_models_cache.keys())
-                self.model_combo['values'] = model_list
+                self.model_combo['values'] = self.sorted_model_names()
             else:
                 self.model_combo['values'] = DEFAULT_MODELS
             return
         
         # 获取所有可用模型
         if hasattr(self, 'ollama_models_cache') and self.ollama_models_cache:
-            all_models = sorted(self.ollama_models_cache.keys())
+            all_models = self.sorted_model_names()
         else:
             all_models = DEFAULT_MODELS
         
@@ -1706,8 +2392,7 @@ class ResearchGUI:
         """保存在线模型缓存到文件"""
         try:
             cache_file = os.path.join(APP_DIR, "online_models_cache.json")
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.online_models_cache, f, ensure_ascii=False, indent=2)
+            write_json_file(cache_file, self.online_models_cache, indent=False)
         except Exception as e:
             pass  # 静默失败
     
@@ -1715,14 +2400,14 @@ class ResearchGUI:
         """从文件加载在线模型缓存"""
         try:
             cache_file = os.path.join(APP_DIR, "online_models_cache.json")
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    self.online_models_cache = json.load(f)
-                    total_models = sum(len(models) for models in self.online_models_cache.values())
-                    if hasattr(self, 'log'):
-                        self.log(f"已加载在线模型缓存（{len(self.online_models_cache)} 个提供商，共 {total_models} 个模型）", "INFO")
-            else:
+            try:
+                self.online_models_cache = read_json_file(cache_file)
+            except FileNotFoundError:
                 self.online_models_cache = {}
+                return
+            total_models = sum(len(models) for models in self.online_models_cache.values())
+            if hasattr(self, 'log'):
+                self.log(f"已加载在线模型缓存（{len(self.online_models_cache)} 个提供商，共 {total_models} 个模型）", "INFO")
         except Exception as e:
             self.online_models_cache = {}
             if hasattr(self, 'log'):
@@ -2108,7 +2793,7 @@ class ResearchGUI:
             log_message = f"[{timestamp}] [{level}] {message}\n"
             self.model_mgmt_output.insert(tk.END, log_message)
             self.model_mgmt_output.see(tk.END)
-            self.model_mgmt_output.update()
+            self.model_mgmt_output.update_idletasks()
         except Exception as e:
             # 如果日志输出本身出错，至少尝试输出基本信息
             try:
@@ -2422,6 +3107,20 @@ class ResearchGUI:
         )
         todo_label.pack(pady=10, padx=10)
     
+    def _on_prompt_modified(self, event=None):
+        """Prompt内容变化时刷新缓存"""
+        # 重置修改标志本身也会触发<<Modified>>，此时标志为False，直接忽略
+        if event is not None and not self.prompt_text.edit_modified():
+            return
+        self._prompt_cache = self.prompt_text.get(1.0, tk.END).strip()
+        self.prompt_text.edit_modified(False)
+    
+    def get_prompt_template(self):
+        """获取Prompt模板（优先使用缓存，可在工作线程中调用）"""
+        if self._prompt_cache is None:
+            self._prompt_cache = self.prompt_text.get(1.0, tk.END).strip()
+        return self._prompt_cache
+    
     def insert_column_to_prompt(self, column_name):
         """将列名插入到Prompt光标位置"""
         placeholder = f"{{{column_name}}}"
@@ -2537,6 +3236,7 @@ class ResearchGUI:
             
             # 保存模型信息到缓存
             self.ollama_models_cache = models_dict
+            self.models_cache_changed()
             
             # 保存缓存到文件
             self.save_models_cache()
@@ -2612,12 +3312,14 @@ class ResearchGUI:
                         self.log(f"已获取 {completed}/{total} 个模型的大小信息...", "INFO")
                         # 定期保存缓存，避免数据丢失
                         self.ollama_models_cache.update(models_dict)
+                        self.models_cache_changed()
                         self.save_models_cache()
                 except Exception:
                     pass
         
         # 最终保存缓存
         self.ollama_models_cache.update(models_dict)
+        self.models_cache_changed()
         self.save_models_cache()
         self.log(f"✓ 已完成所有模型大小信息的获取", "SUCCESS")
     
@@ -2649,6 +3351,25 @@ class ResearchGUI:
         except Exception as e:
             self.log(f"从本地API获取模型列表失败: {e}", "WARN")
     
+    def models_cache_changed(self):
+        """模型缓存被修改后调用，清空排序结果缓存"""
+        self._sorted_model_names = None
+        self._sorted_sizes_per_model = {}
+    
+    def sorted_model_names(self):
+        """按名称排序的模型名称元组（只在模型缓存变化后重新排序）"""
+        if self._sorted_model_names is None:
+            self._sorted_model_names = tuple(sorted(self.ollama_models_cache))
+        return self._sorted_model_names
+    
+    def sorted_model_sizes(self, model_name):
+        """按长度和名称排序的模型大小元组（只在模型缓存变化后重新排序）"""
+        sizes = self._sorted_sizes_per_model.get(model_name)
+        if sizes is None:
+            sizes = tuple(sorted(self.ollama_models_cache.get(model_name, []), key=lambda x: (len(x), x)))
+            self._sorted_sizes_per_model[model_name] = sizes
+        return sizes
+    
     def on_model_selected(self):
         """当选择模型时，更新模型大小选项（从缓存读取，不进行网络请求）"""
         model_name = self.model_var.get()
@@ -2680,6 +3401,7 @@ class ResearchGUI:
                         # 保存到缓存
                         if sizes:
                             self.ollama_models_cache[model_name] = sizes
+                            self.models_cache_changed()
                             # 保存缓存到文件
                             self.save_models_cache()
             except:
@@ -2687,7 +3409,7 @@ class ResearchGUI:
         
         # 更新大小下拉框
         if sizes:
-            self.model_size_combo['values'] = sorted(sizes, key=lambda x: (len(x), x))
+            self.model_size_combo['values'] = self.sorted_model_sizes(model_name)
             self.model_size_combo['state'] = 'readonly'
             if sizes:
                 self.model_size_var.set(sizes[0])  # 默认选择第一个
@@ -2819,27 +3541,60 @@ class ResearchGUI:
             import traceback
             messagebox.showerror("详细错误", traceback.format_exc())
     
+    def format_log_line(self, message, level="INFO"):
+        """将日志消息格式化为带时间戳和级别的一行文本"""
+        # 确保message是字符串，并处理可能的编码问题
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', errors='replace')
+        elif not isinstance(message, str):
+            message = str(message)
+        
+        # 清理可能导致乱码的控制字符
+        message = message.encode('utf-8', errors='replace').decode('utf-8', errors='replace')
+        # 移除控制字符（保留换行符和制表符）
+        message = _LOG_CONTROL_CHARS_RE.sub('', message)
+        
+        timestamp = time.strftime("%H:%M:%S")
+        return f"[{timestamp}] [{level}] {message}\n"
+    
+    def append_log_text(self, text):
+        """向输出区域追加已格式化的日志文本"""
+        self.output_text.insert(tk.END, text)
+        self.output_text.see(tk.END)
+        self.root.update_idletasks()
+    
+    def flush_logs(self, limit=None):
+        """将后台线程缓冲的日志合并为一次插入输出（limit为本次最多输出的行数）"""
+        lines = []
+        while self._log_q and (limit is None or len(lines) < limit):
+            lines.append(self._log_q.popleft())
+        if lines:
+            self.append_log_text("".join(lines))
+    
+    def _poll_logs(self):
+        """每100ms输出一次后台线程缓冲的日志"""
+        try:
+            self.flush_logs(limit=256)
+        except Exception:
+            pass
+        try:
+            self.root.after(100, self._poll_logs)
+        except (RuntimeError, tk.TclError):
+            pass  # 窗口已销毁
+    
     def log(self, message, level="INFO"):
-        """在输出区域添加日志"""
+        """在输出区域添加日志（低于LOG_LEVEL的日志不输出）
+        
+        后台线程中调用时只放入缓冲，由Tk主线程合并输出；主线程中调用时先输出缓冲中的日志再直接输出。
+        """
+        if not log_enabled(level):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            self._log_q.append(self.format_log_line(message, level))
+            return
         try:
-            # 确保message是字符串，并处理可能的编码问题
-            if isinstance(message, bytes):
-                message = message.decode('utf-8', errors='replace')
-            elif not isinstance(message, str):
-                message = str(message)
-            
-            # 清理可能导致乱码的控制字符
-            message = message.encode('utf-8', errors='replace').decode('utf-8', errors='replace')
-            # 移除控制字符（保留换行符和制表符）
-            import re
-            message = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f]', '', message)
-            
-            timestamp = time.strftime("%H:%M:%S")
-            log_message = f"[{timestamp}] [{level}] {message}\n"
-            
-            self.output_text.insert(tk.END, log_message)
-            self.output_text.see(tk.END)
-            self.root.update_idletasks()
+            self.flush_logs()
+            self.append_log_text(self.format_log_line(message, level))
         except Exception as e:
             # 如果日志输出本身出错，至少尝试输出基本信息
             try:
@@ -2849,6 +3604,13 @@ class ResearchGUI:
             except:
                 pass
     
+    def log_threadsafe(self, message, level="INFO"):
+        """从后台线程输出日志（通过after调度到Tk主线程执行）"""
+        try:
+            self.root.after(0, self.log, message, level)
+        except (RuntimeError, tk.TclError):
+            pass  # 窗口已销毁
+    
     def clear_output(self):
         """清空输出区域"""
         self.output_text.delete(1.0, tk.END)
@@ -2893,7 +3655,7 @@ class ResearchGUI:
             log_message = f"[{timestamp}] {message}\n"
             self.crawler_output_text.insert(tk.END, log_message)
             self.crawler_output_text.see(tk.END)
-            self.root.update()
+            self.root.update_idletasks()
         except Exception as e:
             # 如果日志输出本身出错，至少尝试输出基本信息
             try:
@@ -3427,20 +4189,21 @@ class ResearchGUI:
     def _save_crawler_results(self, papers, output_file):
         """保存爬虫结果"""
         try:
-            import pandas as pd
-            df = pd.DataFrame(papers)
-            
+            # 列为所有论文字段的并集（按首次出现顺序），直接写入文件，不经过DataFrame
+            fieldnames = list(dict.fromkeys(key for paper in papers for key in paper))
             if output_file.endswith('.xlsx'):
-                df.to_excel(output_file, index=False, engine='openpyxl')
+                write_excel_rows(output_file, fieldnames, ([paper.get(col) for col in fieldnames] for paper in papers))
             else:
-                df.to_csv(output_file, index=False, encoding='utf-8-sig')
+                with open(output_file, 'w', encoding='utf-8-sig', newline='', buffering=1 << 20) as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows(papers)
         except Exception as e:
             self.crawler_log(f"保存文件失败: {e}", "ERROR")
             raise
     
     def check_port_available(self, port):
         """检查本地端口是否可用"""
-        import socket
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         result = sock.connect_ex(('localhost', port))
         sock.close()
@@ -3570,16 +4333,22 @@ class ResearchGUI:
     def save_lock_status(self):
         """保存锁定状态到文件"""
         try:
-            with open(LOCK_FILE, 'w', encoding='utf-8') as f:
+            # 先写临时文件再原子替换，避免写入中途崩溃留下不完整的锁定文件
+            tmp_file = LOCK_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 f.write("locked")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, LOCK_FILE)
         except Exception as e:
             print(f"保存锁定状态失败: {e}")
-    
+
     def clear_lock_status(self):
         """清除锁定状态文件"""
         try:
-            if os.path.exists(LOCK_FILE):
-                os.remove(LOCK_FILE)
+            os.remove(LOCK_FILE)
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"清除锁定状态失败: {e}")
     
@@ -3642,13 +4411,15 @@ class ResearchGUI:
             else:
                 # 解锁失败，显示错误信息
                 result_label.config(text="解锁码错误！程序即将退出...")
-                unlock_window.update()
-                time.sleep(1)
                 unlock_result[0] = False
-                unlock_window.destroy()
-                # 销毁主窗口并退出程序
-                self.root.destroy()
-                sys.exit(1)
+                # 1秒后退出（通过after调度，避免sleep阻塞Tk主线程）
+                unlock_window.after(1000, exit_program)
+
+        def exit_program():
+            # 销毁解锁窗口和主窗口并退出程序
+            unlock_window.destroy()
+            self.root.destroy()
+            sys.exit(1)
         
         def on_enter(event):
             try_unlock()
@@ -3685,32 +4456,37 @@ class ResearchGUI:
         # 保存锁定状态到文件
         self.save_lock_status()
         
-        # 递归禁用所有widget
-        def disable_widget(widget):
-            """递归禁用widget及其子widget"""
-            try:
-                # 禁用Entry、Combobox、Button等
-                if isinstance(widget, (ttk.Entry, ttk.Combobox, ttk.Button, tk.Entry, tk.Button)):
-                    widget.config(state="disabled")
-                elif isinstance(widget, (scrolledtext.ScrolledText, tk.Text)):
+        # 迭代遍历禁用所有widget（显式队列，避免深层widget树的递归开销）
+        pending = deque(self.root.winfo_children())
+        while pending:
+            widget = pending.popleft()
+            if isinstance(widget, _DISABLEABLE_WIDGETS):
+                try:
                     widget.config(state="disabled")
-                elif isinstance(widget, ttk.Treeview):
-                    # Treeview不能直接禁用，但可以禁用其绑定的事件
-                    pass
-                
-                # 递归处理子widget
-                for child in widget.winfo_children():
-                    disable_widget(child)
-            except:
-                pass  # 忽略无法禁用的widget
-        
-        # 禁用根窗口的所有子widget
-        for child in self.root.winfo_children():
-            disable_widget(child)
+                except tk.TclError:
+                    pass  # 忽略无法禁用的widget
+            pending.extend(widget.winfo_children())
         
         # 显示锁定提示
         messagebox.showerror("软件已锁定", "检测到非法IP地址，软件已被锁定！\n\n下次启动时需要输入解锁码。")
     
+    def _mark_tunnel_verified(self, local_port):
+        """记录隧道已确认可用（用于短时间内跳过重复探测）"""
+        self._tunnel_verified_at = time.monotonic()
+        self._tunnel_verified_port = local_port
+    
+    def _is_tunnel_recently_verified(self, local_port, max_age=30):
+        """隧道在max_age秒内确认可用过，且本地端口仍可连接"""
+        if self._tunnel_verified_at is None or self._tunnel_verified_port != local_port:
+            return False
+        if time.monotonic() - self._tunnel_verified_at >= max_age:
+            return False
+        try:
+            socket.create_connection(('127.0.0.1', local_port), timeout=0.2).close()
+            return True
+        except OSError:
+            return False
+    
     def establish_ssh_tunnel(self):
         """建立SSH隧道"""
         global USE_PARAMIKO
@@ -3743,8 +4519,14 @@ class ResearchGUI:
         
         self.log(f"建立SSH隧道: {local_port} -> {remote_port}")
         
+        # 最近已验证过的隧道只需确认本地端口可连接，跳过HTTP探测
+        if self._is_tunnel_recently_verified(local_port):
+            self.log(f"✓ 检测到现有SSH隧道，直接使用", "SUCCESS")
+            return True
+        
         # 检查是否已经有可用的SSH隧道（直接测试端口是否可访问Ollama）
         if self.check_ssh_connection():
+            self._mark_tunnel_verified(local_port)
             self.log(f"✓ 检测到现有SSH隧道，直接使用", "SUCCESS")
             return True
         
@@ -3752,8 +4534,7 @@ class ResearchGUI:
         if USE_PARAMIKO and password:
             try:
                 self.log("使用paramiko建立SSH隧道...")
-                import socket
-                import paramiko
+                paramiko = load_paramiko()
                 
                 # 创建SSH客户端
                 client = paramiko.SSHClient()
@@ -3801,7 +4582,7 @@ class ResearchGUI:
                                         def forward_data(source, dest):
                                             try:
                                                 while True:
-                                                    data = source.recv(4096)
+                                                    data = source.recv(SSH_RECV_BUFSIZE)
                                                     if not data:
                                                         break
                                                     dest.send(data)
@@ -3841,23 +4622,20 @@ class ResearchGUI:
                 self.ssh_tunnel_thread = threading.Thread(target=forward_tunnel, daemon=True)
                 self.ssh_tunnel_thread.start()
                 
-                # 等待一下让隧道建立
-                time.sleep(1)
-                
-                # 验证隧道是否可用（通过测试Ollama API）
-                try:
-                    test_url = f"http://localhost:{local_port}/api/tags"
-                    response = requests.get(test_url, timeout=3)
-                    if response.status_code == 200:
-                        self.log("✓ SSH隧道已建立（使用paramiko）", "SUCCESS")
-                        return True
-                    else:
-                        self.log("✓ SSH隧道已建立（使用paramiko），但Ollama服务可能未启动", "SUCCESS")
-                        return True  # 即使Ollama未启动，隧道本身已建立
-                except:
-                    # 即使无法访问Ollama，也认为隧道已建立（可能是Ollama未启动）
-                    self.log("✓ SSH隧道已建立（使用paramiko）", "SUCCESS")
-                    return True
+                # 等待隧道建立：只检测本地转发端口能否连接，无需完整的HTTP请求
+                tunnel_ready = False
+                for _ in range(10):
+                    try:
+                        socket.create_connection(('127.0.0.1', local_port), timeout=0.5).close()
+                        tunnel_ready = True
+                        break
+                    except OSError:
+                        time.sleep(0.1)
+                if tunnel_ready:
+                    self._mark_tunnel_verified(local_port)
+                # 即使无法访问Ollama，也认为隧道已建立（可能是Ollama未启动）
+                self.log("✓ SSH隧道已建立（使用paramiko）", "SUCCESS")
+                return True
                     
             except Exception as e:
                 self.log(f"paramiko建立SSH隧道失败: {e}", "WARN")
@@ -3881,13 +4659,51 @@ class ResearchGUI:
         self.log("✗ SSH隧道建立失败: paramiko连接失败", "ERROR")
         return False
     
+    def _connect_ssh_client(self):
+        """按界面上的配置新建一个paramiko SSH连接"""
+        paramiko = load_paramiko()
+        
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=self.host_var.get(),
+            port=int(self.ssh_port_var.get()),
+            username=self.username_var.get(),
+            password=self.password_var.get(),
+            timeout=30,
+            allow_agent=False,
+            look_for_keys=False
+        )
+        return client
+    
+    def _get_ssh_client(self):
+        """获取可用的paramiko SSH客户端（优先复用已有连接，失效时重新连接）"""
+        if self.ssh_client:
+            try:
+                # 检查现有连接是否有效
+                transport = self.ssh_client.get_transport()
+                if transport and transport.is_active():
+                    return self.ssh_client
+            except:
+                pass
+            # 连接已失效，关闭旧连接
+            try:
+                self.ssh_client.close()
+            except:
+                pass
+            self.ssh_client = None
+        
+        client = self._connect_ssh_client()
+        # 保存连接以便后续复用（不关闭，保持连接）
+        self.ssh_client = client
+        return client
+    
     def run_ssh_command(self, command, show_console=True):
         """执行SSH命令"""
         global USE_PARAMIKO
         
         username = self.username_var.get()
         host = self.host_var.get()
-        ssh_port = int(self.ssh_port_var.get())
         password = self.password_var.get()
         ssh_host = f"{username}@{host}"
         
@@ -3904,58 +4720,29 @@ class ResearchGUI:
         # 优先使用paramiko（Windows上最可靠）
         if USE_PARAMIKO and password:
             try:
-                import paramiko
-                
-                # 优先复用已有的SSH客户端连接
-                client = None
-                reuse_connection = False
-                
-                if self.ssh_client:
-                    try:
-                        # 检查现有连接是否有效
-                        transport = self.ssh_client.get_transport()
-                        if transport and transport.is_active():
-                            client = self.ssh_client
-                            reuse_connection = True
-                        else:
-                            # 连接已失效，关闭并创建新连接
-                            try:
-                                self.ssh_client.close()
-                            except:
-                                pass
-                            self.ssh_client = None
-                    except:
-                        # 检查失败，关闭旧连接
-                        try:
-                            self.ssh_client.close()
-                        except:
-                            pass
-                        self.ssh_client = None
-                
-                # 如果没有可复用的连接，创建新连接
-                if not client:
-                    client = paramiko.SSHClient()
-                    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                    client.connect(
-                        hostname=host,
-                        port=ssh_port,
-                        username=username,
-                        password=password,
-                        timeout=30,
-                        allow_agent=False,
-                        look_for_keys=False
-                    )
-                    # 保存连接以便后续复用（但不关闭，保持连接）
-                    self.ssh_client = client
-                
-                # 使用连接执行命令
+                # 复用已有的SSH连接执行命令
+                client = self._get_ssh_client()
+
                 stdin, stdout, stderr = client.exec_command(command, timeout=3600)
-                output = stdout.read().decode('utf-8', errors='ignore')
-                error_output = stderr.read().decode('utf-8', errors='ignore')
-                exit_status = stdout.channel.recv_exit_status()
-                
-                # 注意：不复用连接时，不关闭client，保持连接以便后续使用
-                # 只有在连接失败或需要重新连接时才关闭
+                # 同时排空stdout和stderr（串行read可能因stderr缓冲区写满而卡死）
+                import select
+                channel = stdout.channel
+                stdout_buf = BytesIO()
+                stderr_buf = BytesIO()
+                while True:
+                    if channel.recv_ready():
+                        stdout_buf.write(channel.recv(SSH_RECV_BUFSIZE))
+                    elif channel.recv_stderr_ready():
+                        stderr_buf.write(channel.recv_stderr(SSH_RECV_BUFSIZE))
+                    elif channel.eof_received:
+                        # EOF之后可能仍有刚到达的数据，再确认一次缓冲区为空
+                        if not (channel.recv_ready() or channel.recv_stderr_ready()):
+                            break
+                    else:
+                        select.select([channel], [], [], 1.0)
+                exit_status = channel.recv_exit_status()
+                output = stdout_buf.getvalue().decode('utf-8', errors='ignore')
+                error_output = stderr_buf.getvalue().decode('utf-8', errors='ignore')
                 
                 full_output = output + error_output
                 
@@ -3985,9 +4772,9 @@ class ResearchGUI:
             return False
         
         cmd_name = os.path.basename(ollama_cmd)
-        success, output, code = self.run_ssh_command(f"pgrep -f '{ollama_cmd} run {model_name}' || pgrep -f '{cmd_name} run {model_name}' || echo 'not_running'")
+        success, output, code = self.run_ssh_command(ollama_run_pids_cmd(cmd_name, model_name))
         if success:
-            return "not_running" not in output
+            return bool(parse_pid_lines(output))
         return False
     
     def pull_model_with_progress(self, model_name):
@@ -3998,24 +4785,28 @@ class ResearchGUI:
         self.log(f"开始下载模型 {model_name}...")
         self.log("这可能需要一些时间，请耐心等待...")
         
-        # 自动检测ollama路径（在两个可能的位置）
+        # 自动检测ollama路径（用户指定路径和两个默认安装位置）
         username = self.username_var.get()
-        data_path = f"/data/{username}/ollama/bin/ollama"
-        home_path = f"/home/{username}/ollama/bin/ollama"
-        
-        # 检测 /data/<username>/ollama/bin/ollama
-        success1, output1, _ = self.run_ssh_command(f"test -x {data_path} && {data_path} --version 2>&1 || echo 'NOT_FOUND'", show_console=False)
-        found_in_data = success1 and "NOT_FOUND" not in output1
+        custom_dir = self.ollama_custom_dir_var.get().strip()
+        candidates = [f"/data/{username}/ollama/bin/ollama", f"/home/{username}/ollama/bin/ollama"]
+        if custom_dir:
+            candidates.insert(0, f"{custom_dir.rstrip('/')}/ollama/bin/ollama")
         
-        # 检测 /home/<username>/ollama/bin/ollama
-        success2, output2, _ = self.run_ssh_command(f"test -x {home_path} && {home_path} --version 2>&1 || echo 'NOT_FOUND'", show_console=False)
-        found_in_home = success2 and "NOT_FOUND" not in output2
+        # 与启动服务共用路径缓存，已检测过时直接复用，否则用一条命令依次检测各候选路径
+        path_cache_key = (self.host_var.get().strip(), username, custom_dir)
+        ollama_cmd = self._ollama_path_cache.get(path_cache_key)
+        if not ollama_cmd:
+            candidate_list = " ".join(candidates)
+            success, output, _ = self.run_ssh_command(
+                f"sh -c 'for p in {candidate_list}; do [ -x \"$p\" ] && echo \"$p\" && exit; done; echo NONE'",
+                show_console=False
+            )
+            found_path = output.strip().splitlines()[-1] if success and output.strip() else "NONE"
+            if found_path in candidates:
+                ollama_cmd = found_path
+                self._ollama_path_cache[path_cache_key] = ollama_cmd
         
-        if found_in_data:
-            ollama_cmd = data_path
-            self.log(f"使用检测到的 ollama 路径: {ollama_cmd}", "INFO")
-        elif found_in_home:
-            ollama_cmd = home_path
+        if ollama_cmd:
             self.log(f"使用检测到的 ollama 路径: {ollama_cmd}", "INFO")
         else:
             self.log("✗ 错误: 未找到Ollama，无法下载模型", "ERROR")
@@ -4026,26 +4817,12 @@ class ResearchGUI:
         _ollama_path = ollama_cmd
         
         # 优先使用paramiko（Windows上最可靠，可以实时显示进度）
-        username = self.username_var.get()
-        host = self.host_var.get()
-        ssh_port = int(self.ssh_port_var.get())
         password = self.password_var.get()
         
         if USE_PARAMIKO and password:
             try:
-                import paramiko
-                
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                client.connect(
-                    hostname=host,
-                    port=ssh_port,
-                    username=username,
-                    password=password,
-                    timeout=30,
-                    allow_agent=False,
-                    look_for_keys=False
-                )
+                # 复用已有的SSH连接（避免每次下载重新握手认证）
+                client = self._get_ssh_client()
                 
                 # 执行ollama pull命令，实时读取输出
                 self.log(f"使用命令: {ollama_cmd} pull {model_name}", "INFO")
@@ -4056,15 +4833,45 @@ class ResearchGUI:
                 import sys
                 import re
                 
+                def log_pull_line(line):
+                    """解析ollama pull的一行输出并显示进度"""
+                    # 格式示例: "pulling manifest", "pulling <hash>... 50%", "downloading <size>", "extracting <size>"
+                    line_lower = line.lower()
+                    progress_match = re.search(r'(\d+(?:\.\d+)?)\s*%', line)
+                    if progress_match:
+                        percent = progress_match.group(1)
+                        # 提取操作类型
+                        if 'pulling' in line_lower:
+                            if 'manifest' in line_lower:
+                                self.log_threadsafe(f"📥 正在拉取清单... {percent}%", "INFO")
+                            else:
+                                self.log_threadsafe(f"📥 正在拉取层... {percent}%", "INFO")
+                        elif 'downloading' in line_lower:
+                            self.log_threadsafe(f"⬇️ 正在下载... {percent}%", "INFO")
+                        elif 'extracting' in line_lower:
+                            self.log_threadsafe(f"📦 正在解压... {percent}%", "INFO")
+                        elif 'verifying' in line_lower:
+                            self.log_threadsafe(f"✓ 正在验证... {percent}%", "INFO")
+                        else:
+                            self.log_threadsafe(f"⏳ {line}", "INFO")
+                    elif any(keyword in line_lower for keyword in ['pulling', 'downloading', 'extracting', 'verifying', 'complete', 'success']):
+                        # 没有百分比但有关键词，显示完整信息
+                        if 'complete' in line_lower or 'success' in line_lower:
+                            self.log_threadsafe(f"✓ {line}", "SUCCESS")
+                        else:
+                            self.log_threadsafe(f"⏳ {line}", "INFO")
+                
                 def read_output():
                     buffer = ""
-                    last_progress = ""
+                    # 增量解码器会缓存跨数据块的不完整UTF-8字节，避免中文等多字节字符被截断成乱码
+                    stdout_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                    stderr_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
                     while True:
                         # 检查是否被中断
                         if not self.is_downloading:
-                            self.log("下载已中断", "WARN")
+                            self.log_threadsafe("下载已中断", "WARN")
                             try:
-                                client.close()
+                                stdout.channel.close()
                             except:
                                 pass
                             return False
@@ -4072,132 +4879,56 @@ class ResearchGUI:
                         # 检查是否有数据可读
                         if sys.platform == 'win32':
                             # Windows上使用不同的方法
-                            if stdout.channel.recv_ready():
-                                data = stdout.channel.recv(4096).decode('utf-8', errors='replace')
-                                if data:
-                                    buffer += data
-                                    # 按行处理
-                                    while '\n' in buffer or '\r' in buffer:
-                                        line_end = buffer.find('\n')
-                                        if line_end == -1:
-                                            line_end = buffer.find('\r')
-                                        if line_end == -1:
-                                            break
-                                        line = buffer[:line_end].strip()
-                                        buffer = buffer[line_end+1:].lstrip('\r\n')
-                                        
-                                        if line:
-                                            # 解析ollama pull的输出格式
-                                            # 格式示例: "pulling manifest", "pulling <hash>... 50%", "downloading <size>", "extracting <size>"
-                                            progress_match = re.search(r'(\d+(?:\.\d+)?)\s*%', line)
-                                            if progress_match:
-                                                percent = progress_match.group(1)
-                                                # 提取操作类型
-                                                if 'pulling' in line.lower():
-                                                    if 'manifest' in line.lower():
-                                                        self.log(f"📥 正在拉取清单... {percent}%", "INFO")
-                                                    else:
-                                                        self.log(f"📥 正在拉取层... {percent}%", "INFO")
-                                                elif 'downloading' in line.lower():
-                                                    self.log(f"⬇️ 正在下载... {percent}%", "INFO")
-                                                elif 'extracting' in line.lower():
-                                                    self.log(f"📦 正在解压... {percent}%", "INFO")
-                                                elif 'verifying' in line.lower():
-                                                    self.log(f"✓ 正在验证... {percent}%", "INFO")
-                                                else:
-                                                    self.log(f"⏳ {line}", "INFO")
-                                            elif any(keyword in line.lower() for keyword in ['pulling', 'downloading', 'extracting', 'verifying', 'complete', 'success']):
-                                                # 没有百分比但有关键词，显示完整信息
-                                                if 'complete' in line.lower() or 'success' in line.lower():
-                                                    self.log(f"✓ {line}", "SUCCESS")
-                                                else:
-                                                    self.log(f"⏳ {line}", "INFO")
-                            
-                            if stderr.channel.recv_stderr_ready():
-                                data = stderr.channel.recv_stderr(4096).decode('utf-8', errors='replace')
-                                if data:
-                                    for line in data.split('\n'):
-                                        line = line.strip()
-                                        if line and not line.startswith('Error:'):
-                                            self.log(f"ℹ️ {line}", "INFO")
-                            
-                            if stdout.channel.exit_status_ready():
-                                # 处理剩余的buffer
-                                if buffer.strip():
-                                    for line in buffer.split('\n'):
-                                        line = line.strip()
-                                        if line:
-                                            self.log(f"⏳ {line}", "INFO")
-                                break
-                            time.sleep(0.1)  # 更频繁地检查，提高实时性
+                            stdout_ready = stdout.channel.recv_ready()
+                            stderr_ready = stderr.channel.recv_stderr_ready()
                         else:
                             # Linux/Mac上使用select
                             r, w, x = select.select([stdout.channel, stderr.channel], [], [], 0.1)
-                            buffer = ""
-                            if stdout.channel in r:
-                                data = stdout.channel.recv(4096).decode('utf-8', errors='replace')
-                                if data:
-                                    buffer += data
-                                    # 按行处理
-                                    while '\n' in buffer or '\r' in buffer:
-                                        line_end = buffer.find('\n')
-                                        if line_end == -1:
-                                            line_end = buffer.find('\r')
-                                        if line_end == -1:
-                                            break
-                                        line = buffer[:line_end].strip()
-                                        buffer = buffer[line_end+1:].lstrip('\r\n')
-                                        
-                                        if line:
-                                            # 解析ollama pull的输出格式
-                                            progress_match = re.search(r'(\d+(?:\.\d+)?)\s*%', line)
-                                            if progress_match:
-                                                percent = progress_match.group(1)
-                                                if 'pulling' in line.lower():
-                                                    if 'manifest' in line.lower():
-                                                        self.log(f"📥 正在拉取清单... {percent}%", "INFO")
-                                                    else:
-                                                        self.log(f"📥 正在拉取层... {percent}%", "INFO")
-                                                elif 'downloading' in line.lower():
-                                                    self.log(f"⬇️ 正在下载... {percent}%", "INFO")
-                                                elif 'extracting' in line.lower():
-                                                    self.log(f"📦 正在解压... {percent}%", "INFO")
-                                                elif 'verifying' in line.lower():
-                                                    self.log(f"✓ 正在验证... {percent}%", "INFO")
-                                                else:
-                                                    self.log(f"⏳ {line}", "INFO")
-                                            elif any(keyword in line.lower() for keyword in ['pulling', 'downloading', 'extracting', 'verifying', 'complete', 'success']):
-                                                if 'complete' in line.lower() or 'success' in line.lower():
-                                                    self.log(f"✓ {line}", "SUCCESS")
-                                                else:
-                                                    self.log(f"⏳ {line}", "INFO")
-                            
-                            if stderr.channel in r:
-                                data = stderr.channel.recv_stderr(4096).decode('utf-8', errors='replace')
-                                if data:
-                                    for line in data.split('\n'):
-                                        line = line.strip()
-                                        if line and not line.startswith('Error:'):
-                                            self.log(f"ℹ️ {line}", "INFO")
-                            
-                            if stdout.channel.exit_status_ready():
-                                # 处理剩余的buffer
-                                if buffer.strip():
-                                    for line in buffer.split('\n'):
-                                        line = line.strip()
-                                        if line:
-                                            self.log(f"⏳ {line}", "INFO")
-                                break
+                            stdout_ready = stdout.channel in r
+                            stderr_ready = stderr.channel in r
+                        
+                        if stdout_ready:
+                            data = stdout_decoder.decode(stdout.channel.recv(SSH_RECV_BUFSIZE))
+                            if data:
+                                buffer += data
+                                # 按行处理（splitlines一次性处理\n和\r，末尾不完整的行留在buffer中）
+                                lines = buffer.splitlines()
+                                if buffer.endswith(('\n', '\r')):
+                                    buffer = ""
+                                else:
+                                    buffer = lines.pop()
+                                for line in lines:
+                                    line = line.strip()
+                                    if line:
+                                        log_pull_line(line)
+                        
+                        if stderr_ready:
+                            data = stderr_decoder.decode(stderr.channel.recv_stderr(SSH_RECV_BUFSIZE))
+                            if data:
+                                for line in data.splitlines():
+                                    line = line.strip()
+                                    if line and not line.startswith('Error:'):
+                                        self.log_threadsafe(f"ℹ️ {line}", "INFO")
+                        
+                        if stdout.channel.exit_status_ready():
+                            # 处理剩余的buffer
+                            buffer += stdout_decoder.decode(b'', final=True)
+                            for line in buffer.splitlines():
+                                line = line.strip()
+                                if line:
+                                    self.log_threadsafe(f"⏳ {line}", "INFO")
+                            break
+                        if sys.platform == 'win32':
+                            time.sleep(0.1)  # 更频繁地检查，提高实时性
                 
-                # 在后台线程中读取输出
-                output_thread = threading.Thread(target=read_output, daemon=True)
-                output_thread.start()
+                # 在后台线程池中读取输出（日志通过after调度回Tk主线程）
+                self._bg_executor.submit(read_output)
                 
                 # 等待命令完成（检查中断）
                 if not self.is_downloading:
                     self.log("下载已中断", "WARN")
                     try:
-                        client.close()
+                        stdout.channel.close()
                     except:
                         pass
                     return False
@@ -4221,52 +4952,38 @@ class ResearchGUI:
                         if line:
                             self.log(f"下载错误: {line}", "ERROR")
                 
-                client.close()
-                
                 # 检查是否被中断
                 if not self.is_downloading:
                     self.log("下载已中断", "WARN")
                     return False
                 
-                # 检查命令退出状态
-                if exit_status != 0:
-                    self.log(f"✗ 模型 {model_name} 下载失败，退出状态码: {exit_status}", "ERROR")
-                    if remaining_stderr:
-                        self.log(f"错误详情: {remaining_stderr[:500]}", "ERROR")
-                    self.is_downloading = False
-                    return False
+                # 退出状态为0即表示下载成功（ollama pull失败时会返回非0）
+                if exit_status == 0:
+                    self.log(f"✓ 模型 {model_name} 下载完成", "SUCCESS")
+                    return True
                 
-                # 检查是否成功（使用更可靠的方法）
-                time.sleep(1)
+                self.log(f"✗ 模型 {model_name} 下载失败，退出状态码: {exit_status}", "ERROR")
+                if remaining_stderr:
+                    self.log(f"错误详情: {remaining_stderr[:500]}", "ERROR")
+                
+                # 退出状态非0时，通过 ollama list 诊断模型是否实际已存在
                 success, output, code = self.run_ssh_command(f"{ollama_cmd} list")
                 if success:
                     # 解析输出检查模型是否存在
-                    lines = output.strip().split('\n')
-                    model_exists = False
-                    if len(lines) > 1:
-                        for line in lines[1:]:
-                            parts = line.split()
-                            if parts:
-                                listed_model = parts[0]
-                                if listed_model == model_name or listed_model.startswith(model_name + ":"):
-                                    model_exists = True
-                                    break
-                    
-                    if model_exists:
-                        self.log(f"✓ 模型 {model_name} 下载完成", "SUCCESS")
+                    if ollama_list_has_model(output, model_name):
+                        self.log(f"✓ 模型 {model_name} 已存在于服务器，视为下载完成", "SUCCESS")
                         return True
                     else:
-                        self.log(f"✗ 模型 {model_name} 下载失败或验证失败", "ERROR")
                         self.log(f"验证输出: {output[:300]}", "ERROR")
-                        return False
                 else:
                     # 检查是否是 ollama 命令找不到的错误
-                    if "command not found" in output.lower() or "not found" in output.lower():
+                    if is_command_not_found(output):
                         self.log(f"✗ 错误: 服务器上找不到 ollama 命令", "ERROR")
                         self.log(f"请确保服务器上已安装 Ollama，并且 ollama 命令在 PATH 中", "ERROR")
                     else:
                         self.log(f"✗ 无法验证模型是否下载成功: {output}", "ERROR")
-                    return False
+                self.is_downloading = False
+                return False
                     
             except Exception as e:
                 self.log(f"✗ paramiko下载过程出错: {e}", "ERROR")
@@ -4287,7 +5004,7 @@ class ResearchGUI:
                 return True
             else:
                 # 检查是否是 ollama 命令找不到的错误
-                if "command not found" in output.lower() or "not found" in output.lower():
+                if is_command_not_found(output):
                     self.log(f"✗ 错误: 服务器上找不到 ollama 命令", "ERROR")
                     self.log(f"请确保服务器上已安装 Ollama，并且 ollama 命令在 PATH 中", "ERROR")
                     self.log(f"错误详情: {output}", "ERROR")
@@ -4297,82 +5014,85 @@ class ResearchGUI:
     
     def start_ollama_services(self):
         """启动Ollama服务"""
+        # 在入口处一次性读取界面配置，后续直接使用局部变量
         base_model_name = self.model_var.get()
         model_size = self.model_size_var.get()
         model_name = get_full_model_name(base_model_name, model_size)
+        host = self.host_var.get().strip()
+        username = self.username_var.get()
+        custom_dir = self.ollama_custom_dir_var.get().strip()
+        local_port = int(self.local_port_var.get())
         
         self.log("检查Ollama服务状态...")
         
         global _ollama_path
         
-        # 优先使用用户自定义的Ollama路径
         ollama_cmd = None
-        custom_dir = self.ollama_custom_dir_var.get().strip()
         
-        if custom_dir:
-            # 用户输入了自定义路径，检查该路径下是否有ollama
-            custom_ollama_path = f"{custom_dir.rstrip('/')}/ollama/bin/ollama"
-            self.log(f"检查用户指定的Ollama路径: {custom_ollama_path}", "INFO")
-            success_custom, output_custom, _ = self.run_ssh_command(
-                f"test -x {custom_ollama_path} && {custom_ollama_path} --version 2>&1 || echo 'NOT_FOUND'", 
+        # 优先使用本次SSH会话中已检测到的路径（只需一次test -x确认仍然可用）
+        path_cache_key = (host, username, custom_dir)
+        cached_path = self._ollama_path_cache.get(path_cache_key)
+        if cached_path:
+            success_cached, output_cached, _ = self.run_ssh_command(
+                f"test -x {cached_path} && echo 'FOUND' || echo 'NOT_FOUND'",
                 show_console=False
             )
-            found_custom = success_custom and "NOT_FOUND" not in output_custom
-            if found_custom:
-                ollama_cmd = custom_ollama_path
-                self.log(f"✓ 使用用户指定的 ollama 路径: {ollama_cmd}", "SUCCESS")
+            if success_cached and "NOT_FOUND" not in output_cached:
+                ollama_cmd = cached_path
+                self.log(f"✓ 使用已检测到的 ollama 路径: {ollama_cmd}", "SUCCESS")
+            else:
+                self._ollama_path_cache.pop(path_cache_key, None)
         
-        # 如果用户没有指定路径或用户指定的路径不可用，使用默认检测逻辑
         if not ollama_cmd:
-            # 先检测ollama是否已经安装（在两个可能的位置都检测）
-            username = self.username_var.get()
+            # 用一条SSH命令同时检测：用户指定路径、两个默认安装位置、/data/ 目录是否存在
             data_path = f"/data/{username}/ollama/bin/ollama"
             home_path = f"/home/{username}/ollama/bin/ollama"
+            probes = [
+                ("DATA", f"test -x {data_path}"),
+                ("HOME", f"test -x {home_path}"),
+                ("DATAROOT", "test -d /data"),
+            ]
+            if custom_dir:
+                custom_ollama_path = f"{custom_dir.rstrip('/')}/ollama/bin/ollama"
+                self.log(f"检查用户指定的Ollama路径: {custom_ollama_path}", "INFO")
+                probes.insert(0, ("CUSTOM", f"test -x {custom_ollama_path}"))
             
             self.log(f"检测 Ollama 是否已安装...", "INFO")
-            
-            # 检测 /data/<username>/ollama/bin/ollama
-            self.log(f"检查路径 1: {data_path}", "INFO")
-            success1, output1, code1 = self.run_ssh_command(f"test -x {data_path} && {data_path} --version 2>&1 || echo 'NOT_FOUND'", show_console=False)
-            found_in_data = success1 and "NOT_FOUND" not in output1
-            
-            # 检测 /home/<username>/ollama/bin/ollama
-            self.log(f"检查路径 2: {home_path}", "INFO")
-            success2, output2, code2 = self.run_ssh_command(f"test -x {home_path} && {home_path} --version 2>&1 || echo 'NOT_FOUND'", show_console=False)
-            found_in_home = success2 and "NOT_FOUND" not in output2
-            
-            # 确定使用的路径（自动检测）
-            if found_in_data:
+            probe_cmd = "; ".join(f"{test} && echo '{key}=YES' || echo '{key}=NO'" for key, test in probes)
+            success_probe, output_probe, _ = self.run_ssh_command(probe_cmd, show_console=False)
+            probe_result = {}
+            if success_probe:
+                probe_result = dict(line.strip().split('=', 1) for line in output_probe.splitlines() if '=' in line)
+            
+            # 优先使用用户自定义的Ollama路径，其次自动检测的路径
+            if probe_result.get("CUSTOM") == "YES":
+                ollama_cmd = custom_ollama_path
+                self.log(f"✓ 使用用户指定的 ollama 路径: {ollama_cmd}", "SUCCESS")
+            elif probe_result.get("DATA") == "YES":
                 ollama_cmd = data_path
                 self.log(f"✓ 在 {data_path} 找到 Ollama", "SUCCESS")
-            elif found_in_home:
+            elif probe_result.get("HOME") == "YES":
                 ollama_cmd = home_path
                 self.log(f"✓ 在 {home_path} 找到 Ollama", "SUCCESS")
             else:
-                # 两个位置都没有，需要检测 /data/ 目录并安装
+                # 两个位置都没有，需要根据 /data/ 目录选择安装位置
                 self.log(f"✗ 在两个位置都未找到 Ollama", "ERROR")
                 
                 # 如果用户指定了自定义路径，使用用户指定的路径进行安装
                 if custom_dir:
-                    install_path = f"{custom_dir.rstrip('/')}/ollama/bin/ollama"
+                    install_path = custom_ollama_path
                     install_base_dir = f"{custom_dir.rstrip('/')}/ollama"
                     self.log(f"使用用户指定的路径进行安装: {install_base_dir}", "INFO")
+                elif probe_result.get("DATAROOT") == "YES":
+                    # 有 /data/ 目录，使用 /data/<username>/ollama/bin/ollama
+                    install_path = data_path
+                    install_base_dir = f"/data/{username}/ollama"
+                    self.log(f"✓ 检测到 /data/ 目录，将安装到: {install_base_dir}", "INFO")
                 else:
-                    # 检测服务器是否有 /data/ 目录
-                    self.log(f"检测服务器目录结构...", "INFO")
-                    success_check, output_check, _ = self.run_ssh_command("test -d /data && echo 'EXISTS' || echo 'NOT_EXISTS'", show_console=False)
-                    output_check_clean = output_check.strip() if output_check else ""
-                    
-                    if success_check and output_check_clean == "EXISTS":
-                        # 有 /data/ 目录，使用 /data/<username>/ollama/bin/ollama
-                        install_path = data_path
-                        install_base_dir = f"/data/{username}/ollama"
-                        self.log(f"✓ 检测到 /data/ 目录，将安装到: {install_base_dir}", "INFO")
-                    else:
-                        # 没有 /data/ 目录，使用 /home/<username>/ollama/bin/ollama
-                        install_path = home_path
-                        install_base_dir = f"/home/{username}/ollama"
-                        self.log(f"✓ 未检测到 /data/ 目录，将安装到: {install_base_dir}", "INFO")
+                    # 没有 /data/ 目录，使用 /home/<username>/ollama/bin/ollama
+                    install_path = home_path
+                    install_base_dir = f"/home/{username}/ollama"
+                    self.log(f"✓ 未检测到 /data/ 目录，将安装到: {install_base_dir}", "INFO")
                 
                 # 弹窗提示安装
                 if messagebox.askyesno(
@@ -4399,6 +5119,7 @@ class ResearchGUI:
             expanded_path = ollama_cmd
             
             _ollama_path = expanded_path
+            self._ollama_path_cache[path_cache_key] = expanded_path
             
             self.log(f"使用检测到的 ollama 路径: {expanded_path}", "INFO")
         else:
@@ -4407,12 +5128,16 @@ class ResearchGUI:
         
         # 首先通过本地端口（SSH隧道）测试服务是否可访问（这是最可靠的判断方式）
         self.log("检查 Ollama 服务是否可访问...")
-        local_port = int(self.local_port_var.get())
         service_accessible = False
+        tags_models = None  # 通过隧道从 /api/tags 获取的模型列表（用于检查模型是否存在）
+        last_probe_ts = None  # 最近一次确认服务可访问的时间（time.monotonic）
         try:
             test_url = f"http://localhost:{local_port}/api/tags"
             response = requests.get(test_url, timeout=3)
             service_accessible = response.status_code == 200
+            if service_accessible:
+                tags_models = parse_tags_model_names(response)
+                last_probe_ts = time.monotonic()
         except:
             service_accessible = False
         
@@ -4423,35 +5148,45 @@ class ResearchGUI:
             self.log("服务不可访问，启动 ollama serve...", "INFO")
             # 使用指定的ollama路径（已在函数开头设置）
             
-            # 使用最简单的启动方式：<ollama_path> serve &
+            # 使用 nohup + setsid 在新会话中后台启动，并断开stdin，
+            # 避免SSH通道关闭时服务收到SIGHUP或通道因stdin未关闭而挂起
             # 如果指定了GPU，使用CUDA_VISIBLE_DEVICES环境变量
             gpu_devices = self.gpu_var.get().strip()
             if gpu_devices:
                 self.log(f"使用GPU设备: {gpu_devices}", "INFO")
                 # 使用CUDA_VISIBLE_DEVICES环境变量指定GPU
-                serve_cmd = f"CUDA_VISIBLE_DEVICES={gpu_devices} {ollama_cmd} serve > /dev/null 2>&1 &"
+                serve_cmd = f"CUDA_VISIBLE_DEVICES={gpu_devices} nohup setsid {ollama_cmd} serve < /dev/null > /dev/null 2>&1 &"
             else:
-                serve_cmd = f"{ollama_cmd} serve > /dev/null 2>&1 &"
+                serve_cmd = f"nohup setsid {ollama_cmd} serve < /dev/null > /dev/null 2>&1 &"
             
             self.log(f"执行: {serve_cmd}", "INFO")
             success, output, code = self.run_ssh_command(serve_cmd)
             
             # 等待服务启动并验证（通过本地端口验证，因为需要通过SSH隧道访问）
             self.log("等待 ollama serve 启动...", "INFO")
-            max_retries = 10
+            max_retries = 12
+            backoff = 0.1  # 指数退避：服务很快就绪时无需等满固定间隔
             for i in range(max_retries):
-                time.sleep(2)  # 每次等待2秒
-                # 通过本地端口（SSH隧道）验证服务是否可访问
-                try:
-                    test_url = f"http://localhost:{local_port}/api/tags"
-                    response = requests.get(test_url, timeout=2)
-                    if response.status_code == 200:
-                        self.log("✓ ollama serve 已启动并验证成功", "SUCCESS")
-                        break
-                except:
-                    pass
+                # 先用TCP连接检测本地端口（远比HTTP请求便宜），端口可连再用HTTP确认服务就绪
+                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(1)
+                    port_open = sock.connect_ex(('127.0.0.1', local_port)) == 0
+                if port_open:
+                    try:
+                        test_url = f"http://localhost:{local_port}/api/tags"
+                        response = requests.get(test_url, timeout=1)
+                        if response.status_code == 200:
+                            service_accessible = True
+                            tags_models = parse_tags_model_names(response)
+                            last_probe_ts = time.monotonic()
+                            self.log("✓ ollama serve 已启动并验证成功", "SUCCESS")
+                            break
+                    except:
+                        pass
                 if i < max_retries - 1:
                     self.log(f"等待服务就绪... ({i+1}/{max_retries})", "INFO")
+                time.sleep(backoff)
+                backoff = min(backoff * 1.7, 2.0)
             else:
                 self.log("⚠ ollama serve 已启动，但验证可能失败，继续尝试...", "WARN")
             
@@ -4459,55 +5194,56 @@ class ResearchGUI:
             if not success:
                 self.log(f"⚠ 启动可能失败: {output}", "WARN")
                 # 检查是否是命令找不到的错误
-                if "command not found" in output.lower() or "not found" in output.lower():
+                if is_command_not_found(output):
                     self.log(f"✗ 错误: 服务器上找不到 ollama 命令", "ERROR")
                     self.log(f"请确保服务器上已安装 Ollama，并且 ollama 命令在 PATH 中", "ERROR")
                     return False
         
         # 检查模型是否存在
         self.log(f"检查模型 {model_name} 是否存在...")
-        # 使用指定的ollama路径获取模型列表
-        success, output, code = self.run_ssh_command(f"{ollama_cmd} list")
-        
-        if not success:
-            # 检查是否是 ollama 命令找不到的错误
-            if "command not found" in output.lower() or "not found" in output.lower():
-                self.log(f"✗ 错误: 服务器上找不到 ollama 命令", "ERROR")
-                self.log(f"请确保服务器上已安装 Ollama，并且 ollama 命令在 PATH 中", "ERROR")
-                self.log(f"错误详情: {output}", "ERROR")
-                return False
-            else:
-                self.log(f"⚠ 无法检查模型列表: {output}", "WARN")
-                # 如果检查失败但不是命令找不到，尝试下载模型
-                self.log(f"尝试下载模型 {model_name}...", "INFO")
-                if not self.pull_model_with_progress(model_name):
-                    self.log("✗ 模型下载失败，无法继续", "ERROR")
-                    return False
+        model_exists = None
+        if tags_models is not None:
+            # 服务可访问时直接使用 /api/tags 的结果，无需再通过SSH执行命令
+            model_exists = any(name == model_name or name.startswith(model_name + ":") for name in tags_models)
         else:
-            # 解析ollama list的输出，检查模型是否存在
-            # ollama list 输出格式：
-            # NAME              ID      SIZE    MODIFIED
-            # model_name        abc123  4.5GB   2 hours ago
-            model_exists = False
-            lines = output.strip().split('\n')
-            if len(lines) > 1:  # 有表头，至少需要2行
-                for line in lines[1:]:  # 跳过表头
-                    parts = line.split()
-                    if parts:
-                        # 第一列是模型名称（可能包含标签，如 model:latest）
-                        listed_model = parts[0]
-                        # 检查精确匹配或前缀匹配（处理标签情况）
-                        if listed_model == model_name or listed_model.startswith(model_name + ":"):
-                            model_exists = True
-                            break
+            # 用 ollama show 只查询这一个模型（无需传输和解析完整模型列表）；
+            # 不支持 show 子命令的旧版本 ollama 退回到 ollama list
+            success, output, code = self.run_ssh_command(
+                f"if {ollama_cmd} show --help >/dev/null 2>&1; then "
+                f"{ollama_cmd} show {model_name} >/dev/null 2>&1 && echo EXISTS || echo MISSING; "
+                f"else {ollama_cmd} list; fi"
+            )
             
-            if model_exists:
-                self.log(f"✓ 模型 {model_name} 已存在", "SUCCESS")
+            if not success:
+                # 检查是否是 ollama 命令找不到的错误
+                if is_command_not_found(output):
+                    self.log(f"✗ 错误: 服务器上找不到 ollama 命令", "ERROR")
+                    self.log(f"请确保服务器上已安装 Ollama，并且 ollama 命令在 PATH 中", "ERROR")
+                    self.log(f"错误详情: {output}", "ERROR")
+                    return False
+                else:
+                    self.log(f"⚠ 无法检查模型列表: {output}", "WARN")
+                    # 如果检查失败但不是命令找不到，尝试下载模型
+                    self.log(f"尝试下载模型 {model_name}...", "INFO")
+                    if not self.pull_model_with_progress(model_name):
+                        self.log("✗ 模型下载失败，无法继续", "ERROR")
+                        return False
             else:
-                self.log(f"模型 {model_name} 不存在，开始下载...", "INFO")
+                show_result = output.strip().splitlines()[-1].strip() if output.strip() else ""
+                if show_result in ("EXISTS", "MISSING"):
+                    model_exists = show_result == "EXISTS"
+                else:
+                    # 解析ollama list的输出，检查模型是否存在（精确匹配或带标签匹配）
+                    model_exists = ollama_list_has_model(output, model_name)
+        
+        if model_exists:
+            self.log(f"✓ 模型 {model_name} 已存在", "SUCCESS")
+        elif model_exists is not None:
+            self.log(f"模型 {model_name} 不存在，开始下载...", "INFO")
+            # 5秒内刚确认过服务可访问时，无需在下载前重复验证
+            if last_probe_ts is None or time.monotonic() - last_probe_ts >= 5.0:
                 # 在下载前再次验证Ollama服务是否可访问（通过本地端口）
                 self.log("下载前验证Ollama服务...", "INFO")
-                local_port = int(self.local_port_var.get())
                 try:
                     test_url = f"http://localhost:{local_port}/api/tags"
                     response = requests.get(test_url, timeout=3)
@@ -4533,10 +5269,10 @@ class ResearchGUI:
                         self.log("✓ Ollama服务已就绪", "SUCCESS")
                 else:
                     self.log("✓ Ollama服务可访问", "SUCCESS")
-                
-                if not self.pull_model_with_progress(model_name):
-                    self.log("✗ 模型下载失败，无法继续", "ERROR")
-                    return False
+            
+            if not self.pull_model_with_progress(model_name):
+                self.log("✗ 模型下载失败，无法继续", "ERROR")
+                return False
         
         # 检查模型是否正在运行
         self.log(f"检查模型 {model_name} 是否正在运行...")
@@ -4545,25 +5281,23 @@ class ResearchGUI:
         if is_running:
             self.log(f"✓ 模型 {model_name} 已在运行", "SUCCESS")
         else:
-            # 停止其他正在运行的模型
-            self.log("检查是否有其他模型正在运行...")
-            ollama_cmd = get_ollama_cmd()
-            if not ollama_cmd:
-                return
+            # 停止其他模型、后台预加载目标模型并回读 ollama ps / 进程列表，合并为一次SSH往返；
+            # 等待3秒再检查，给模型留出出现在 ollama ps 中的时间
+            self.log(f"停止其他运行中的模型并预加载模型 {model_name}...")
             cmd_name = os.path.basename(ollama_cmd)
-            success, output, code = self.run_ssh_command(f"pgrep -f '{ollama_cmd} run' || pgrep -f '{cmd_name} run' | head -1")
-            if success and output.strip():
-                self.log("发现其他模型正在运行，先停止...")
-                self.stop_ollama_model()
-            
-            # 预加载模型
-            self.log(f"预加载模型 {model_name}...")
-            success, output, code = self.run_ssh_command(f"nohup {ollama_cmd} run {model_name} 'test' > /dev/null 2>&1 &")
+            preload_cmd = (
+                f"({ollama_cmd} ps | tail -n +2 | awk '{{print $1}}' | xargs -r -I{{}} {ollama_cmd} stop {{}} ; "
+                f"nohup {ollama_cmd} run {model_name} 'test' < /dev/null > /dev/null 2>&1 &) ; "
+                f"sleep 3 ; {ollama_cmd} ps ; echo __RUN_PIDS__ ; {ollama_run_pids_cmd(cmd_name, model_name)}"
+            )
+            success, output, code = self.run_ssh_command(preload_cmd)
             if success:
-                time.sleep(3)
-                # 验证模型是否成功启动
-                if self.check_model_running(model_name):
+                ps_output, _, pids_output = output.partition("__RUN_PIDS__")
+                # 验证模型是否成功启动：已出现在 ollama ps 中，或 run 进程仍在加载
+                if ollama_list_has_model(ps_output, model_name):
                     self.log(f"✓ 模型 {model_name} 预加载完成", "SUCCESS")
+                elif parse_pid_lines(pids_output):
+                    self.log(f"✓ 模型 {model_name} 正在后台加载", "SUCCESS")
                 else:
                     self.log(f"⚠ 模型 {model_name} 预加载可能失败", "WARN")
             else:
@@ -4581,41 +5315,38 @@ class ResearchGUI:
         
         self.log("测试Ollama连接...")
         
-        for i in range(5):
-            try:
-                test_url = f"{base_url}/api/tags"
-                response = requests.get(test_url, timeout=5)
-                
-                if response.status_code == 200:
-                    self.log("✓ Ollama服务器连接成功", "SUCCESS")
-                    
-                    # 测试模型
-                    self.log(f"测试模型 {model_name}...")
-                    generate_url = f"{base_url}/api/generate"
-                    test_payload = {
-                        "model": model_name,
-                        "prompt": "Hello",
-                        "stream": False
-                    }
-                    
-                    test_response = requests.post(generate_url, json=test_payload, timeout=30)
-                    if test_response.status_code == 200:
-                        self.log(f"✓ 模型 {model_name} 响应正常", "SUCCESS")
-                        return True
-                    else:
-                        self.log(f"⚠ 模型测试失败 (状态码: {test_response.status_code})", "WARN")
-                        
-            except requests.exceptions.ConnectionError:
-                if i < 4:
-                    self.log(f"连接失败，重试 {i+1}/5...", "WARN")
-                    time.sleep(2)
-                else:
-                    self.log("✗ 无法连接到Ollama服务器", "ERROR")
-                    return False
-            except Exception as e:
-                self.log(f"✗ 测试失败: {e}", "ERROR")
-                return False
+        # 使用带重试策略的会话：连接失败时由urllib3按指数退避重试，并复用TCP连接
+        try:
+            response = self._ollama_session.get(f"{base_url}/api/tags", timeout=5)
+        except requests.exceptions.ConnectionError:
+            self.log("✗ 无法连接到Ollama服务器", "ERROR")
+            return False
+        except Exception as e:
+            self.log(f"✗ 测试失败: {e}", "ERROR")
+            return False
         
+        if response.status_code != 200:
+            self.log(f"✗ Ollama服务器响应异常 (状态码: {response.status_code})", "ERROR")
+            return False
+        self.log("✓ Ollama服务器连接成功", "SUCCESS")
+        
+        # 测试模型
+        self.log(f"测试模型 {model_name}...")
+        test_payload = {
+            "model": model_name,
+            "prompt": "Hello",
+            "stream": False
+        }
+        try:
+            test_response = self._ollama_session.post(f"{base_url}/api/generate", json=test_payload, timeout=30)
+        except Exception as e:
+            self.log(f"✗ 测试失败: {e}", "ERROR")
+            return False
+        
+        if test_response.status_code == 200:
+            self.log(f"✓ 模型 {model_name} 响应正常", "SUCCESS")
+            return True
+        self.log(f"⚠ 模型测试失败 (状态码: {test_response.status_code})", "WARN")
         return False
     
     def stop_ollama_model(self):
@@ -4628,20 +5359,9 @@ class ResearchGUI:
             return
         success, output, code = self.run_ssh_command(f"{ollama_cmd} ps")
         if success and output.strip():
-            # 解析 ollama ps 的输出，获取模型名称
-            # ollama ps 输出格式通常是：
-            # NAME              ID      SIZE    MODIFIED
-            # model_name        abc123  4.5GB   2 hours ago
-            lines = output.strip().split('\n')
-            if len(lines) > 1:  # 有表头，至少需要2行
-                models_to_stop = []
-                for line in lines[1:]:  # 跳过表头
-                    parts = line.split()
-                    if parts:
-                        model_name = parts[0]
-                        if model_name and model_name not in models_to_stop:
-                            models_to_stop.append(model_name)
-                
+            # 解析 ollama ps 的输出，获取模型名称（去重并保持顺序）
+            models_to_stop = list(dict.fromkeys(iter_ollama_model_names(output)))
+            if models_to_stop:
                 # 停止所有运行的模型
                 stopped_any = False
                 for model_name in models_to_stop:
@@ -4663,9 +5383,6 @@ class ResearchGUI:
         model_name = get_full_model_name(base_model_name, model_size)
         if model_name:
             self.log(f"尝试停止配置的模型: {model_name}...")
-            ollama_cmd = get_ollama_cmd()
-            if not ollama_cmd:
-                return
             success, output, code = self.run_ssh_command(f"{ollama_cmd} stop {model_name}")
             if success:
                 self.log(f"✓ 已停止模型: {model_name}", "SUCCESS")
@@ -4678,13 +5395,11 @@ class ResearchGUI:
         
         # 方法3: 如果以上都失败，使用旧方法（kill进程）作为后备
         self.log("使用备用方法停止模型...")
-        ollama_cmd = get_ollama_cmd()
-        if not ollama_cmd:
-            return
         cmd_name = os.path.basename(ollama_cmd)
-        success, output, code = self.run_ssh_command(f"pgrep -f '{ollama_cmd} run' || pgrep -f '{cmd_name} run' | head -1")
-        if success and output.strip():
-            pid = output.strip()
+        success, output, code = self.run_ssh_command(f"({ollama_run_pids_cmd(cmd_name)}) | head -1")
+        pids = parse_pid_lines(output) if success else []
+        if pids:
+            pid = pids[0]
             self.log(f"找到运行中的模型进程 PID: {pid}")
             success, output, code = self.run_ssh_command(f"kill {pid} 2>/dev/null && echo 'stopped' || echo 'failed'")
             if success and "stopped" in output:
@@ -4735,24 +5450,10 @@ class ResearchGUI:
             # 从本地上传并安装 Ollama
             self.log("准备从本地上传并安装 Ollama...", "INFO")
             
-            # 获取ollama压缩包路径（优先从资源文件，其次从本地文件）
-            ollama_tgz_path = None
-            
-            # 方法1: 尝试从exe资源中读取（如果打包了）
-            if hasattr(sys, '_MEIPASS'):
-                # PyInstaller打包后的临时目录
-                resource_path = os.path.join(sys._MEIPASS, "ollama-linux-amd64.tgz")
-                if os.path.exists(resource_path):
-                    ollama_tgz_path = resource_path
-                    self.log(f"从exe资源中找到压缩包: {ollama_tgz_path}", "INFO")
-            
-            # 方法2: 尝试从脚本目录读取
-            if not ollama_tgz_path:
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                local_path = os.path.join(script_dir, "ollama-linux-amd64.tgz")
-                if os.path.exists(local_path):
-                    ollama_tgz_path = local_path
-                    self.log(f"从本地文件找到压缩包: {ollama_tgz_path}", "INFO")
+            # 获取ollama压缩包路径（优先从exe资源，其次从脚本目录）
+            ollama_tgz_path = next((path for path in OLLAMA_TGZ_PATHS if os.path.exists(path)), None)
+            if ollama_tgz_path:
+                self.log(f"找到压缩包: {ollama_tgz_path}", "INFO")
             
             # 方法3: 如果都找不到，提示用户选择文件
             if not ollama_tgz_path:
@@ -4769,73 +5470,71 @@ class ResearchGUI:
             
             # 使用paramiko SFTP上传文件
             self.log(f"正在上传文件: {os.path.basename(ollama_tgz_path)}...", "INFO")
+            upload_client = None
             try:
-                import paramiko
-                
-                # 获取SSH连接（复用或新建）
-                client = None
-                temp_client = False
+                # 上传使用单独的SSH连接：下面针对大文件传输的调整只作用于这个连接，
+                # 不影响run_ssh_command和隧道共用的连接，上传结束后随连接一起关闭
+                upload_client = self._connect_ssh_client()
                 
-                if self.ssh_client:
-                    # 复用现有连接
+                transport = upload_client.get_transport()
+                # 大文件传输期间避免频繁重新协商密钥导致传输暂停
+                transport.packetizer.REKEY_BYTES = pow(2, 40)
+                transport.packetizer.REKEY_PACKETS = pow(2, 40)
+                # 关闭Nagle算法并增大套接字缓冲区，让流水线写入的大量数据包不在内核中排队等待
+                # （只作用于这个上传专用的连接）
+                if isinstance(transport.sock, socket.socket):
                     try:
-                        # 测试连接是否有效
-                        transport = self.ssh_client.get_transport()
-                        if transport and transport.is_active():
-                            client = self.ssh_client
-                            self.log("复用现有SSH连接", "INFO")
-                        else:
-                            self.ssh_client = None
-                    except:
-                        self.ssh_client = None
-                
-                if not client:
-                    # 需要新建SSH连接
-                    username = self.username_var.get()
-                    host = self.host_var.get()
-                    ssh_port = int(self.ssh_port_var.get())
-                    password = self.password_var.get()
-                    
-                    self.log("建立新的SSH连接用于文件上传...", "INFO")
-                    client = paramiko.SSHClient()
-                    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                    client.connect(
-                        hostname=host,
-                        port=ssh_port,
-                        username=username,
-                        password=password,
-                        timeout=30,
-                        allow_agent=False,
-                        look_for_keys=False
-                    )
-                    temp_client = True
-                
-                # 创建SFTP客户端
-                sftp = client.open_sftp()
+                        transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                        transport.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SFTP_SOCKET_BUFSIZE)
+                        transport.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SFTP_SOCKET_BUFSIZE)
+                    except OSError:
+                        pass
+                # 创建SFTP客户端（使用更大的通道窗口，提高高延迟链路上的大文件传输吞吐量）
+                sftp = load_paramiko().SFTPClient.from_transport(
+                    transport,
+                    window_size=SFTP_WINDOW_SIZE,
+                    max_packet_size=SFTP_MAX_PACKET_SIZE
+                )
                 
                 # 上传文件到临时位置
                 remote_temp_path = f"/tmp/ollama-linux-amd64.tgz"
                 
-                # 检查远程文件是否已存在（可能是其他用户上传的）
+                # 检查远程文件是否已存在（可能是其他用户上传的，也可能是上次中断留下的不完整文件）
+                file_size = os.path.getsize(ollama_tgz_path)
                 need_upload = True
+                resume_offset = 0  # 断点续传的起始位置
                 try:
-                    sftp.stat(remote_temp_path)
-                    # 文件存在，跳过上传
-                    need_upload = False
-                    self.log(f"检测到服务器临时位置已有文件: {remote_temp_path}，跳过上传", "INFO")
+                    remote_size = sftp.stat(remote_temp_path).st_size
                 except (IOError, OSError):
                     # 文件不存在（IOError/OSError），需要上传
-                    need_upload = True
+                    remote_size = None
                 except Exception as e:
                     # 其他错误，尝试上传
-                    need_upload = True
+                    remote_size = None
                     self.log(f"检查远程文件时出错，将尝试上传: {e}", "WARN")
                 
+                if remote_size is not None and remote_size <= file_size:
+                    # 通过SHA-256确认远程文件与本地文件（或其前缀）一致
+                    success_hash, output_hash, _ = self.run_ssh_command(
+                        f"sha256sum {remote_temp_path} 2>/dev/null | awk '{{print $1}}'",
+                        show_console=False
+                    )
+                    remote_hash = output_hash.strip() if success_hash else ""
+                    if remote_size == file_size:
+                        # 无法计算远程哈希时沿用原逻辑，信任已存在的完整大小文件
+                        if not remote_hash or remote_hash == cached_file_sha256(ollama_tgz_path):
+                            need_upload = False
+                            self.log(f"检测到服务器临时位置已有文件: {remote_temp_path}，跳过上传", "INFO")
+                        else:
+                            self.log("服务器临时位置的文件与本地不一致，将重新上传", "WARN")
+                    elif remote_hash and remote_hash == file_sha256(ollama_tgz_path, remote_size):
+                        resume_offset = remote_size
+                        self.log(f"检测到未完成的上传（{remote_size / 1024 / 1024:.2f} MB），将断点续传", "INFO")
+                
                 if need_upload:
                     self.log(f"上传到服务器临时位置: {remote_temp_path}", "INFO")
                     
                     # 显示上传进度
-                    file_size = os.path.getsize(ollama_tgz_path)
                     self.log(f"文件大小: {file_size / 1024 / 1024:.2f} MB", "INFO")
                     
                     # 创建上传进度条窗口
@@ -4868,63 +5567,48 @@ class ResearchGUI:
                     )
                     progress_label.pack(pady=5)
                     
-                    # 用于中断上传的异常类
-                    class UploadInterrupted(Exception):
-                        pass
-                    
-                    upload_interrupted = False  # 用于标记是否中断
-                    last_percent = -1  # 记录上次显示的百分比，避免频繁更新
+                    # 上传进度回调（绑定方法，按字节节流）；中断由Tk主线程轮询检测
+                    progress = _UploadProgress(self, sftp, progress_var, progress_label)
+                    self.root.after(200, progress.watch_cancel)
                     
-                    def progress_callback(transferred, total):
-                        nonlocal upload_interrupted, last_percent
-                        
-                        # 检查是否被中断
-                        if not self.is_downloading:
-                            upload_interrupted = True
-                            # 尝试关闭SFTP连接以中断上传
-                            try:
-                                sftp.close()
-                            except:
-                                pass
-                            raise UploadInterrupted("上传已中断")
-                        
-                        percent = (transferred / total) * 100
-                        # 实时更新进度条（每1%更新一次，避免过于频繁）
-                        current_percent = int(percent)
-                        if current_percent != last_percent:
-                            progress_var.set(percent)
-                            progress_label.config(
-                                text=f"{percent:.1f}% ({transferred / 1024 / 1024:.2f} MB / {total / 1024 / 1024:.2f} MB)"
-                            )
-                            progress_window.update_idletasks()
-                            last_percent = current_percent
-                    
-                    # 上传文件（在try-except中捕获中断异常）
+                    # 上传文件（中断时SFTP连接被关闭，put会抛出异常）
                     try:
-                        sftp.put(ollama_tgz_path, remote_temp_path, callback=progress_callback)
-                    except (UploadInterrupted, Exception) as e:
+                        if resume_offset:
+                            # 断点续传：从远程已有的长度处继续追加
+                            with open(ollama_tgz_path, 'rb') as local_file, sftp.open(remote_temp_path, 'ab') as remote_file:
+                                # 流水线写入：不逐块等待服务器确认（与sftp.put内部做法相同），错误在关闭文件时报告
+                                remote_file.set_pipelined(True)
+                                local_file.seek(resume_offset)
+                                transferred = resume_offset
+                                while True:
+                                    chunk = local_file.read(32768)
+                                    if not chunk:
+                                        break
+                                    remote_file.write(chunk)
+                                    transferred += len(chunk)
+                                    progress.cb(transferred, file_size)
+                        else:
+                            sftp.put(ollama_tgz_path, remote_temp_path, callback=progress.cb)
+                    except Exception:
                         # 关闭进度条窗口
                         try:
                             progress_window.destroy()
                         except:
                             pass
                         
-                        if upload_interrupted or not self.is_downloading:
+                        if not self.is_downloading:
                             self.log("上传已中断", "WARN")
                             try:
                                 sftp.close()
                             except:
                                 pass
-                            if temp_client:
-                                try:
-                                    client.close()
-                                except:
-                                    pass
                             self.is_downloading = False
                             return False
                         else:
                             # 其他异常，重新抛出
                             raise
+                    finally:
+                        progress.finished = True
                     
                     # 关闭进度条窗口
                     try:
@@ -4936,9 +5620,6 @@ class ResearchGUI:
                 
                 sftp.close()
                 
-                if temp_client:
-                    client.close()
-                
                 # 解压并安装
                 self.log("正在解压并安装...", "INFO")
                 # 如果文件是我们上传的，解压后删除；如果是已存在的文件，保留给其他用户使用
@@ -4958,6 +5639,12 @@ class ResearchGUI:
                 self.log(traceback.format_exc()[:500], "ERROR")
                 self.is_downloading = False
                 return False
+            finally:
+                if upload_client:
+                    try:
+                        upload_client.close()
+                    except:
+                        pass
             
             # 验证安装（检查 bin/ollama 是否存在）
             verify_path = f"{install_base_dir}/bin/ollama"
@@ -4990,7 +5677,9 @@ class ResearchGUI:
             except:
                 pass
             self.ssh_client = None
-        
+        self._tunnel_verified_at = None
+        # 断开连接后路径缓存不再可信
+        self._ollama_path_cache.clear()
         
         # 释放本地端口
         try:
@@ -5034,159 +5723,140 @@ class ResearchGUI:
         except Exception as e:
             self.log(f"清理资源时出错: {e}", "WARN")
     
-    def analyze_row(self, row_data, prompt_template, idx, total, api_delay):
-        """分析表格中的一行数据"""
-        try:
-            # 检查是否已停止
+    @property
+    def is_running(self):
+        """是否正在运行（未设置停止事件）"""
+        return not self._stop_event.is_set()
+    
+    @is_running.setter
+    def is_running(self, value):
+        if value:
+            self._stop_event.clear()
+        else:
+            self._stop_event.set()
+    
+    def wait_api_delay(self, api_delay):
+        """API调用前的小延迟（停止时 _stop_event 被置位，等待立即结束）"""
+        if api_delay > 0:
+            self._stop_event.wait(api_delay)
+    
+    def request_model_completion(self, prompt):
+        """按当前API模式发送prompt并返回响应文本（已停止时返回None）"""
+        # 根据模式选择调用不同的API
+        cfg = self._run_config
+        # 请求体中只有prompt随行变化：直接拼接预先序列化好的前后两段
+        body = cfg.payload_prefix + json_dumps_bytes(prompt) + cfg.payload_suffix
+        
+        if cfg.api_mode == 'online':
+            # 在线API调用
+            # 再次检查是否已停止（在发送请求前）
             if not self.is_running:
                 return None
             
-            # 替换prompt中的列名占位符
-            prompt = prompt_template
-            for col_name, value in row_data.items():
-                placeholder = f"{{{col_name}}}"
-                prompt = prompt.replace(placeholder, str(value) if value else "")
-            
-            # API调用前的小延迟（可中断）
-            if api_delay > 0:
-                # 分段sleep，以便能够快速响应停止信号
-                sleep_interval = 0.1
-                slept = 0
-                while slept < api_delay and self.is_running:
-                    time.sleep(min(sleep_interval, api_delay - slept))
-                    slept += sleep_interval
-            
-            # 再次检查是否已停止
+            response = _global_session.post(cfg.api_url, data=body, headers=cfg.headers, timeout=120)
+            response.raise_for_status()
+            
+            # 请求完成后再次检查是否已停止
             if not self.is_running:
                 return None
             
-            # 根据模式选择调用不同的API
-            api_mode = _global_client_config.get('api_mode', 'ollama')
-            
-            if api_mode == 'online':
-                # 在线API调用
-                api_url = _global_client_config.get('api_url')
-                api_key = _global_client_config.get('api_key')
-                model_name = _global_client_config.get('model_name')
-                provider = _global_client_config.get('provider', 'siliconflow')
-                temperature = float(_global_client_config.get('temperature', 0.7))
-                max_tokens = int(_global_client_config.get('max_tokens', 4096))
-                top_p = float(_global_client_config.get('top_p', 0.7))
-                enable_thinking = _global_client_config.get('enable_thinking', 'False').lower() == 'true'
-                thinking_budget = int(_global_client_config.get('thinking_budget', 4096))
-                
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}"
-                }
-                
-                # 根据提供商构建不同的请求体
-                if provider == "siliconflow":
-                    # 硅基流动API格式
-                    payload = {
-                        "model": model_name,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "stream": False,
-                        "max_tokens": max_tokens,
-                        "enable_thinking": enable_thinking,
-                        "thinking_budget": thinking_budget,
-                        "min_p": 0.05,
-                        "stop": None,
-                        "temperature": temperature,
-                        "top_p": top_p,
-                        "top_k": 50,
-                        "frequency_penalty": 0.5,
-                        "n": 1,
-                        "response_format": {"type": "json_object"}
-                    }
-                else:
-                    # 通用格式（custom或siliconflow）
-                    payload = {
-                        "model": model_name,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": temperature,
-                        "max_tokens": max_tokens,
-                        "top_p": top_p
-                    }
-                    if enable_thinking and thinking_budget:
-                        payload["thinking_budget"] = thinking_budget
-                
-                # 再次检查是否已停止（在发送请求前）
-                if not self.is_running:
-                    return None
-                
-                response = requests.post(api_url, json=payload, headers=headers, timeout=120)
-                response.raise_for_status()
-                
-                # 请求完成后再次检查是否已停止
-                if not self.is_running:
-                    return None
-                
-                result_data = response.json()
-                # 记录请求时间和token数
-                current_time = time.time()
-                self.request_times.append(current_time)
-                
-                # 提取token使用量（只使用total_tokens字段）
-                tokens_used = 0
-                if "usage" in result_data:
-                    usage = result_data["usage"]
-                    if "total_tokens" in usage:
-                        tokens_used = usage["total_tokens"]
-                
-                if tokens_used > 0:
-                    self.total_tokens_count += tokens_used
-                    # 记录每分钟的token数（用于计算TPM）
-                    self.token_counts.append((current_time, tokens_used))
-                
-                # OpenAI格式的响应
-                if "choices" in result_data and len(result_data["choices"]) > 0:
-                    result_text = result_data["choices"][0]["message"]["content"].strip()
-                else:
-                    result_text = ""
-            else:
-                # Ollama API调用（原有逻辑）
-                local_port = _global_client_config.get('local_port', int(self.local_port_var.get()))
-                model_name = _global_client_config.get('model_name', self.model_var.get())
-                api_url = f"http://localhost:{local_port}/api/generate"
-                payload = {
-                    "model": model_name,
-                    "prompt": prompt,
-                    "stream": False
-                }
-                
-                # 再次检查是否已停止（在发送请求前）
-                if not self.is_running:
-                    return None
-                
-                response = requests.post(api_url, json=payload, timeout=120)
+            # OpenAI格式的响应：只取 choices[0].message.content 和 usage.total_tokens
+            result_text, tokens_used = extract_chat_completion(response.content)
+            
+            # 记录请求时间和token数
+            current_time = time.time()
+            self.request_times.append(current_time)
+            
+            if tokens_used > 0:
+                self.total_tokens_count += tokens_used
+                # 记录每分钟的token数（用于计算TPM）
+                self.token_counts.append((current_time, tokens_used))
+        else:
+            # Ollama API调用（原有逻辑）
+            
+            # 再次检查是否已停止（在发送请求前）
+            if not self.is_running:
+                return None
+            
+            # 流式读取NDJSON：生成过程中逐行接收片段，超时按片段间隔计算，停止时可中途断开；
+            # 最后一行（done=true）带有 prompt_eval_count / eval_count 统计
+            pieces = []
+            result_data = {}
+            with _global_session.post(cfg.api_url, data=body, headers=cfg.headers,
+                                      stream=True, timeout=120) as response:
                 response.raise_for_status()
-                
-                # 请求完成后再次检查是否已停止
-                if not self.is_running:
-                    return None
-                
-                result_data = response.json()
-                result_text = result_data.get("response", "").strip()
-                
-                # 记录请求时间（Ollama模式）
-                current_time = time.time()
-                self.request_times.append(current_time)
-                
-                # 提取token使用量（优先使用total_tokens，否则使用prompt_eval_count + eval_count）
-                tokens_used = 0
-                if "usage" in result_data and "total_tokens" in result_data["usage"]:
-                    tokens_used = result_data["usage"]["total_tokens"]
-                elif "prompt_eval_count" in result_data and "eval_count" in result_data:
-                    tokens_used = result_data.get("prompt_eval_count", 0) + result_data.get("eval_count", 0)
-                
-                if tokens_used > 0:
-                    self.total_tokens_count += tokens_used
-                    self.token_counts.append((current_time, tokens_used))
+                for line in response.iter_lines(chunk_size=64 * 1024):
+                    # 接收过程中检查是否已停止
+                    if not self.is_running:
+                        return None
+                    if not line:
+                        continue
+                    result_data = json_loads(line)
+                    if "error" in result_data:
+                        raise RuntimeError(f"Ollama返回错误: {result_data['error']}")
+                    pieces.append(result_data.get("response", ""))
+                    if result_data.get("done"):
+                        break
+            
+            # 请求完成后再次检查是否已停止
+            if not self.is_running:
+                return None
+            
+            result_text = "".join(pieces).strip()
+            
+            # 记录请求时间（Ollama模式）
+            current_time = time.time()
+            self.request_times.append(current_time)
+            
+            # 提取token使用量（优先使用total_tokens，否则使用prompt_eval_count + eval_count）
+            tokens_used = 0
+            if "usage" in result_data and "total_tokens" in result_data["usage"]:
+                tokens_used = result_data["usage"]["total_tokens"]
+            elif "prompt_eval_count" in result_data and "eval_count" in result_data:
+                tokens_used = result_data.get("prompt_eval_count", 0) + result_data.get("eval_count", 0)
+            
+            if tokens_used > 0:
+                self.total_tokens_count += tokens_used
+                self.token_counts.append((current_time, tokens_used))
+        
+        return result_text
+    
+    def fetch_row(self, row_data, substitute, idx, total, api_delay):
+        """请求一行数据的分析结果（只做网络请求），返回原始响应文本（已停止时返回None）"""
+        # 检查是否已停止
+        if not self.is_running:
+            return None
+        
+        # 替换prompt中的列名占位符
+        prompt = substitute(row_data)
+        
+        # API调用前的小延迟（可中断）
+        self.wait_api_delay(api_delay)
+        
+        # 再次检查是否已停止
+        if not self.is_running:
+            return None
+        
+        return self.request_model_completion(prompt)
+    
+    def analyze_row(self, row_data, substitute, idx, total, api_delay):
+        """分析表格中的一行数据（在当前线程中请求并解析）"""
+        try:
+            result_text = self.fetch_row(row_data, substitute, idx, total, api_delay)
+        except Exception as e:
+            self.log(f"[{idx}/{total}] 分析出错: {e}", "ERROR")
+            return {
+                "row_index": idx,
+                "original_data": row_data,
+                "analysis_result": {"error": str(e)}
+            }
+        return self.parse_row(result_text, row_data, idx, total)
+    
+    def parse_row(self, result_text, row_data, idx, total):
+        """解析一行数据的模型响应文本（提取并修复JSON），result_text为None表示已停止"""
+        try:
+            if result_text is None:
+                return None
             
             # 如果返回空字符串，直接跳过这一行
             if not result_text or result_text == "":
@@ -5194,10 +5864,7 @@ class ResearchGUI:
                 return None  # 返回None表示跳过
             
             # 清理响应文本，提取JSON部分
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
+            result_text = strip_code_fence(result_text)
             
             # 再次检查是否为空（清理后可能为空）
             if not result_text or result_text == "":
@@ -5206,145 +5873,12 @@ class ResearchGUI:
             
             # 尝试解析JSON，处理转义字符问题
             try:
-                result = json.loads(result_text)
+                result = json_loads(result_text)
             except json.JSONDecodeError as e:
-                # 如果解析失败，尝试修复常见的转义问题
+                # 如果解析失败，尝试修复常见的问题
                 try:
-                    import re
-                    # 提取JSON对象（找到第一个{到最后一个}）
-                    start_idx = result_text.find('{')
-                    end_idx = result_text.rfind('}')
-                    if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                        json_str = result_text[start_idx:end_idx+1]
-                        
-                        # 处理双重花括号的情况（如 {{ "title": "..." }}）
-                        json_str_stripped = json_str.strip()
-                        if json_str_stripped.startswith('{{') and json_str_stripped.endswith('}}'):
-                            # 找到第二个 {（内层JSON的开始位置）
-                            first_brace = json_str_stripped.find('{')
-                            second_brace = json_str_stripped.find('{', first_brace + 1)
-                            
-                            if second_brace != -1:
-                                # 从第二个 { 开始，使用括号匹配找到匹配的 }
-                                brace_count = 0
-                                inner_end = -1
-                                in_string = False
-                                escape_next = False
-                                
-                                # 从第二个 { 开始，找到匹配的 }（考虑字符串内的花括号）
-                                for i in range(second_brace, len(json_str_stripped)):
-                                    char = json_str_stripped[i]
-                                    
-                                    if escape_next:
-                                        escape_next = False
-                                        continue
-                                    
-                                    if char == '\\' and in_string:
-                                        escape_next = True
-                                        continue
-                                    
-                                    if char == '"' and not escape_next:
-                                        in_string = not in_string
-                                        continue
-                                    
-                                    if not in_string:
-                                        if char == '{':
-                                            brace_count += 1
-                                        elif char == '}':
-                                            brace_count -= 1
-                                            if brace_count == 0:
-                                                inner_end = i
-                                                break
-                                
-                                # 如果找到了匹配的 }，提取内层JSON
-                                if inner_end != -1:
-                                    json_str = json_str_stripped[second_brace:inner_end+1]
-                                else:
-                                    # 如果找不到匹配的 }，尝试找到倒数第二个 }
-                                    last_brace = json_str_stripped.rfind('}')
-                                    second_last_brace = json_str_stripped.rfind('}', 0, last_brace)
-                                    if second_last_brace != -1 and second_last_brace > second_brace:
-                                        json_str = json_str_stripped[second_brace:second_last_brace+1]
-                                    else:
-                                        # 最后的方法：去掉最外层的一对花括号
-                                        json_str = json_str_stripped[1:-1].strip()
-                            else:
-                                # 如果找不到第二个 {，直接去掉最外层的一对花括号
-                                json_str = json_str_stripped[1:-1].strip()
-                    else:
-                        json_str = result_text
-                    
-                    # 修复未转义的反斜杠
-                    # 使用状态机正确处理字符串内外的反斜杠
-                    def fix_backslashes(text):
-                        result = []
-                        i = 0
-                        in_string = False
-                        escape_next = False
-                        
-                        while i < len(text):
-                            char = text[i]
-                            
-                            if escape_next:
-                                # 前一个字符是反斜杠，当前字符需要检查
-                                if char in 'nrt"\\/':
-                                    # 有效转义序列
-                                    result.append('\\' + char)
-                                elif char == 'u' and i + 4 < len(text):
-                                    # Unicode转义 \uXXXX
-                                    unicode_part = text[i:i+5]
-                                    if all(c in '0123456789abcdefABCDEF' for c in unicode_part[1:]):
-                                        result.append('\\' + unicode_part)
-                                        i += 4
-                                    else:
-                                        # 无效Unicode，转义反斜杠
-                                        result.append('\\\\')
-                                        result.append(char)
-                                else:
-                                    # 无效转义，转义反斜杠
-                                    result.append('\\\\')
-                                    result.append(char)
-                                escape_next = False
-                                i += 1
-                            elif char == '\\':
-                                if in_string:
-                                    escape_next = True
-                                    i += 1
-                                else:
-                                    result.append(char)
-                                    i += 1
-                            elif char == '"':
-                                # 只有在非转义状态下才切换字符串状态
-                                in_string = not in_string
-                                result.append(char)
-                                i += 1
-                            else:
-                                result.append(char)
-                                i += 1
-                        
-                        # 处理末尾未完成的反斜杠
-                        if escape_next:
-                            result.append('\\\\')
-                        
-                        return ''.join(result)
-                    
-                    fixed_json = fix_backslashes(json_str)
-                    # 再次检查是否还有双重花括号
-                    fixed_json_stripped = fixed_json.strip()
-                    if fixed_json_stripped.startswith('{{') and fixed_json_stripped.endswith('}}'):
-                        # 如果还有双重花括号，再次处理
-                        # 找到第二个 { 和倒数第二个 }
-                        second_brace = fixed_json_stripped.find('{', fixed_json_stripped.find('{') + 1)
-                        last_brace = fixed_json_stripped.rfind('}')
-                        second_last_brace = fixed_json_stripped.rfind('}', 0, last_brace)
-                        if second_brace != -1 and second_last_brace != -1 and second_last_brace > second_brace:
-                            fixed_json = fixed_json_stripped[second_brace:second_last_brace+1]
-                        else:
-                            # 如果找不到，直接去掉最外层的一对花括号
-                            fixed_json = fixed_json_stripped[1:-1].strip()
-                    
-                    result = json.loads(fixed_json)
-                    self.log(f"[{idx}/{total}] JSON解析已修复转义问题", "INFO")
+                    result = repair_model_json(result_text)
+                    self.log(f"[{idx}/{total}] JSON解析已修复", "INFO")
                 except Exception as e2:
                     # 如果修复也失败，记录详细错误信息并返回错误结果
                     self.log(f"[{idx}/{total}] JSON解析错误: {e}", "ERROR")
@@ -5379,6 +5913,58 @@ class ResearchGUI:
                 "analysis_result": {"error": str(e)}
             }
     
+    def analyze_batch(self, rows_chunk, substitute, total, api_delay):
+        """将多行数据合并为一次请求进行分析
+        
+        rows_chunk 为 [(idx, row_data), ...]，返回 [(idx, row_data, result), ...]。
+        模型需返回 {"results": [{"row_index": 序号, "analysis_result": {...}}, ...]}，
+        未能解析或缺失的行回退到 analyze_row 逐行分析。
+        """
+        if not self.is_running:
+            return []
+        
+        # 每行先按模板生成各自的prompt，再编号拼接
+        parts = [
+            f"以下共有 {len(rows_chunk)} 条相互独立的数据，请分别按照每条数据各自的要求进行分析。\n"
+            f"只返回一个JSON对象，格式为 {{\"results\": [{{\"row_index\": 序号, \"analysis_result\": "
+            f"该条数据要求返回的JSON对象}}, ...]}}，每条数据对应一项，不要输出其他内容。"
+        ]
+        for idx, row_data in rows_chunk:
+            parts.append(f"### 第 {idx} 条（row_index={idx}）\n{substitute(row_data)}")
+        prompt = "\n\n".join(parts)
+        
+        self.wait_api_delay(api_delay)
+        if not self.is_running:
+            return []
+        
+        analyzed = {}
+        try:
+            result_text = self.request_model_completion(prompt)
+            if result_text is None:
+                return []
+            parsed = json_loads(strip_code_fence(result_text.strip()))
+            entries = parsed.get("results") if isinstance(parsed, dict) else parsed
+            for entry in entries or []:
+                if isinstance(entry, dict) and isinstance(entry.get("analysis_result"), dict):
+                    row_index = entry.get("row_index")
+                    if isinstance(row_index, str) and row_index.isdigit():
+                        row_index = int(row_index)
+                    analyzed[row_index] = entry["analysis_result"]
+        except Exception as e:
+            self.log(f"[批量 {rows_chunk[0][0]}-{rows_chunk[-1][0]}/{total}] 合并请求失败，改为逐行分析: {e}", "WARN")
+        
+        results = []
+        for idx, row_data in rows_chunk:
+            if idx in analyzed:
+                result = {"row_index": idx, "original_data": row_data, "analysis_result": analyzed[idx]}
+            elif self.is_running:
+                # 回退：该行单独请求
+                result = self.analyze_row(row_data, substitute, idx, total, api_delay)
+            else:
+                break
+            results.append((idx, row_data, result))
+        return results
+    
     def on_monitor_enabled_changed(self):
         """监控开关改变时的回调"""
         enabled = self.monitor_enabled_var.get()
@@ -5405,27 +5991,33 @@ class ResearchGUI:
             
             elapsed_time = current_time - self.monitor_start_time
             
-            # 如果运行时间不足1分钟，使用实际运行时间计算；否则使用过去1分钟的数据
+            # 从滑动窗口头部淘汰1分钟之前的数据（时间戳单调递增，只需检查队首）
+            one_minute_ago = current_time - 60
+            request_times = self.request_times
+            while request_times and request_times[0] <= one_minute_ago:
+                request_times.popleft()
+                self.expired_request_count += 1
+            token_counts = self.token_counts
+            while token_counts and token_counts[0][0] <= one_minute_ago:
+                self.expired_token_count += token_counts.popleft()[1]
+            
+            # 窗口内的请求数和token数（token数由总数减去已淘汰部分得到，无需逐项求和）
+            window_requests = len(request_times)
+            window_tokens = self.total_tokens_count - self.expired_token_count
+            
+            # 如果运行时间不足1分钟，使用实际运行时间按比例换算到每分钟；否则直接使用过去1分钟的数据
             if elapsed_time < 60 and elapsed_time > 0:
-                # 使用实际运行时间计算RPM和TPM
-                all_requests = len(self.request_times)
-                all_tokens = sum(tokens for t, tokens in self.token_counts)
-                # 按比例换算到每分钟
-                rpm = int(all_requests / elapsed_time * 60) if elapsed_time > 0 else 0
-                tpm = int(all_tokens / elapsed_time * 60) if elapsed_time > 0 else 0
+                rpm = int(window_requests / elapsed_time * 60)
+                tpm = int(window_tokens / elapsed_time * 60)
             else:
-                # 运行时间超过1分钟，使用过去1分钟内的数据
-                one_minute_ago = current_time - 60
-                recent_requests = [t for t in self.request_times if t > one_minute_ago]
-                rpm = len(recent_requests)
-                
-                recent_tokens = sum(tokens for t, tokens in self.token_counts if t > one_minute_ago)
-                tpm = recent_tokens
+                rpm = window_requests
+                tpm = window_tokens
             
             # 计算平均每个prompt的token数
             avg_tokens = 0
-            if len(self.request_times) > 0:
-                avg_tokens = int(self.total_tokens_count / len(self.request_times))
+            total_requests = window_requests + self.expired_request_count
+            if total_requests > 0:
+                avg_tokens = int(self.total_tokens_count / total_requests)
             
             # 更新显示
             self.rpm_var.set(str(rpm))
@@ -5461,11 +6053,6 @@ class ResearchGUI:
             except:
                 pass
             
-            # 清理过期的数据（保留最近2分钟的数据）
-            two_minutes_ago = current_time - 120
-            self.request_times = [t for t in self.request_times if t > two_minutes_ago]
-            self.token_counts = [(t, tokens) for t, tokens in self.token_counts if t > two_minutes_ago]
-            
         except Exception as e:
             pass  # 静默失败，避免影响主流程
         
@@ -5473,11 +6060,53 @@ class ResearchGUI:
         if self.is_running:
             self.root.after(self.monitor_update_interval, self.update_monitor)
     
+    def drain_result_log(self, reschedule=True):
+        """输出结果日志队列中的全部消息及最新的进度（合并为一次插入）；reschedule为True且仍在运行时50ms后再次执行"""
+        # 在Tk主线程中先输出后台线程通过log()缓冲的日志，保持先后顺序
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        if on_main_thread:
+            self.flush_logs()
+        lines = []
+        while True:
+            try:
+                message, level = self.result_log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if log_enabled(level):
+                lines.append(self.format_log_line(message, level))
+        # 进度采样只输出最新的一条
+        sample = None
+        while True:
+            try:
+                sample = self._progress_q.get_nowait()
+            except queue.Empty:
+                break
+        if sample is not None and log_enabled("INFO"):
+            completed, total_rows, elapsed = sample
+            rate = completed / elapsed if elapsed > 0 else 0
+            remaining = (total_rows - completed) / rate if rate > 0 else 0
+            progress = completed / total_rows * 100
+            lines.append(self.format_log_line(f"\n进度: {completed}/{total_rows} ({progress:.1f}%) | "
+                                              f"已用时: {elapsed:.1f}s | 速度: {rate:.2f}行/s | 预计剩余: {remaining:.1f}s\n", "INFO"))
+        if lines:
+            if not on_main_thread:
+                # 从后台线程调用时交给log()的缓冲，由Tk主线程输出
+                self._log_q.append("".join(lines))
+            else:
+                try:
+                    self.append_log_text("".join(lines))
+                except Exception:
+                    pass
+        if reschedule and self.is_running:
+            self.root.after(50, self.drain_result_log)
+    
     def reset_monitor(self):
         """重置监控数据"""
-        self.request_times = []
-        self.token_counts = []
+        self.request_times = deque()
+        self.token_counts = deque()
         self.total_tokens_count = 0
+        self.expired_request_count = 0
+        self.expired_token_count = 0
         self.monitor_start_time = time.time()  # 记录开始时间
         self.rpm_var.set("0")
         self.tpm_var.set("0")
@@ -5497,6 +6126,10 @@ class ResearchGUI:
         table_path = self.table_var.get()
         api_delay = float(self.api_delay_var.get() or "0.5")
         max_workers = int(self.max_workers_var.get() or "8")
+        # 连接池大小与并发线程数匹配，保证每个线程都能复用自己的连接
+        mount_analysis_pool(max_workers)
+        # 每次请求合并的行数（1表示逐行请求）
+        rows_per_request = max(1, int(self.rows_per_request_var.get() or "1"))
         
         # 根据模式获取不同的配置
         api_mode = self.api_mode_var.get()
@@ -5515,7 +6148,7 @@ class ResearchGUI:
             return False
         
         # 读取prompt模板
-        prompt_template = self.prompt_text.get(1.0, tk.END).strip()
+        prompt_template = self.get_prompt_template()
         if not prompt_template:
             self.log("✗ Prompt不能为空", "ERROR")
             return False
@@ -5533,143 +6166,187 @@ class ResearchGUI:
                 with open(table_path, 'r', encoding='utf-8') as f:
                     reader = csv.DictReader(f)
                     rows = list(reader)
-            else:
-                # Excel文件：第一行是列名，skiprows=1跳过第一行
+            elif table_path.lower().endswith('.xls'):
+                # 旧版Excel文件（openpyxl不支持），仍用pandas读取：skiprows=1跳过第一行
                 import pandas as pd
-                df = pd.read_excel(table_path, skiprows=1)
+                df = pd.read_excel(table_path, skiprows=skip_rows)
                 rows = df.to_dict('records')
+            else:
+                # Excel文件：用openpyxl只读模式逐行读取，不构建DataFrame
+                rows = list(iter_excel_rows(table_path, skip_rows))
             
             total_rows = len(rows)
             self.log(f"共 {total_rows} 行数据待处理，使用 {max_workers} 个并发线程，API延迟: {api_delay}秒")
+            if rows_per_request > 1:
+                self.log(f"每次请求合并 {rows_per_request} 行数据")
             
-            # 设置全局配置，供analyze_row使用
-            global _global_client_config
+            # 本次运行不变的API配置：一次性完成类型转换并预先构建请求头，供各行请求直接使用
             api_mode = self.api_mode_var.get()
             
             if api_mode == "online":
-                _global_client_config = {
-                    'api_mode': 'online',
-                    'api_url': self.online_api_url_var.get().strip(),
-                    'api_key': self.online_api_key_var.get().strip(),
-                    'model_name': self.online_model_var.get().strip(),
-                    'provider': self.online_api_provider_var.get(),
-                    'temperature': float(self.online_api_temperature_var.get() or "0.7"),
-                    'max_tokens': int(self.online_api_max_tokens_var.get() or "4096"),
-                    'top_p': float(self.online_api_top_p_var.get() or "0.7"),
-                    'enable_thinking': self.online_api_enable_thinking_var.get(),
-                    'thinking_budget': int(self.online_api_thinking_budget_var.get() or "4096")
-                }
+                api_key = self.online_api_key_var.get().strip()
+                self._run_config = RunConfig(
+                    api_mode='online',
+                    api_url=self.online_api_url_var.get().strip(),
+                    model_name=self.online_model_var.get().strip(),
+                    headers={
+                        "Content-Type": "application/json",
+                        "Authorization": f"Bearer {api_key}"
+                    },
+                    provider=self.online_api_provider_var.get(),
+                    temperature=float(self.online_api_temperature_var.get() or "0.7"),
+                    max_tokens=int(self.online_api_max_tokens_var.get() or "4096"),
+                    top_p=float(self.online_api_top_p_var.get() or "0.7"),
+                    enable_thinking=self.online_api_enable_thinking_var.get().lower() == 'true',
+                    thinking_budget=int(self.online_api_thinking_budget_var.get() or "4096")
+                )
             else:
                 # Ollama模式需要local_port和model_name
                 local_port = int(self.local_port_var.get())
                 base_model_name = self.model_var.get()
                 model_size = self.model_size_var.get()
                 model_name = get_full_model_name(base_model_name, model_size)
-                _global_client_config = {
-                    'api_mode': 'ollama',
-                    'local_port': local_port,
-                    'model_name': model_name  # 已经包含大小信息（如果指定了）
-                }
+                self._run_config = RunConfig(
+                    api_mode='ollama',
+                    api_url=f"http://localhost:{local_port}/api/generate",
+                    model_name=model_name,  # 已经包含大小信息（如果指定了）
+                    headers={"Content-Type": "application/json"}
+                )
+            payload_prefix, payload_suffix = split_payload_template(self._run_config)
+            self._run_config = self._run_config._replace(payload_prefix=payload_prefix, payload_suffix=payload_suffix)
             
-            all_results = []
-            completed = 0  # 使用锁保护的计数器
+            all_results = [None] * total_rows  # 按行号存放结果（第idx行存于idx-1），报告顺序与输入表格一致
+            completed = 0
             start_time = time.time()
             
+            # 逐行结果日志放入队列，由Tk主线程每50ms批量输出；被LOG_LEVEL过滤的日志不做格式化
+            log_queue = self.result_log_queue
+            log_skipped = log_enabled("INFO")
+            log_processed = log_enabled("SUCCESS")
+            
+            def row_title(idx, row):
+                return str(row.get("name", "") or row.get("title", "") or f"第{idx}行")[:80]
+            
+            self.root.after(50, self.drain_result_log)
+            
+            # 预编译prompt模板（每行只做一次拼接，不再逐列对整个prompt做replace）
+            substitute = compile_prompt_template(prompt_template)
+            
             # 使用线程池并发处理
             executor = ThreadPoolExecutor(max_workers=max_workers)
+            self._current_executor = executor
+            self._executor_closed = False
             try:
-                # 提交所有任务
-                future_to_row = {
-                    executor.submit(self.analyze_row, row, prompt_template, idx, total_rows, api_delay): (idx, row)
-                    for idx, row in enumerate(rows, 1)
-                }
+                # 按组提交任务（逐行模式下每组只有一行，只提交网络请求），在途任务数限制为并发数的2倍：
+                # 每完成一个再补充提交，避免一开始就为所有行创建Future
+                indexed_rows = list(enumerate(rows, 1))
+                chunks = (indexed_rows[start:start + rows_per_request] for start in range(0, total_rows, rows_per_request))
+                max_pending = 2 * max_workers
+                pending = {}  # future -> 该任务对应的 [(idx, row), ...]
+                
+                def submit_more():
+                    while len(pending) < max_pending and self.is_running:
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        if rows_per_request > 1:
+                            future = executor.submit(self.analyze_batch, chunk, substitute, total_rows, api_delay)
+                        else:
+                            idx, row = chunk[0]
+                            future = executor.submit(self.fetch_row, row, substitute, idx, total_rows, api_delay)
+                        pending[future] = chunk
                 
                 # 收集结果
-                for future in as_completed(future_to_row):
-                    if not self.is_running:
-                        self.log("用户中断处理，正在停止所有线程...", "INFO")
-                        # 取消未完成的任务
-                        cancelled_count = 0
-                        for f in future_to_row:
-                            if not f.done():
-                                f.cancel()
-                                cancelled_count += 1
-                        self.log(f"已取消 {cancelled_count} 个未完成的任务", "INFO")
-                        break
-                    
-                    idx, row = future_to_row[future]
-                    title = str(row.get("name", "") or row.get("title", "") or f"第{idx}行")[:80]
-                    
-                    try:
-                        result = future.result()
+                submit_more()
+                while pending and self.is_running:
+                    # 以短超时等待，停止事件置位后无需等到运行中的请求返回即可退出
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if not done:
+                        continue
+                    for future in done:
+                        if not self.is_running:
+                            break
+                        chunk = pending.pop(future)
                         
-                        # 如果返回None，表示跳过该行（返回空字符串的情况）
-                        if result is None:
-                            with results_lock:
-                                self.log(f"[{idx}/{total_rows}] ⏭ 跳过: {title}...（返回空字符串）", "INFO")
-                            continue
+                        try:
+                            if rows_per_request > 1:
+                                row_results = future.result()
+                            else:
+                                # 工作线程只负责网络请求，JSON解析/修复统一在本线程完成，
+                                # 避免解析占用GIL时拖慢其他线程的收发
+                                idx, row = chunk[0]
+                                row_results = [(idx, row, self.parse_row(future.result(), row, idx, total_rows))]
+                        except Exception as e:
+                            # 如果是停止导致的异常，不记录为错误
+                            if not self.is_running:
+                                continue
+                            row_results = []
+                            for idx, row in chunk:
+                                log_queue.put_nowait((f"[{idx}/{total_rows}] 任务执行异常: {e}", "ERROR"))
+                                # 即使出错也记录，但不添加到结果中
+                                all_results[idx - 1] = {
+                                    "row_index": idx,
+                                    "original_data": row,
+                                    "analysis_result": {"error": str(e)}
+                                }
                         
-                        # 保存所有结果（使用锁保证线程安全）
-                        if result:
-                            with results_lock:
-                                all_results.append(result)
-                                self.log(f"[{idx}/{total_rows}] ✓ 已处理: {title}...", "SUCCESS")
-                    except Exception as e:
-                        # 如果是停止导致的异常，不记录为错误
-                        if not self.is_running:
-                            continue
-                        with results_lock:
-                            self.log(f"[{idx}/{total_rows}] 任务执行异常: {e}", "ERROR")
-                            # 即使出错也记录，但不添加到结果中
-                            all_results.append({
-                                "row_index": idx,
-                                "original_data": row,
-                                "analysis_result": {"error": str(e)}
-                            })
-                    
-                    # 更新完成计数（使用锁保证线程安全）
-                    with results_lock:
-                        completed += 1
-                        current_completed = completed
-                    
-                    # 显示进度（仅在运行中时显示）
-                    if self.is_running and (current_completed % 10 == 0 or current_completed == total_rows):
-                        elapsed = time.time() - start_time
-                        rate = current_completed / elapsed if elapsed > 0 else 0
-                        remaining = (total_rows - current_completed) / rate if rate > 0 else 0
-                        progress = current_completed / total_rows * 100
-                        with results_lock:
-                            self.log(f"\n进度: {current_completed}/{total_rows} ({progress:.1f}%) | "
-                                   f"已用时: {elapsed:.1f}s | 速度: {rate:.2f}行/s | 预计剩余: {remaining:.1f}s\n")
+                        for idx, row, result in row_results:
+                            # 如果返回None，表示跳过该行（返回空字符串的情况）
+                            if result is None:
+                                if log_skipped:
+                                    log_queue.put_nowait((f"[{idx}/{total_rows}] ⏭ 跳过: {row_title(idx, row)}...（返回空字符串）", "INFO"))
+                                continue
+                            
+                            # 保存所有结果（只有本线程收集结果，无需加锁）
+                            all_results[idx - 1] = result
+                            if log_processed:
+                                log_queue.put_nowait((f"[{idx}/{total_rows}] ✓ 已处理: {row_title(idx, row)}...", "SUCCESS"))
+                        
+                        # 更新完成计数（只在本线程累加，无需加锁）
+                        previous_completed = completed
+                        completed += len(chunk)
+                        
+                        # 记录进度采样（每跨过10行或全部完成时，仅在运行中时），由Tk主线程格式化输出；队列满时丢弃
+                        if self.is_running and (completed // 10 != previous_completed // 10 or completed == total_rows):
+                            try:
+                                self._progress_q.put_nowait((completed, total_rows, time.time() - start_time))
+                            except queue.Full:
+                                pass
                     
-                    # 如果所有任务都已完成，提前退出循环（避免继续等待）
-                    if current_completed >= total_rows:
-                        break
+                    submit_more()
+                
+                if not self.is_running:
+                    self.log("用户中断处理，正在停止所有线程...", "INFO")
+                    # 取消未完成的任务
+                    cancelled_count = 0
+                    for f in pending:
+                        if not f.done():
+                            f.cancel()
+                            cancelled_count += 1
+                    self.log(f"已取消 {cancelled_count} 个未完成的任务", "INFO")
+                
+                # 输出队列中剩余的逐行日志，保证其出现在后续日志之前
+                self.drain_result_log(reschedule=False)
                 
                 # 如果已停止，立即关闭线程池
                 if not self.is_running:
                     self.log("正在关闭线程池...", "INFO")
-                    # 尝试使用 cancel_futures 参数（Python 3.9+）
-                    try:
-                        executor.shutdown(wait=False, cancel_futures=True)
-                    except TypeError:
-                        # Python 3.8 及以下版本不支持 cancel_futures 参数
-                        executor.shutdown(wait=False)
+                    self.shutdown_current_executor()
                     self.log("线程池已关闭", "INFO")
                     return False
             finally:
-                # 确保线程池被关闭
-                try:
-                    if not executor._shutdown:
-                        executor.shutdown(wait=True)
-                except:
-                    pass
+                # 确保线程池被关闭（正常结束时等待工作线程退出；已被中断关闭时不再等待）
+                if not self._executor_closed:
+                    self._executor_closed = True
+                    executor.shutdown(wait=True)
+                self._current_executor = None
             
             elapsed_time = time.time() - start_time
             if self.is_running:
                 self.log(f"\n处理完成！总用时: {elapsed_time:.1f}秒，平均速度: {total_rows/elapsed_time:.2f}行/秒\n")
             
-            # 生成报告 - 保存所有结果
+            # 生成报告 - 保存所有结果（跳过的行和未处理的行为None）
+            all_results = [result for result in all_results if result is not None]
             if all_results:
                 output_file = self.output_file_var.get() or "调研报告.csv"
                 
@@ -5677,63 +6354,49 @@ class ResearchGUI:
                 output_columns_str = self.output_columns_var.get().strip()
                 output_columns = [col.strip() for col in output_columns_str.split(',') if col.strip()] if output_columns_str else []
                 
-                # 构建输出数据
-                output_data = []
-                for result in all_results:
+                # 构建一条结果对应的输出行
+                out_cols = tuple(output_columns)
+                
+                def build_output_values(result):
+                    # 指定了输出列名时，直接按列顺序生成该行的值：先从分析结果中获取，没有则取原始数据
                     row_data = result.get("original_data", {})
                     analysis = result.get("analysis_result", {})
-                    
-                    # 构建输出行
-                    output_row = {}
-                    
-                    # 如果指定了输出列名，只保存这些列
-                    if output_columns:
-                        for col in output_columns:
-                            # 先从分析结果中获取
-                            if isinstance(analysis, dict) and col in analysis:
-                                output_row[col] = analysis[col]
-                            # 如果分析结果中没有，尝试从原始数据中获取
-                            elif col in row_data:
-                                output_row[col] = row_data[col]
-                            else:
-                                output_row[col] = ""
-                    else:
-                        # 如果没有指定输出列名，保存所有分析结果
-                        if isinstance(analysis, dict):
-                            for key, value in analysis.items():
-                                if key != "is_relevant":
-                                    output_row[key] = value
-                        else:
-                            output_row["分析结果"] = str(analysis)
-                    
-                    output_data.append(output_row)
+                    if not isinstance(analysis, dict):
+                        analysis = {}
+                    return [analysis[col] if col in analysis else row_data.get(col, "") for col in out_cols]
                 
-                # 保存到文件
-                import pandas as pd
-                df = pd.DataFrame(output_data)
+                def build_output_row(result):
+                    # 没有指定输出列名时，保存所有分析结果
+                    analysis = result.get("analysis_result", {})
+                    if isinstance(analysis, dict):
+                        return {key: value for key, value in analysis.items() if key != "is_relevant"}
+                    return {"分析结果": str(analysis)}
                 
+                # 保存到文件（各行都按fieldnames顺序写为值列表，不再逐行构建字典）
+                if out_cols:
+                    # 列已知：逐行生成并直接写入，不保留中间列表
+                    fieldnames = output_columns
+                    output_values = map(build_output_values, all_results)
+                else:
+                    # 各行的分析结果字段可能不同，列为所有行字段的并集（按首次出现顺序）
+                    output_rows = [build_output_row(result) for result in all_results]
+                    fieldnames = list(dict.fromkeys(key for row in output_rows for key in row))
+                    output_values = ([row.get(col) for col in fieldnames] for row in output_rows)
                 if output_file.endswith('.xlsx'):
-                    df.to_excel(output_file, index=False, engine='openpyxl')
+                    write_excel_rows(output_file, fieldnames, output_values)
                 else:
-                    df.to_csv(output_file, index=False, encoding='utf-8-sig')
+                    with open(output_file, 'w', encoding='utf-8-sig', newline='', buffering=1 << 20) as f:
+                        writer = csv.writer(f)
+                        writer.writerow(fieldnames)
+                        writer.writerows(output_values)
                 
                 self.log(f"✓ 调研报告已保存到: {output_file}", "SUCCESS")
                 self.log(f"共处理 {len(all_results)} 条记录", "SUCCESS")
                 if output_columns:
                     self.log(f"输出列: {', '.join(output_columns)}", "INFO")
                 
-                # 保存完成后，立即停止所有未完成的任务并退出
+                # 保存完成后停止运行状态（线程池已在上面关闭）
                 self.is_running = False
-                # 关闭线程池，不再等待剩余任务
-                try:
-                    if not executor._shutdown:
-                        executor.shutdown(wait=False, cancel_futures=True)
-                except:
-                    try:
-                        executor.shutdown(wait=False)
-                    except:
-                        pass
-                
                 return True
             else:
                 self.log("未处理任何记录", "INFO")
@@ -5761,7 +6424,8 @@ class ResearchGUI:
             self.online_api_thinking_combo,
             self.online_api_thinking_budget_entry,
             self.workers_entry,
-            self.delay_entry
+            self.delay_entry,
+            self.rows_per_request_entry
         ]
         
         state = "disabled" if enabled else "normal"
@@ -5817,20 +6481,31 @@ class ResearchGUI:
     def generate_batch_jsonl(self, table_file, output_file):
         """生成批处理jsonl文件"""
         try:
-            # 读取表格文件
-            with open(table_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
+            # 读取表格文件：优先用pandas的C解析器按字符串读取，逐行生成字典而不预先物化全部行
+            try:
+                import pandas as pd
+                try:
+                    # 表头按普通行读取：pandas会把重复的列名改为 "列名.1"，与csv.DictReader
+                    # （重复列名以最后一列的值为准）不一致，导致 {列名} 占位符匹配结果不同
+                    df = pd.read_csv(table_file, header=None, dtype=str, keep_default_na=False,
+                                     engine='c', encoding='utf-8')
+                except pd.errors.EmptyDataError:
+                    self.log("✗ 表格文件为空", "ERROR")
+                    return False
+                columns = list(df.iloc[0]) if len(df) else []
+                row_count = max(len(df) - 1, 0)
+                rows = (dict(zip(columns, values)) for values in df.iloc[1:].itertuples(index=False, name=None))
+            except ImportError:
+                with open(table_file, 'r', encoding='utf-8') as f:
+                    rows = list(csv.DictReader(f))
+                row_count = len(rows)
             
-            if not rows:
+            if not row_count:
                 self.log("✗ 表格文件为空", "ERROR")
                 return False
             
-            # 获取列名
-            columns = list(rows[0].keys())
-            
             # 获取Prompt模板
-            prompt_template = self.prompt_text.get(1.0, tk.END).strip()
+            prompt_template = self.get_prompt_template()
             
             # 获取API配置（使用批处理参数）
             model = self.batch_model_var.get().strip()
@@ -5839,41 +6514,41 @@ class ResearchGUI:
             enable_thinking = self.batch_enable_thinking_var.get() == "True"
             thinking_budget = int(self.batch_thinking_budget_var.get() or "4096") if enable_thinking else None
             
-            # 生成jsonl文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                for idx, row in enumerate(rows, 1):
-                    # 替换Prompt中的占位符
-                    prompt = prompt_template
-                    for col in columns:
-                        placeholder = f"{{{col}}}"
-                        value = str(row.get(col, ""))
-                        prompt = prompt.replace(placeholder, value)
-                    
-                    # 构建请求体
-                    body = {
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": "You are a highly advanced and versatile AI assistant"},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "stream": True,
-                        "max_tokens": max_tokens
-                    }
-                    
-                    if enable_thinking and thinking_budget:
-                        body["thinking_budget"] = thinking_budget
-                    
-                    # 构建jsonl行
-                    jsonl_entry = {
-                        "custom_id": f"request-{idx}",
-                        "method": "POST",
-                        "url": "/v1/chat/completions",
-                        "body": body
-                    }
-                    
-                    f.write(json.dumps(jsonl_entry, ensure_ascii=False) + "\n")
+            # 请求体中与行无关的部分只构建一次
+            base_body = {
+                "model": model,
+                "stream": True,
+                "max_tokens": max_tokens
+            }
+            if enable_thinking and thinking_budget:
+                base_body["thinking_budget"] = thinking_budget
+            
+            # 生成jsonl文件（二进制写入）
+            with open(output_file, 'wb', buffering=1 << 20) as f:
+                workers = os.cpu_count() or 1
+                if row_count < BATCH_JSONL_PROCESS_THRESHOLD or workers < 2:
+                    f.write(encode_batch_jsonl_rows(rows, prompt_template, base_body))
+                else:
+                    # 行数较多时prompt拼接和序列化是纯CPU工作，按连续分片交给多个进程，按顺序写入各分片结果
+                    from concurrent.futures import ProcessPoolExecutor
+                    from itertools import islice
+                    slice_size = -(-row_count // workers)
+                    # rows可能是列表（csv回退路径），必须先转为迭代器，否则每次islice都从头开始
+                    row_iter = iter(rows)
+                    slices = list(iter(lambda: list(islice(row_iter, slice_size)), []))
+                    start_indices = range(1, row_count + 1, slice_size)
+                    if len(slices) < 2:
+                        # 只有一个分片时没有并行收益，不必承担启动子进程的开销
+                        for rows_slice in slices:
+                            f.write(encode_batch_jsonl_rows(rows_slice, prompt_template, base_body))
+                    else:
+                        with ProcessPoolExecutor(max_workers=len(slices)) as process_executor:
+                            for blob in process_executor.map(encode_batch_jsonl_rows, slices,
+                                                             [prompt_template] * len(slices),
+                                                             [base_body] * len(slices), start_indices):
+                                f.write(blob)
             
-            self.log(f"✓ 已生成批处理文件: {output_file}，共 {len(rows)} 条记录", "SUCCESS")
+            self.log(f"✓ 已生成批处理文件: {output_file}，共 {row_count} 条记录", "SUCCESS")
             return True
             
         except Exception as e:
@@ -5882,6 +6557,49 @@ class ResearchGUI:
             self.log(traceback.format_exc(), "ERROR")
             return False
     
+    def _base_url(self):
+        """从在线API地址中提取base_url（去掉/v1/chat/completions）"""
+        return parse_base_url(self.online_api_url_var.get().strip())
+    
+    def _get_openai_client(self):
+        """获取批处理使用的OpenAI客户端（按API Key和base_url缓存，复用keep-alive连接）"""
+        key = (self.online_api_key_var.get().strip(), self._base_url())
+        client = self._openai_client_cache.get(key)
+        if client is None:
+            import httpx
+            # 使用DefaultHttpxClient保留openai的默认设置（如follow_redirects），
+            # 超时与openai默认值一致，避免上传/下载大文件时超时
+            client = OpenAI(
+                api_key=key[0],
+                base_url=key[1],
+                timeout=BATCH_API_TIMEOUT,
+                http_client=DefaultHttpxClient(limits=httpx.Limits(max_keepalive_connections=8),
+                                               timeout=BATCH_API_TIMEOUT)
+            )
+            self._openai_client_cache[key] = client
+        return client
+    
+    def _retire_openai_clients(self):
+        """API Key或地址变化时清空客户端缓存
+        
+        不在这里关闭客户端：正在进行的上传/轮询可能仍在后台线程中使用它们，
+        之后的调用会按新配置创建新客户端。
+        """
+        if self._openai_client_cache:
+            self._retired_openai_clients.extend(self._openai_client_cache.values())
+            self._openai_client_cache.clear()
+    
+    def _close_openai_clients(self):
+        """关闭所有OpenAI客户端（缓存中的和已移出缓存的），释放其连接池（退出程序时调用）"""
+        clients = list(self._openai_client_cache.values()) + self._retired_openai_clients
+        self._openai_client_cache.clear()
+        self._retired_openai_clients = []
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+    
     def upload_batch_file(self, jsonl_file):
         """上传批处理文件到API"""
         try:
@@ -5889,16 +6607,7 @@ class ResearchGUI:
                 self.log("✗ 未安装openai库，请运行: pip install openai", "ERROR")
                 return None
             
-            api_key = self.online_api_key_var.get().strip()
-            api_url = self.online_api_url_var.get().strip()
-            
-            # 提取base_url（去掉/v1/chat/completions）
-            if "/v1/chat/completions" in api_url:
-                base_url = api_url.replace("/v1/chat/completions", "")
-            else:
-                base_url = api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
-            
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            client = self._get_openai_client()
             
             self.log("正在上传批处理文件...", "INFO")
             with open(jsonl_file, "rb") as f:
@@ -5924,17 +6633,8 @@ class ResearchGUI:
                 self.log("✗ 未安装openai库", "ERROR")
                 return None
             
-            api_key = self.online_api_key_var.get().strip()
-            api_url = self.online_api_url_var.get().strip()
             model = self.batch_model_var.get().strip()
-            
-            # 提取base_url
-            if "/v1/chat/completions" in api_url:
-                base_url = api_url.replace("/v1/chat/completions", "")
-            else:
-                base_url = api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
-            
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            client = self._get_openai_client()
             
             self.log("正在创建批处理任务...", "INFO")
             batch = client.batches.create(
@@ -5972,16 +6672,7 @@ class ResearchGUI:
                 self.log("✗ 未安装openai库", "ERROR")
                 return
             
-            api_key = self.online_api_key_var.get().strip()
-            api_url = self.online_api_url_var.get().strip()
-            
-            # 提取base_url
-            if "/v1/chat/completions" in api_url:
-                base_url = api_url.replace("/v1/chat/completions", "")
-            else:
-                base_url = api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
-            
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            client = self._get_openai_client()
             
             self.log(f"正在检查任务状态: {batch_id}...", "INFO")
             batch = client.batches.retrieve(batch_id)
@@ -6020,16 +6711,7 @@ class ResearchGUI:
                 self.log("✗ 未安装openai库", "ERROR")
                 return
             
-            api_key = self.online_api_key_var.get().strip()
-            api_url = self.online_api_url_var.get().strip()
-            
-            # 提取base_url
-            if "/v1/chat/completions" in api_url:
-                base_url = api_url.replace("/v1/chat/completions", "")
-            else:
-                base_url = api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
-            
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            client = self._get_openai_client()
             
             if messagebox.askyesno("确认", f"确定要取消批处理任务 {batch_id} 吗？"):
                 self.log(f"正在取消任务: {batch_id}...", "INFO")
@@ -6042,6 +6724,13 @@ class ResearchGUI:
             import traceback
             self.log(traceback.format_exc(), "ERROR")
     
+    def _download_batch_file(self, client, file_id, file_path):
+        """以流式方式将批处理文件写入磁盘（按1 MiB分块，不在内存中保存整个文件）"""
+        with client.files.with_streaming_response.content(file_id) as response:
+            with open(file_path, 'wb', buffering=1 << 20) as f:
+                for chunk in response.iter_bytes(chunk_size=1 << 20):
+                    f.write(chunk)
+    
     def download_batch_results(self):
         """下载批处理结果文件"""
         try:
@@ -6060,16 +6749,7 @@ class ResearchGUI:
             else:
                 os.makedirs(output_dir, exist_ok=True)
             
-            api_key = self.online_api_key_var.get().strip()
-            api_url = self.online_api_url_var.get().strip()
-            
-            # 提取base_url
-            if "/v1/chat/completions" in api_url:
-                base_url = api_url.replace("/v1/chat/completions", "")
-            else:
-                base_url = api_url.rsplit("/", 1)[0] if "/" in api_url else api_url
-            
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            client = self._get_openai_client()
             
             # 获取任务信息
             batch = client.batches.retrieve(batch_id)
@@ -6077,19 +6757,15 @@ class ResearchGUI:
             # 下载输出文件
             if hasattr(batch, 'output_file_id') and batch.output_file_id:
                 self.log(f"正在下载输出文件: {batch.output_file_id}...", "INFO")
-                output_file_content = client.files.content(batch.output_file_id)
                 output_file_path = os.path.join(output_dir, f"batch_{batch_id}_output.jsonl")
-                with open(output_file_path, 'wb') as f:
-                    f.write(output_file_content.read())
+                self._download_batch_file(client, batch.output_file_id, output_file_path)
                 self.log(f"✓ 输出文件已保存: {output_file_path}", "SUCCESS")
             
             # 下载错误文件
             if hasattr(batch, 'error_file_id') and batch.error_file_id:
                 self.log(f"正在下载错误文件: {batch.error_file_id}...", "INFO")
-                error_file_content = client.files.content(batch.error_file_id)
                 error_file_path = os.path.join(output_dir, f"batch_{batch_id}_errors.jsonl")
-                with open(error_file_path, 'wb') as f:
-                    f.write(error_file_content.read())
+                self._download_batch_file(client, batch.error_file_id, error_file_path)
                 self.log(f"✓ 错误文件已保存: {error_file_path}", "SUCCESS")
             
         except Exception as e:
@@ -6273,6 +6949,8 @@ class ResearchGUI:
             self.log("用户中断运行...", "INFO")
             self.is_running = False
             self.is_downloading = False  # 同时中断下载/上传
+            # 立即关闭表格处理线程池，取消排队中的任务
+            self.shutdown_current_executor()
             
             # 停止Ollama模型（但不关闭SSH）- 只在Ollama模式下执行
             api_mode = self.api_mode_var.get()
@@ -6304,6 +6982,19 @@ class ResearchGUI:
             except:
                 pass
     
+    def shutdown_current_executor(self):
+        """立即关闭当前表格处理的线程池（不等待运行中的任务，取消排队中的任务）"""
+        executor = self._current_executor
+        if executor is None or self._executor_closed:
+            return
+        self._executor_closed = True
+        # 尝试使用 cancel_futures 参数（Python 3.9+）
+        try:
+            executor.shutdown(wait=False, cancel_futures=True)
+        except TypeError:
+            # Python 3.8 及以下版本不支持 cancel_futures 参数
+            executor.shutdown(wait=False)
+    
     def finish_research(self, success):
         """完成运行"""
         self.is_running = False
@@ -6336,35 +7027,33 @@ class ResearchGUI:
         """在初始化时从config文件读取值（不更新UI，只返回字典）"""
         config_values = {}
         try:
-            if os.path.exists(CONFIG_FILE):
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    
-                    # 读取API模式
-                    if "api_mode" in config:
-                        config_values["api_mode"] = config["api_mode"]
-                    
-                    # 读取在线API配置
-                    if "online_api" in config:
-                        online_api = config["online_api"]
-                        if "api_key" in online_api:
-                            config_values["online_api_key"] = online_api["api_key"]
-                        if "api_url" in online_api:
-                            config_values["online_api_url"] = online_api["api_url"]
-                        if "model" in online_api:
-                            config_values["online_model"] = online_api["model"]
-                        if "provider" in online_api:
-                            config_values["online_api_provider"] = online_api["provider"]
-                        if "temperature" in online_api:
-                            config_values["online_api_temperature"] = online_api["temperature"]
-                        if "max_tokens" in online_api:
-                            config_values["online_api_max_tokens"] = online_api["max_tokens"]
-                        if "top_p" in online_api:
-                            config_values["online_api_top_p"] = online_api["top_p"]
-                        if "enable_thinking" in online_api:
-                            config_values["online_api_enable_thinking"] = online_api["enable_thinking"]
-                        if "thinking_budget" in online_api:
-                            config_values["online_api_thinking_budget"] = online_api["thinking_budget"]
+            config = read_json_file(CONFIG_FILE)
+            
+            # 读取API模式
+            if "api_mode" in config:
+                config_values["api_mode"] = config["api_mode"]
+            
+            # 读取在线API配置
+            if "online_api" in config:
+                online_api = config["online_api"]
+                if "api_key" in online_api:
+                    config_values["online_api_key"] = online_api["api_key"]
+                if "api_url" in online_api:
+                    config_values["online_api_url"] = online_api["api_url"]
+                if "model" in online_api:
+                    config_values["online_model"] = online_api["model"]
+                if "provider" in online_api:
+                    config_values["online_api_provider"] = online_api["provider"]
+                if "temperature" in online_api:
+                    config_values["online_api_temperature"] = online_api["temperature"]
+                if "max_tokens" in online_api:
+                    config_values["online_api_max_tokens"] = online_api["max_tokens"]
+                if "top_p" in online_api:
+                    config_values["online_api_top_p"] = online_api["top_p"]
+                if "enable_thinking" in online_api:
+                    config_values["online_api_enable_thinking"] = online_api["enable_thinking"]
+                if "thinking_budget" in online_api:
+                    config_values["online_api_thinking_budget"] = online_api["thinking_budget"]
         except Exception as e:
             pass  # 如果读取失败，使用默认值
         
@@ -6374,69 +7063,22 @@ class ResearchGUI:
         """保存当前配置到文件"""
         try:
             config = {
-                "ssh": {
-                    "username": self.username_var.get(),
-                    "host": self.host_var.get(),
-                    "ssh_port": self.ssh_port_var.get(),
-                    "password": self.password_var.get()
-                },
-                "ollama": {
-                    "local_port": self.local_port_var.get(),
-                    "remote_port": self.remote_port_var.get(),
-                    "model": self.model_var.get(),
-                    "model_size": self.model_size_var.get(),
-                    "ollama_path": self.ollama_path_var.get(),
-                    "ollama_custom_dir": self.ollama_custom_dir_var.get(),
-                    "gpu": self.gpu_var.get()
-                },
-                "api_mode": self.api_mode_var.get(),
-                "online_api": {
-                    "api_key": self.online_api_key_var.get(),
-                    "api_url": self.online_api_url_var.get(),
-                    "model": self.online_model_var.get(),
-                    "provider": self.online_api_provider_var.get(),
-                    "temperature": self.online_api_temperature_var.get(),
-                    "max_tokens": self.online_api_max_tokens_var.get(),
-                    "top_p": self.online_api_top_p_var.get(),
-                    "enable_thinking": self.online_api_enable_thinking_var.get(),
-                    "thinking_budget": self.online_api_thinking_budget_var.get()
-                },
-                "table": {
-                    "table_file": self.table_var.get(),
-                    "output_file": self.output_file_var.get(),
-                    "output_columns": self.output_columns_var.get(),
-                    "max_workers": self.max_workers_var.get(),
-                    "api_delay": self.api_delay_var.get()
-                },
-                "batch_processing": {
-                    "enabled": self.batch_processing_var.get(),
-                    "model": self.batch_model_var.get(),
-                    "output_dir": self.batch_output_dir_var.get(),
-                    "task_id": self.batch_task_id_var.get(),
-                    "temperature": self.batch_temperature_var.get(),
-                    "max_tokens": self.batch_max_tokens_var.get(),
-                    "top_p": self.batch_top_p_var.get(),
-                    "enable_thinking": self.batch_enable_thinking_var.get(),
-                    "thinking_budget": self.batch_thinking_budget_var.get()
-                },
-                "prompt": self.prompt_text.get(1.0, tk.END).strip(),
-                "crawler": {
-                    "source": self.crawler_source_var.get(),
-                    "selected_categories": list(self.category_selected_items),  # 转换为list保存
-                    "start_date": self.crawler_start_date_var.get(),
-                    "end_date": self.crawler_end_date_var.get(),
-                    "output_file": self.crawler_output_file_var.get()
-                },
-                "monitor": {
-                    "enabled": self.monitor_enabled_var.get(),
-                    "rpm_limit": self.rpm_limit_var.get(),
-                    "tpm_limit": self.tpm_limit_var.get(),
-                    "total_tokens_limit": self.total_tokens_limit_var.get()
-                }
+                section: {key: getattr(self, var_name).get() for key, var_name in fields.items()}
+                for section, fields in self._CONFIG_SCHEMA.items()
             }
+            config["api_mode"] = self.api_mode_var.get()
+            config["prompt"] = self.get_prompt_template()
+            config["crawler"]["selected_categories"] = list(self.category_selected_items)  # 转换为list保存
+            
+            # 与上次加载/保存的内容相同时不再写入
+            data = encode_json_file(config)
+            config_hash = hashlib.blake2b(data, digest_size=16).digest()
+            if config_hash == self._last_config_hash and os.path.exists(CONFIG_FILE):
+                self.log("配置未变化，无需保存", "INFO")
+                return
             
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            write_file_atomic(CONFIG_FILE, data)
+            self._last_config_hash = config_hash
             
             self.log("✓ 配置已保存", "SUCCESS")
         except Exception as e:
@@ -6445,41 +7087,23 @@ class ResearchGUI:
     def load_config(self):
         """从文件加载配置"""
         try:
-            if not os.path.exists(CONFIG_FILE):
+            try:
+                with open(CONFIG_FILE, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
                 return  # 配置文件不存在，使用默认值
-            
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            # 加载SSH配置
-            if "ssh" in config:
-                ssh = config["ssh"]
-                if "username" in ssh:
-                    self.username_var.set(ssh["username"])
-                if "host" in ssh:
-                    self.host_var.set(ssh["host"])
-                if "ssh_port" in ssh:
-                    self.ssh_port_var.set(ssh["ssh_port"])
-                if "password" in ssh:
-                    self.password_var.set(ssh["password"])
-            
-            # 加载Ollama配置
-            if "ollama" in config:
-                ollama = config["ollama"]
-                if "local_port" in ollama:
-                    self.local_port_var.set(ollama["local_port"])
-                if "remote_port" in ollama:
-                    self.remote_port_var.set(ollama["remote_port"])
-                if "model" in ollama:
-                    self.model_var.set(ollama["model"])
-                if "model_size" in ollama:
-                    self.model_size_var.set(ollama["model_size"])
-                if "ollama_path" in ollama:
-                    self.ollama_path_var.set(ollama["ollama_path"])
-                if "ollama_custom_dir" in ollama:
-                    self.ollama_custom_dir_var.set(ollama["ollama_custom_dir"])
-                if "gpu" in ollama:
-                    self.gpu_var.set(ollama["gpu"])
+            config = json_loads(data)
+            self._last_config_hash = hashlib.blake2b(data, digest_size=16).digest()
+            
+            # 按配置表加载各分组中的字段（只遍历文件中实际存在的键）
+            for section, fields in self._CONFIG_SCHEMA.items():
+                values = config.get(section)
+                if not isinstance(values, dict):
+                    continue
+                for key, value in values.items():
+                    var_name = fields.get(key)
+                    if var_name:
+                        getattr(self, var_name).set(value)
             
             # 加载模式选择
             if "api_mode" in config:
@@ -6492,85 +7116,18 @@ class ResearchGUI:
                         self.mode_notebook.select(1)
                 self.on_mode_changed()  # 更新界面显示
             
-            # 加载在线API配置
-            if "online_api" in config:
-                online_api = config["online_api"]
-                if "api_key" in online_api:
-                    self.online_api_key_var.set(online_api["api_key"])
-                if "api_url" in online_api:
-                    self.online_api_url_var.set(online_api["api_url"])
-                if "model" in online_api:
-                    self.online_model_var.set(online_api["model"])
-                if "provider" in online_api:
-                    self.online_api_provider_var.set(online_api["provider"])
-                    # 延迟调用，确保界面已创建
-                    if hasattr(self, 'online_model_combo'):
-                        self.on_api_provider_changed()
-                if "temperature" in online_api:
-                    self.online_api_temperature_var.set(online_api["temperature"])
-                if "max_tokens" in online_api:
-                    self.online_api_max_tokens_var.set(online_api["max_tokens"])
-                if "top_p" in online_api:
-                    self.online_api_top_p_var.set(online_api["top_p"])
-                if "enable_thinking" in online_api:
-                    self.online_api_enable_thinking_var.set(online_api["enable_thinking"])
-                if "thinking_budget" in online_api:
-                    self.online_api_thinking_budget_var.set(online_api["thinking_budget"])
-            
-            # 加载表格配置
-            if "table" in config:
-                table = config["table"]
-                if "table_file" in table:
-                    self.table_var.set(table["table_file"])
-                if "output_file" in table:
-                    self.output_file_var.set(table["output_file"])
-                if "output_columns" in table:
-                    self.output_columns_var.set(table["output_columns"])
-                if "max_workers" in table:
-                    self.max_workers_var.set(table["max_workers"])
-                if "api_delay" in table:
-                    self.api_delay_var.set(table["api_delay"])
-            
-            # 加载批处理配置
-            if "batch_processing" in config:
-                batch = config["batch_processing"]
-                if "enabled" in batch:
-                    self.batch_processing_var.set(batch["enabled"])
-                if "model" in batch:
-                    self.batch_model_var.set(batch["model"])
-                if "output_dir" in batch:
-                    self.batch_output_dir_var.set(batch["output_dir"])
-                if "task_id" in batch:
-                    self.batch_task_id_var.set(batch["task_id"])
-                if "temperature" in batch:
-                    self.batch_temperature_var.set(batch["temperature"])
-                if "max_tokens" in batch:
-                    self.batch_max_tokens_var.set(batch["max_tokens"])
-                if "top_p" in batch:
-                    self.batch_top_p_var.set(batch["top_p"])
-                if "enable_thinking" in batch:
-                    self.batch_enable_thinking_var.set(batch["enable_thinking"])
-                if "thinking_budget" in batch:
-                    self.batch_thinking_budget_var.set(batch["thinking_budget"])
+            # 在线API提供商：延迟调用，确保界面已创建
+            if "provider" in config.get("online_api", {}) and hasattr(self, 'online_model_combo'):
+                self.on_api_provider_changed()
             
             # 加载Prompt配置
             if "prompt" in config:
                 self.prompt_text.delete(1.0, tk.END)
                 self.prompt_text.insert(1.0, config["prompt"])
             
-            # 加载监控配置
-            if "monitor" in config:
-                monitor = config["monitor"]
-                if "enabled" in monitor:
-                    self.monitor_enabled_var.set(monitor["enabled"])
-                    # 更新监控显示状态
-                    self.on_monitor_enabled_changed()
-                if "rpm_limit" in monitor:
-                    self.rpm_limit_var.set(monitor["rpm_limit"])
-                if "tpm_limit" in monitor:
-                    self.tpm_limit_var.set(monitor["tpm_limit"])
-                if "total_tokens_limit" in monitor:
-                    self.total_tokens_limit_var.set(monitor["total_tokens_limit"])
+            # 更新监控显示状态
+            if "enabled" in config.get("monitor", {}):
+                self.on_monitor_enabled_changed()
             
             # 如果加载了表格文件，自动分析列名
             if "table" in config and "table_file" in config["table"]:
@@ -6578,22 +7135,10 @@ class ResearchGUI:
                 if table_file and os.path.exists(table_file):
                     self.auto_analyze_columns()
             
-            # 加载论文爬虫配置
-            if "crawler" in config:
-                crawler = config["crawler"]
-                if "source" in crawler:
-                    self.crawler_source_var.set(crawler["source"])
-                if "start_date" in crawler:
-                    self.crawler_start_date_var.set(crawler["start_date"])
-                if "end_date" in crawler:
-                    self.crawler_end_date_var.set(crawler["end_date"])
-                if "output_file" in crawler:
-                    self.crawler_output_file_var.set(crawler["output_file"])
-                if "selected_categories" in crawler:
-                    # 保存选中的分类代码，稍后在listbox创建后恢复
-                    selected_categories = crawler["selected_categories"]
-                    if isinstance(selected_categories, list):
-                        self._saved_category_selection = set(selected_categories)
+            # 论文爬虫选中的分类代码，稍后在listbox创建后恢复
+            selected_categories = config.get("crawler", {}).get("selected_categories")
+            if isinstance(selected_categories, list):
+                self._saved_category_selection = set(selected_categories)
             
             self.log("✓ 配置已加载", "SUCCESS")
         except Exception as e:
@@ -6604,10 +7149,9 @@ class ResearchGUI:
         try:
             cache_data = {
                 "models": self.ollama_models_cache,
-                "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
+                "last_updated_ts": int(time.time())  # 只存时间戳，显示时再格式化
             }
-            with open(MODELS_CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            write_json_file(MODELS_CACHE_FILE, cache_data, indent=False)
         except Exception as e:
             # 静默失败，不影响主程序
             pass
@@ -6615,40 +7159,43 @@ class ResearchGUI:
     def load_models_cache(self):
         """从文件加载模型缓存"""
         try:
-            if os.path.exists(MODELS_CACHE_FILE):
-                with open(MODELS_CACHE_FILE, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    if "models" in cache_data:
-                        self.ollama_models_cache = cache_data["models"]
-                        # 更新模型下拉框
-                        if hasattr(self, 'model_combo') and self.model_combo and self.ollama_models_cache:
-                            model_list = sorted(self.ollama_models_cache.keys())
-                            self.model_combo['values'] = model_list
-                            
-                            # 如果当前选择的模型有缓存的大小信息，更新模型大小下拉列表
-                            current_model = self.model_var.get() if hasattr(self, 'model_var') else None
-                            if current_model and current_model in self.ollama_models_cache:
-                                sizes = self.ollama_models_cache[current_model]
-                                if sizes and hasattr(self, 'model_size_combo') and self.model_size_combo:
-                                    self.model_size_combo['values'] = sorted(sizes, key=lambda x: (len(x), x))
-                                    self.model_size_combo['state'] = 'readonly'
-                                    if sizes:
-                                        self.model_size_var.set(sizes[0])  # 默认选择第一个
-                        
-                        # 如果有最后更新时间，显示在日志中
-                        if "last_updated" in cache_data:
-                            self.log(f"已加载模型缓存（最后更新: {cache_data['last_updated']}）", "INFO")
-                        else:
-                            self.log(f"已加载 {len(self.ollama_models_cache)} 个模型的缓存", "INFO")
+            cache_data = read_json_file(MODELS_CACHE_FILE)
+            if "models" in cache_data:
+                self.ollama_models_cache = cache_data["models"]
+                self.models_cache_changed()
+                # 更新模型下拉框
+                if hasattr(self, 'model_combo') and self.model_combo and self.ollama_models_cache:
+                    self.model_combo['values'] = self.sorted_model_names()
+                    
+                    # 如果当前选择的模型有缓存的大小信息，更新模型大小下拉列表
+                    current_model = self.model_var.get() if hasattr(self, 'model_var') else None
+                    if current_model and current_model in self.ollama_models_cache:
+                        sizes = self.ollama_models_cache[current_model]
+                        if sizes and hasattr(self, 'model_size_combo') and self.model_size_combo:
+                            self.model_size_combo['values'] = self.sorted_model_sizes(current_model)
+                            self.model_size_combo['state'] = 'readonly'
+                            if sizes:
+                                self.model_size_var.set(sizes[0])  # 默认选择第一个
+                
+                # 如果有最后更新时间，显示在日志中
+                if "last_updated_ts" in cache_data:
+                    last_updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cache_data["last_updated_ts"]))
+                    self.log(f"已加载模型缓存（最后更新: {last_updated}）", "INFO")
+                elif "last_updated" in cache_data:
+                    # 兼容旧版缓存文件中的字符串时间
+                    self.log(f"已加载模型缓存（最后更新: {cache_data['last_updated']}）", "INFO")
+                else:
+                    self.log(f"已加载 {len(self.ollama_models_cache)} 个模型的缓存", "INFO")
         except Exception as e:
             # 静默失败，如果缓存文件损坏，使用空缓存
             self.ollama_models_cache = {}
+            self.models_cache_changed()
         
         # 如果缓存为空，使用默认模型列表（不自动从官网获取）
         if not self.ollama_models_cache:
             # 使用默认模型列表初始化
-            for model_name in DEFAULT_MODELS:
-                self.ollama_models_cache[model_name] = []
+            self.ollama_models_cache = {model_name: [] for model_name in DEFAULT_MODELS}
+            self.models_cache_changed()
             # 更新模型下拉框
             if hasattr(self, 'model_combo') and self.model_combo:
                 self.model_combo['values'] = DEFAULT_MODELS
@@ -6658,7 +7205,7 @@ class ResearchGUI:
                 if current_model and current_model in self.ollama_models_cache:
                     sizes = self.ollama_models_cache[current_model]
                     if sizes and hasattr(self, 'model_size_combo') and self.model_size_combo:
-                        self.model_size_combo['values'] = sorted(sizes, key=lambda x: (len(x), x))
+                        self.model_size_combo['values'] = self.sorted_model_sizes(current_model)
                         self.model_size_combo['state'] = 'readonly'
                         if sizes:
                             self.model_size_var.set(sizes[0])  # 默认选择第一个
@@ -6667,10 +7214,13 @@ class ResearchGUI:
         
         # 加载模型大小下拉列表（如果当前选择的模型有缓存）
         if hasattr(self, 'model_var') and hasattr(self, 'model_size_combo') and self.model_size_combo:
-            try:
-                self.on_model_selected()
-            except:
-                pass  # 如果出错，静默失败
+            # 推迟到主循环开始后执行（缓存中没有大小信息时会请求本地API），不阻塞首次显示窗口
+            def select_model():
+                try:
+                    self.on_model_selected()
+                except:
+                    pass  # 如果出错，静默失败
+            self.root.after(0, select_model)
     
     def on_closing(self):
         """关闭窗口时的处理"""
@@ -6679,33 +7229,33 @@ class ResearchGUI:
                 self.stop_research()
                 time.sleep(1)
         
-        # 保存配置
-        self.save_config()
+        # 互不依赖的收尾I/O任务放到独立线程池中并行执行，统一限时等待
+        shutdown_pool = ThreadPoolExecutor(max_workers=4)
+        shutdown_futures = [shutdown_pool.submit(self.save_models_cache)]
         
-        # 保存模型缓存
-        self.save_models_cache()
+        # 保存配置（需读取Tk变量，在主线程执行，与模型缓存写入重叠）
+        self.save_config()
         
-        # 停止Ollama模型以节省资源
+        # 停止Ollama模型以节省资源（读取Tk变量且依赖SSH连接，须在关闭SSH前于主线程完成）
         self.log("正在停止Ollama模型以节省资源...")
         self.stop_ollama_model()
-        time.sleep(0.5)
         
-        # 关闭SSH隧道（paramiko）
+        # 关闭批处理使用的OpenAI客户端
+        shutdown_futures.append(shutdown_pool.submit(self._close_openai_clients))
+        
+        # 关闭SSH隧道（paramiko）与释放本地端口互不依赖，同时进行
         if self.ssh_client:
-            try:
-                self.ssh_client.close()
-                self.log("✓ SSH隧道（paramiko）已关闭", "SUCCESS")
-            except:
-                pass
+            ssh_client = self.ssh_client
             self.ssh_client = None
-        
-        
-        # 释放本地端口
+            
+            def close_ssh():
+                ssh_client.close()
+                self.log("✓ SSH隧道（paramiko）已关闭", "SUCCESS")
+            shutdown_futures.append(shutdown_pool.submit(close_ssh))
         try:
             local_port = int(self.local_port_var.get())
             self.log(f"正在释放本地端口 {local_port}...")
-            self.kill_process_on_port(local_port)
-            time.sleep(0.5)
+            shutdown_futures.append(shutdown_pool.submit(self.kill_process_on_port, local_port))
         except Exception as e:
             self.log(f"释放端口时出错: {e}", "WARN")
         
@@ -6714,6 +7264,8 @@ class ResearchGUI:
             try:
                 if hasattr(sys, '_MEIPASS'):
                     # 打包后的exe环境
+                    import tempfile
+                    import subprocess
                     current_exe = sys.executable
                     exe_dir = os.path.dirname(current_exe)
                     exe_name = os.path.basename(current_exe)
@@ -6723,17 +7275,7 @@ class ResearchGUI:
                     batch_file = os.path.join(temp_dir, f"PaperResearchTool_update_{int(time.time())}.bat")
                     
                     with open(batch_file, 'w', encoding='utf-8') as f:
-                        f.write('@echo off\n')
-                        f.write('chcp 65001 >nul\n')  # 设置UTF-8编码
-                        f.write('timeout /t 2 /nobreak >nul\n')  # 等待2秒确保程序完全关闭
-                        f.write(f'if exist "{current_exe}" (\n')
-                        f.write(f'    del /f /q "{current_exe}"\n')
-                        f.write(')\n')
-                        f.write(f'if exist "{self.pending_update_file}" (\n')
-                        f.write(f'    move /y "{self.pending_update_file}" "{current_exe}"\n')
-                        f.write(f'    echo 更新完成！\n')
-                        f.write(')\n')
-                        f.write(f'del /f /q "%~f0"\n')  # 删除批处理脚本自身
+                        f.write(UPDATE_BAT_TEMPLATE.format(current_exe=current_exe, update_file=self.pending_update_file))
                     
                     # 以隐藏窗口方式运行批处理脚本
                     subprocess.Popen(['cmd.exe', '/c', batch_file], 
@@ -6747,6 +7289,10 @@ class ResearchGUI:
             except Exception as e:
                 self.log(f"创建自动更新脚本时出错: {e}", "WARN")
         
+        # 最多等待3秒，超时的任务不再等待
+        wait(shutdown_futures, timeout=3.0)
+        shutdown_pool.shutdown(wait=False)
+        self._bg_executor.shutdown(wait=False, cancel_futures=True)
         self.root.destroy()
     
     def check_for_updates(self):
@@ -6758,10 +7304,27 @@ class ResearchGUI:
                     "Accept": "application/vnd.github.v3+json",
                     "User-Agent": "PaperResearchTool"
                 }
-                response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
-                response.raise_for_status()
+                # 带上次的ETag发起条件请求，Release未变化时GitHub返回304且无响应体
+                try:
+                    update_cache = read_json_file(UPDATE_CACHE_FILE)
+                    cached_release = update_cache["release"]
+                    if update_cache.get("etag"):
+                        headers["If-None-Match"] = update_cache["etag"]
+                except Exception:
+                    cached_release = None
+                response = _global_session.get(GITHUB_API_URL, headers=headers, timeout=10)
                 
-                release_data = response.json()
+                if response.status_code == 304 and cached_release is not None:
+                    release_data = cached_release
+                else:
+                    response.raise_for_status()
+                    release_data = json_loads(response.content)
+                    etag = response.headers.get("ETag")
+                    if etag:
+                        try:
+                            write_json_file(UPDATE_CACHE_FILE, {"etag": etag, "release": release_data}, indent=False)
+                        except Exception:
+                            pass  # 缓存写入失败不影响检查更新
                 latest_version = release_data.get("tag_name", "").lstrip("v")  # 移除可能的"v"前缀
                 release_url = release_data.get("html_url", "")
                 release_notes = release_data.get("body", "")
@@ -6795,6 +7358,11 @@ class ResearchGUI:
     
     def _compare_versions(self, current, latest):
         """比较版本号，返回True表示latest版本更新"""
+        if HAS_PACKAGING:
+            try:
+                return Version(latest) > Version(current)
+            except InvalidVersion:
+                pass  # 非标准版本号，使用下面的逐位比较
         try:
             current_parts = [int(x) for x in current.split('.')]
             latest_parts = [int(x) for x in latest.split('.')]
@@ -6839,6 +7407,7 @@ class ResearchGUI:
             is_exe = filename.endswith(".exe")
             if is_exe:
                 # 自动替换模式：下载到临时目录
+                import tempfile
                 temp_dir = tempfile.gettempdir()
                 save_path = os.path.join(temp_dir, f"PaperResearchTool_update_{int(time.time())}.exe")
                 auto_replace = True
@@ -6871,24 +7440,45 @@ class ResearchGUI:
             status_label = tk.Label(progress_window, text="准备下载...", font=(self.chinese_font, 9))
             status_label.pack(pady=5)
             
+            # 下载线程与进度轮询共享的状态（total: 文件总大小，file: 正在写入的文件对象）
+            download_state = {"total": 0, "file": None, "done": False}
+            
+            def update_progress(downloaded):
+                total_size = download_state["total"]
+                try:
+                    progress_var.set((downloaded / total_size) * 100)
+                    status_label.config(text=f"已下载: {downloaded / 1024 / 1024:.2f} MB / {total_size / 1024 / 1024:.2f} MB")
+                    progress_window.update_idletasks()
+                except tk.TclError:
+                    pass  # 进度窗口已关闭
+            
+            def poll_progress():
+                """主线程每150ms读取一次已写入的字节数并刷新进度条"""
+                if download_state["done"]:
+                    return
+                f = download_state["file"]
+                if f is not None and download_state["total"] > 0:
+                    try:
+                        update_progress(f.tell())
+                    except ValueError:
+                        pass  # 文件已关闭
+                progress_window.after(150, poll_progress)
+            
             def download_in_thread():
                 try:
                     response = requests.get(download_url, stream=True, timeout=30)
                     response.raise_for_status()
+                    download_state["total"] = int(response.headers.get('content-length', 0))
                     
-                    total_size = int(response.headers.get('content-length', 0))
-                    downloaded = 0
-                    
-                    with open(save_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                if total_size > 0:
-                                    progress = (downloaded / total_size) * 100
-                                    progress_var.set(progress)
-                                    status_label.config(text=f"已下载: {downloaded / 1024 / 1024:.2f} MB / {total_size / 1024 / 1024:.2f} MB")
-                                    progress_window.update()
+                    # 直接从底层urllib3响应读取（自动解压），由copyfileobj以64 KiB为单位写入1 MiB缓冲的文件
+                    response.raw.decode_content = True
+                    with open(save_path, 'wb', buffering=1 << 20) as f:
+                        download_state["file"] = f
+                        shutil.copyfileobj(response.raw, f, length=64 * 1024)
+                        downloaded = f.tell()
+                    download_state["done"] = True
+                    if download_state["total"] > 0:
+                        progress_window.after(0, update_progress, downloaded)
                     
                     progress_window.after(0, lambda: progress_window.destroy())
                     
@@ -6916,11 +7506,13 @@ class ResearchGUI:
                         self.root.after(0, lambda p=path: messagebox.showinfo("下载完成", f"更新文件已下载到：\n{p}\n\n请手动安装更新。", parent=self.root))
                     
                 except Exception as e:
+                    download_state["done"] = True
                     progress_window.after(0, lambda: progress_window.destroy())
                     error_msg = str(e)
                     self.root.after(0, lambda msg=error_msg: messagebox.showerror("下载失败", f"下载更新文件时出错：\n{msg}", parent=self.root))
             
             threading.Thread(target=download_in_thread, daemon=True).start()
+            progress_window.after(150, poll_progress)
             
         except Exception as e:
             messagebox.showerror("下载更新", f"准备下载时出错：\n{str(e)}", parent=self.root)
@@ -6928,6 +7520,9 @@ class ResearchGUI:
 
 def main():
     """主函数"""
+    # 打包为exe后，批处理文件生成使用的子进程需要此调用
+    import multiprocessing
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ResearchGUI(root)
     root.mainloop()
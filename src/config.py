@@ -71,6 +71,7 @@ CONFIG_FILE = os.path.join(APP_DIR, "config.json")
 MODELS_CACHE_FILE = os.path.join(APP_DIR, "models_cache.json")
 ONLINE_MODELS_CACHE_FILE = os.path.join(APP_DIR, "online_models_cache.json")
 LOCK_FILE = os.path.join(USER_DATA_DIR, ".lock")
+UPDATE_CACHE_FILE = os.path.join(USER_DATA_DIR, "update_cache.json")  # 最新Release及其ETag
 UNLOCK_CODE = "unlock_hzq"
 
 # ==================== IP白名单 ====================
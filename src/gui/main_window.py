@@ -144,7 +144,7 @@ class MainWindow:
         """保存配置"""
         config = {}
         # TODO: 从各个组件收集配置
-        save_json(config, CONFIG_FILE)
+        save_json(config, CONFIG_FILE, pretty=True)
     
     def on_closing(self):
         """关闭窗口时的处理"""
@@ -17,7 +17,7 @@ import threading
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import BATCH_SUPPORTED_MODELS, DEFAULT_MODELS, CONFIG_FILE, MODELS_CACHE_FILE, ONLINE_MODELS_CACHE_FILE, APP_DIR
-from utils.file_utils import load_json, save_json
+from utils.file_utils import load_json, load_json_many, save_json
 from utils.path_utils import get_full_model_name
 from services.api_service import APIService
 
@@ -142,11 +142,10 @@ class ResearchTab:
     
     def _load_initial_data(self):
         """加载初始数据（模型缓存等）"""
-        # 加载模型缓存
-        self.ollama_models_cache = load_json(MODELS_CACHE_FILE, {})
-        
-        # 加载在线模型缓存
-        self.online_models_cache = load_json(ONLINE_MODELS_CACHE_FILE, {})
+        # 并发加载本地模型缓存和在线模型缓存
+        self.ollama_models_cache, self.online_models_cache = load_json_many(
+            [MODELS_CACHE_FILE, ONLINE_MODELS_CACHE_FILE], {}
+        )
         
         # 更新模型下拉框
         if hasattr(self, 'online_model_combo'):
@@ -1380,7 +1379,7 @@ class ResearchTab:
                 }
             }
             
-            save_json(config, CONFIG_FILE)
+            save_json(config, CONFIG_FILE, pretty=True)
             self.log("✓ 配置已保存", "SUCCESS")
         except Exception as e:
             self.log(f"保存配置失败: {e}", "WARN")
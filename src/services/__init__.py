@@ -2,10 +2,7 @@
 服务层模块：提供业务逻辑服务
 """
 
-from .ssh_service import SSHService
-from .ollama_service import OllamaService
-from .api_service import APIService
-from .update_service import UpdateService
+import importlib
 
 __all__ = [
     'SSHService',
@@ -14,5 +11,24 @@ __all__ = [
     'UpdateService',
 ]
 
-# 注意：由于循环依赖，某些导入可能需要延迟加载
+# 服务类名 -> 所在子模块；首次访问时才导入（PEP 562），
+# 避免导入包时连带加载paramiko、requests等依赖，也规避循环依赖
+_LAZY_SERVICES = {
+    'SSHService': '.ssh_service',
+    'OllamaService': '.ollama_service',
+    'APIService': '.api_service',
+    'UpdateService': '.update_service',
+}
 
+
+def __getattr__(name):
+    if name in _LAZY_SERVICES:
+        module = importlib.import_module(_LAZY_SERVICES[name], __name__)
+        service_cls = getattr(module, name)
+        globals()[name] = service_cls  # 缓存，之后的访问不再经过__getattr__
+        return service_cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,10 +3,60 @@
 API服务：处理在线API和Ollama API调用
 """
 
+import os
+import sys
 import json
 import time
-import requests
-from typing import Dict, Optional, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Callable, Any, List, Union
+
+# 添加父目录到路径以便导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.http_utils import get_http_session
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+    ijson = None
+
+
+# 用于从带有多余文本的响应中截取第一个完整JSON对象
+_JSON_DECODER = json.JSONDecoder()
+
+# 硅基流动请求体中不随调用变化的字段
+_SILICONFLOW_PAYLOAD_BASE = {
+    "stream": False,
+    "min_p": 0.05,
+    "stop": None,
+    "top_k": 50,
+    "frequency_penalty": 0.5,
+    "n": 1,
+    "response_format": {"type": "json_object"}
+}
+
+
+def _json_loads(text: str) -> Any:
+    """解析JSON文本（优先使用orjson）"""
+    if HAS_ORJSON:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """将请求体序列化为UTF-8编码的JSON字节串（优先使用orjson）"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
 
 class APIService:
@@ -20,6 +70,16 @@ class APIService:
             log_callback: 日志回调函数
         """
         self.log_callback = log_callback
+        self._session = get_http_session()  # 共享HTTP会话，复用keep-alive连接
+        # 按API模式分派的响应字段提取函数（未知模式按Ollama处理，与原先的else分支一致）
+        self._extract_tokens_fns = {
+            "online": self._extract_tokens_online,
+            "ollama": self._extract_tokens_ollama,
+        }
+        self._extract_text_fns = {
+            "online": self._extract_text_online,
+            "ollama": self._extract_text_ollama,
+        }
     
     def log(self, message: str, level: str = "INFO"):
         """记录日志"""
@@ -46,14 +106,18 @@ class APIService:
                     "Authorization": f"Bearer {api_key}",
                     "Content-Type": "application/json"
                 }
-                response = requests.get(models_url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    models = [model.get("id", "") for model in data.get("data", [])]
+                with self._session.get(models_url, headers=headers, stream=True, timeout=10) as response:
+                    if response.status_code != 200:
+                        self.log(f"获取模型列表失败: {response.status_code}", "ERROR")
+                        return []
+                    if HAS_IJSON:
+                        # 流式解析，只取出每个模型的id，不构建完整的响应对象
+                        response.raw.decode_content = True
+                        models = ijson.items(response.raw, "data.item.id")
+                    else:
+                        data = _json_loads(response.content)
+                        models = (model.get("id", "") for model in data.get("data", []))
                     return [m for m in models if m]  # 过滤空字符串
-                else:
-                    self.log(f"获取模型列表失败: {response.status_code}", "ERROR")
-                    return []
             else:
                 # 自定义API：尝试从API地址推断或返回空列表
                 self.log("自定义API暂不支持自动获取模型列表", "WARN")
@@ -79,7 +143,7 @@ class APIService:
         调用在线API
         
         Returns:
-            包含response和usage的字典
+            完整的响应字典（包含choices和usage等字段）
         """
         headers = {
             "Content-Type": "application/json",
@@ -88,20 +152,14 @@ class APIService:
         
         if provider == "siliconflow":
             payload = {
+                **_SILICONFLOW_PAYLOAD_BASE,
                 "model": model_name,
                 "messages": [{"role": "user", "content": prompt}],
-                "stream": False,
                 "max_tokens": max_tokens,
                 "enable_thinking": enable_thinking,
                 "thinking_budget": thinking_budget,
-                "min_p": 0.05,
-                "stop": None,
                 "temperature": temperature,
-                "top_p": top_p,
-                "top_k": 50,
-                "frequency_penalty": 0.5,
-                "n": 1,
-                "response_format": {"type": "json_object"}
+                "top_p": top_p
             }
         else:
             payload = {
@@ -114,9 +172,40 @@ class APIService:
             if enable_thinking and thinking_budget:
                 payload["thinking_budget"] = thinking_budget
         
-        response = requests.post(api_url, json=payload, headers=headers, timeout=120)
+        # 读取完整响应体（连接随后归还连接池复用），再一次性解析
+        response = self._session.post(api_url, data=_json_dumps(payload), headers=headers, timeout=120)
         response.raise_for_status()
-        return response.json()
+        return _json_loads(response.content)
+    
+    def call_online_api_many(
+        self,
+        prompts: List[str],
+        max_concurrency: int = 8,
+        **kwargs
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        并发调用在线API处理多个Prompt
+        
+        LLM请求主要耗时在等待响应，多个请求同时发出时总耗时接近单次请求。
+        
+        Args:
+            prompts: Prompt列表
+            max_concurrency: 同时发出的最大请求数
+            **kwargs: 传给call_online_api的其余参数（api_url、api_key、model_name等）
+        
+        Returns:
+            与prompts顺序一致的结果列表；某个请求失败时，对应位置为该异常对象
+        """
+        def call_one(prompt):
+            try:
+                return self.call_online_api(prompt=prompt, **kwargs)
+            except Exception as e:
+                return e
+        
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+            return list(executor.map(call_one, prompts))
     
     def call_ollama_api(
         self,
@@ -136,9 +225,14 @@ class APIService:
             "stream": False
         }
         
-        response = requests.post(api_url, json=payload, timeout=120)
+        response = self._session.post(
+            api_url,
+            data=_json_dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=120
+        )
         response.raise_for_status()
-        return response.json()
+        return _json_loads(response.content)
     
     def extract_tokens(self, response_data: Dict[str, Any], api_mode: str = "online") -> int:
         """
@@ -151,14 +245,25 @@ class APIService:
         Returns:
             token使用量
         """
-        if api_mode == "online":
-            if "usage" in response_data and "total_tokens" in response_data["usage"]:
-                return response_data["usage"]["total_tokens"]
-        else:  # ollama
-            if "usage" in response_data and "total_tokens" in response_data["usage"]:
-                return response_data["usage"]["total_tokens"]
-            elif "prompt_eval_count" in response_data and "eval_count" in response_data:
-                return response_data.get("prompt_eval_count", 0) + response_data.get("eval_count", 0)
+        return self._extract_tokens_fns.get(api_mode, self._extract_tokens_ollama)(response_data)
+    
+    @staticmethod
+    def _extract_tokens_online(response_data: Dict[str, Any]) -> int:
+        """在线API：读取usage.total_tokens"""
+        usage = response_data.get("usage")
+        if usage and "total_tokens" in usage:
+            return usage["total_tokens"]
+        return 0
+    
+    @staticmethod
+    def _extract_tokens_ollama(response_data: Dict[str, Any]) -> int:
+        """Ollama：优先读取usage.total_tokens，否则累加prompt_eval_count与eval_count"""
+        get = response_data.get
+        usage = get("usage")
+        if usage and "total_tokens" in usage:
+            return usage["total_tokens"]
+        if "prompt_eval_count" in response_data and "eval_count" in response_data:
+            return get("prompt_eval_count", 0) + get("eval_count", 0)
         return 0
     
     def extract_response_text(self, response_data: Dict[str, Any], api_mode: str = "online") -> str:
@@ -172,13 +277,21 @@ class APIService:
         Returns:
             响应文本
         """
-        if api_mode == "online":
-            if "choices" in response_data and len(response_data["choices"]) > 0:
-                return response_data["choices"][0]["message"]["content"].strip()
-        else:  # ollama
-            return response_data.get("response", "").strip()
+        return self._extract_text_fns.get(api_mode, self._extract_text_ollama)(response_data)
+    
+    @staticmethod
+    def _extract_text_online(response_data: Dict[str, Any]) -> str:
+        """在线API：读取choices[0].message.content"""
+        choices = response_data.get("choices")
+        if choices:
+            return choices[0]["message"]["content"].strip()
         return ""
     
+    @staticmethod
+    def _extract_text_ollama(response_data: Dict[str, Any]) -> str:
+        """Ollama：读取response字段"""
+        return response_data.get("response", "").strip()
+    
     def parse_json_response(self, text: str) -> Optional[Dict]:
         """
         解析JSON响应，处理各种格式问题
@@ -189,27 +302,41 @@ class APIService:
         Returns:
             解析后的JSON字典，失败返回None
         """
-        # 清理响应文本，提取JSON部分
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
+        # 清理响应文本，提取代码块中的JSON部分（只查找一次围栏位置并切片一次）
+        fence = text.find("```json")
+        if fence != -1:
+            start = fence + 7
+        else:
+            fence = text.find("```")
+            start = fence + 3
+        if fence != -1:
+            end = text.find("```", start)
+            text = (text[start:end] if end != -1 else text[start:]).strip()
         
         if not text:
             return None
         
+        # orjson.JSONDecodeError是json.JSONDecodeError的子类
         try:
-            return json.loads(text)
+            return _json_loads(text)
         except json.JSONDecodeError:
-            # 尝试修复常见的转义问题
+            pass
+        
+        start_idx = text.find('{')
+        if start_idx == -1:
+            return None
+        
+        # 从第一个{开始解析一个完整的JSON对象，忽略其后的多余文本（扫描在C实现的解码器中完成，会正确处理字符串和转义）
+        try:
+            return _JSON_DECODER.raw_decode(text, start_idx)[0]
+        except json.JSONDecodeError:
+            pass
+        
+        # 尝试截取最外层的{...}再解析
+        end_idx = text.rfind('}')
+        if end_idx > start_idx:
             try:
-                import re
-                start_idx = text.find('{')
-                end_idx = text.rfind('}')
-                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                    json_str = text[start_idx:end_idx+1]
-                    return json.loads(json_str)
-            except:
+                return _json_loads(text[start_idx:end_idx+1])
+            except json.JSONDecodeError:
                 pass
         return None
-
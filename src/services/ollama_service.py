@@ -5,14 +5,20 @@ Ollama服务：处理Ollama服务启动、模型管理、连接测试
 
 import os
 import sys
+import re
 import time
-import requests
-from typing import Optional, Callable, List, Dict, Tuple
+import shlex
+import select
+from typing import Optional, Callable, List, Dict, Tuple, Any
 
 # 添加父目录到路径以便导入
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.path_utils import get_full_model_name
+from utils.http_utils import get_http_session
+
+# SSH查询结果（模型列表、运行状态、安装路径）的缓存有效期（秒）
+CACHE_TTL = 30
 
 
 class OllamaService:
@@ -29,12 +35,34 @@ class OllamaService:
         self.ssh_service = ssh_service
         self.log_callback = log_callback
         self.ollama_path: Optional[str] = None
+        self._session = get_http_session()  # 共享HTTP会话，复用keep-alive连接
+        self._cache: Dict[tuple, Tuple[float, Any]] = {}  # {查询键: (过期时间, 结果)}
+        self.local_port: Optional[int] = None  # 最近一次确认可访问Ollama API的本地隧道端口
     
     def log(self, message: str, level: str = "INFO"):
         """记录日志"""
         if self.log_callback:
             self.log_callback(message, level)
     
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """读取未过期的缓存结果，不存在或已过期返回None"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del self._cache[key]
+            return None
+        return value
+    
+    def _cache_set(self, key: tuple, value: Any):
+        """缓存查询结果，CACHE_TTL秒后过期"""
+        self._cache[key] = (time.monotonic() + CACHE_TTL, value)
+    
+    def invalidate_cache(self):
+        """清空缓存（模型下载或停止后远程状态已变化）"""
+        self._cache.clear()
+    
     def find_ollama_path(
         self,
         username: str,
@@ -53,32 +81,68 @@ class OllamaService:
         if not self.ssh_service:
             return None
         
-        # 优先使用用户自定义路径
+        cache_key = ("find_ollama_path", username, custom_dir)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            self.ollama_path = cached
+            return cached
+        
+        # 候选路径：优先用户自定义路径，其次默认的/data与/home目录
+        candidates = []
         if custom_dir:
-            custom_path = f"{custom_dir.rstrip('/')}/ollama/bin/ollama"
-            success, output, _ = self.ssh_service.execute_command(
-                f"test -x {custom_path} && {custom_path} --version 2>&1 || echo 'NOT_FOUND'",
-                show_console=False
-            )
-            if success and "NOT_FOUND" not in output:
-                self.ollama_path = custom_path
-                return custom_path
-        
-        # 检测默认路径
-        data_path = f"/data/{username}/ollama/bin/ollama"
-        home_path = f"/home/{username}/ollama/bin/ollama"
-        
-        for path in [data_path, home_path]:
-            success, output, _ = self.ssh_service.execute_command(
-                f"test -x {path} && {path} --version 2>&1 || echo 'NOT_FOUND'",
-                show_console=False
-            )
-            if success and "NOT_FOUND" not in output:
-                self.ollama_path = path
-                return path
+            candidates.append(f"{custom_dir.rstrip('/')}/ollama/bin/ollama")
+        candidates.append(f"/data/{username}/ollama/bin/ollama")
+        candidates.append(f"/home/{username}/ollama/bin/ollama")
+        
+        # 在一条远程命令中依次检测所有候选路径，只需一次SSH往返
+        quoted = " ".join(shlex.quote(path) for path in candidates)
+        success, output, _ = self.ssh_service.execute_command(
+            f'for p in {quoted}; do if [ -x "$p" ] && "$p" --version >/dev/null 2>&1; then echo "$p"; exit 0; fi; done; echo NOT_FOUND',
+            show_console=False
+        )
+        if success:
+            # 输出中可能混有stderr内容，只认与候选路径完全一致的行
+            found = next((line.strip() for line in output.splitlines() if line.strip() in candidates), None)
+            if found:
+                self.ollama_path = found
+                self._cache_set(cache_key, found)
+                return found
         
         return None
     
+    def _wait_for_service(
+        self,
+        local_port: int,
+        deadline: float,
+        probe_timeout: float = 1
+    ) -> bool:
+        """
+        轮询Ollama服务直到就绪，间隔从0.1秒开始指数增长（最长2秒）
+        
+        Args:
+            local_port: 本地端口
+            deadline: 最长等待时间（秒）
+            probe_timeout: 单次探测的超时时间（秒）
+        
+        Returns:
+            服务是否在限定时间内就绪
+        """
+        test_url = f"http://localhost:{local_port}/api/tags"
+        end_time = time.monotonic() + deadline
+        delay = 0.1
+        while True:
+            try:
+                if self._session.get(test_url, timeout=probe_timeout).status_code == 200:
+                    self.local_port = local_port
+                    return True
+            except Exception:
+                pass
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 2.0)
+    
     def start_service(
         self,
         local_port: int,
@@ -101,8 +165,9 @@ class OllamaService:
         # 检查服务是否已运行
         try:
             test_url = f"http://localhost:{local_port}/api/tags"
-            response = requests.get(test_url, timeout=3)
+            response = self._session.get(test_url, timeout=3)
             if response.status_code == 200:
+                self.local_port = local_port
                 self.log("✓ Ollama服务已在运行", "SUCCESS")
                 return True
         except:
@@ -117,20 +182,11 @@ class OllamaService:
         self.log(f"启动Ollama服务: {serve_cmd}", "INFO")
         success, output, code = self.ssh_service.execute_command(serve_cmd)
         
-        # 等待服务启动
+        # 等待服务启动（指数退避轮询，最多等待20秒）
         self.log("等待服务启动...", "INFO")
-        for i in range(10):
-            time.sleep(2)
-            try:
-                test_url = f"http://localhost:{local_port}/api/tags"
-                response = requests.get(test_url, timeout=2)
-                if response.status_code == 200:
-                    self.log("✓ Ollama服务已启动", "SUCCESS")
-                    return True
-            except:
-                pass
-            if i < 9:
-                self.log(f"等待服务就绪... ({i+1}/10)", "INFO")
+        if self._wait_for_service(local_port, deadline=20.0):
+            self.log("✓ Ollama服务已启动", "SUCCESS")
+            return True
         
         self.log("⚠ Ollama服务启动可能失败", "WARN")
         return False
@@ -153,19 +209,11 @@ class OllamaService:
         base_url = f"http://localhost:{local_port}"
         
         # 测试服务连接
-        for i in range(5):
-            try:
-                test_url = f"{base_url}/api/tags"
-                response = requests.get(test_url, timeout=5)
-                if response.status_code == 200:
-                    self.log("✓ Ollama服务器连接成功", "SUCCESS")
-                    break
-            except:
-                if i < 4:
-                    time.sleep(1)
-                else:
-                    self.log("✗ Ollama服务器连接失败", "ERROR")
-                    return False
+        if self._wait_for_service(local_port, deadline=5.0, probe_timeout=5):
+            self.log("✓ Ollama服务器连接成功", "SUCCESS")
+        else:
+            self.log("✗ Ollama服务器连接失败", "ERROR")
+            return False
         
         # 测试模型
         try:
@@ -175,7 +223,7 @@ class OllamaService:
                 "prompt": "Hello",
                 "stream": False
             }
-            response = requests.post(generate_url, json=test_payload, timeout=30)
+            response = self._session.post(generate_url, json=test_payload, timeout=30)
             if response.status_code == 200:
                 self.log(f"✓ 模型 {model_name} 测试成功", "SUCCESS")
                 return True
@@ -186,27 +234,57 @@ class OllamaService:
             self.log(f"✗ 模型测试失败: {e}", "ERROR")
             return False
     
-    def list_models(self) -> List[str]:
+    def list_models(self, local_port: Optional[int] = None) -> List[str]:
         """
         获取模型列表
         
+        隧道可用时直接请求 /api/tags 获取JSON格式的列表，否则通过SSH执行 ollama list 并解析输出
+        
+        Args:
+            local_port: 本地隧道端口，默认使用最近一次连接成功的端口
+        
         Returns:
             模型名称列表
         """
+        if local_port is None:
+            local_port = self.local_port
+        if local_port:
+            models = self._list_models_http(local_port)
+            if models is not None:
+                return models
+        
         if not self.ollama_path:
             return []
         
+        cache_key = ("list_models", self.ollama_path)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         success, output, code = self.ssh_service.execute_command(f"{self.ollama_path} list")
         if not success:
             return []
         
-        models = []
-        lines = output.strip().split('\n')
-        if len(lines) > 1:
-            for line in lines[1:]:  # 跳过表头
-                parts = line.split()
-                if parts:
-                    models.append(parts[0])
+        # 跳过表头，每行只取第一列（模型名），split(None, 1)不必拆出整行的所有列
+        models = [line.split(None, 1)[0] for line in output.strip().splitlines()[1:] if line.strip()]
+        self._cache_set(cache_key, tuple(models))
+        return models
+    
+    def _list_models_http(self, local_port: int) -> Optional[List[str]]:
+        """通过Ollama HTTP API获取模型列表，请求失败返回None"""
+        cache_key = ("list_models", "http", local_port)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        try:
+            response = self._session.get(f"http://localhost:{local_port}/api/tags", timeout=5)
+            if response.status_code != 200:
+                return None
+            models = [m["name"] for m in response.json().get("models", []) if m.get("name")]
+        except Exception:
+            return None
+        self._cache_set(cache_key, tuple(models))
         return models
     
     def check_model_exists(self, model_name: str) -> bool:
@@ -219,11 +297,18 @@ class OllamaService:
         Returns:
             模型是否存在
         """
-        models = self.list_models()
-        for listed_model in models:
-            if listed_model == model_name or listed_model.startswith(model_name + ":"):
-                return True
-        return False
+        cache_key = ("check_model_exists", self.ollama_path, model_name)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        prefix = model_name + ":"
+        exists = any(
+            listed_model == model_name or listed_model.startswith(prefix)
+            for listed_model in self.list_models()
+        )
+        self._cache_set(cache_key, exists)
+        return exists
     
     def pull_model(
         self,
@@ -251,20 +336,49 @@ class OllamaService:
         if self.ssh_service and self.ssh_service.ssh_client:
             stdin, stdout, stderr = self.ssh_service.ssh_client.exec_command(cmd, timeout=None)
             
-            # 实时读取输出
-            while True:
-                line = stdout.readline()
+            # 进度回调最多每50ms调用一次，期间只保留最新的一行，结束时补发
+            last_emit = 0.0
+            pending_line = None
+            
+            def emit(raw_line):
+                nonlocal last_emit, pending_line
+                line = raw_line.decode('utf-8', errors='replace').strip()
                 if not line:
-                    break
-                line = line.strip()
-                if line:
-                    if progress_callback:
-                        progress_callback(line)
-                    else:
-                        self.log(line, "INFO")
+                    return
+                if not progress_callback:
+                    self.log(line, "INFO")
+                    return
+                now = time.monotonic()
+                if now - last_emit >= 0.05:
+                    progress_callback(line)
+                    last_emit = now
+                    pending_line = None
+                else:
+                    pending_line = line
             
-            exit_code = stdout.channel.recv_exit_status()
+            # 实时读取输出：按块读取并同时以\n和\r分行（Ollama的进度条只用\r刷新，readline会一直等待换行）
+            channel = stdout.channel
+            buffer = b""
+            while True:
+                if channel.recv_ready():
+                    data = channel.recv(65536)
+                    if not data:
+                        break
+                    *lines, buffer = re.split(rb"[\r\n]", buffer + data)
+                    for raw_line in lines:
+                        emit(raw_line)
+                elif channel.exit_status_ready() or channel.eof_received:
+                    if not channel.recv_ready():
+                        break
+                else:
+                    select.select([channel], [], [], 0.1)
+            emit(buffer)
+            if pending_line:
+                progress_callback(pending_line)
+            
+            exit_code = channel.recv_exit_status()
             if exit_code == 0:
+                self.invalidate_cache()
                 self.log(f"✓ 模型 {model_name} 下载完成", "SUCCESS")
                 return True
             else:
@@ -294,6 +408,7 @@ class OllamaService:
             # 停止进程
             pid = output.strip()
             self.ssh_service.execute_command(f"kill {pid}", show_console=False)
+            self.invalidate_cache()
             time.sleep(1)
             self.log(f"✓ 已停止运行中的模型", "SUCCESS")
             return True
@@ -313,7 +428,16 @@ class OllamaService:
         if not self.ollama_path:
             return False
         
+        cache_key = ("check_model_running", self.ollama_path, model_name)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         cmd = f"pgrep -f '{self.ollama_path} run {model_name}'"
         success, output, _ = self.ssh_service.execute_command(cmd, show_console=False)
-        return success and bool(output.strip())
+        if not success:
+            return False
+        running = bool(output.strip())
+        self._cache_set(cache_key, running)
+        return running
 
@@ -3,12 +3,21 @@
 SSH服务：处理SSH连接、隧道建立、命令执行
 """
 
+import os
+import sys
 import socket
+import selectors
 import threading
 import time
-import requests
+import collections
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, Callable
 
+# 添加父目录到路径以便导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.http_utils import get_http_session
+
 try:
     import paramiko
     USE_PARAMIKO = True
@@ -16,6 +25,26 @@ except ImportError:
     USE_PARAMIKO = False
     paramiko = None
 
+# 隧道转发每次读取的最大字节数
+TUNNEL_BUFSIZE = 256 * 1024
+
+
+class _TunnelPair:
+    """隧道中的一对转发连接（本地套接字 <-> 远程SSH通道）及两个方向尚未发出的数据"""
+    
+    __slots__ = ('local', 'channel', 'to_local', 'to_remote',
+                 'local_eof', 'remote_eof', 'local_shut', 'remote_shut')
+    
+    def __init__(self, local, channel):
+        self.local = local
+        self.channel = channel
+        self.to_local = bytearray()   # 远程 -> 本地，本地接收方读取较慢时积压
+        self.to_remote = bytearray()  # 本地 -> 远程，SSH窗口已满时积压
+        self.local_eof = False        # 本地已关闭写方向（不再有数据发往远程）
+        self.remote_eof = False       # 远程已关闭写方向
+        self.local_shut = False       # 已向本地转发EOF
+        self.remote_shut = False      # 已向远程转发EOF
+
 
 class SSHService:
     """SSH服务类"""
@@ -30,6 +59,7 @@ class SSHService:
         self.log_callback = log_callback
         self.ssh_client: Optional[paramiko.SSHClient] = None
         self.ssh_tunnel_thread: Optional[threading.Thread] = None
+        self._tunnel_stop = threading.Event()  # 设置后隧道线程在1秒内退出
     
     def log(self, message: str, level: str = "INFO"):
         """记录日志"""
@@ -95,10 +125,10 @@ class SSHService:
     
     def close_tunnel(self):
         """关闭SSH隧道"""
-        # 隧道线程会在连接关闭时自动结束
+        # 通知隧道线程退出（事件循环每秒检查一次），并关闭监听端口和所有转发连接
         if self.ssh_tunnel_thread and self.ssh_tunnel_thread.is_alive():
-            # 可以设置一个标志来停止隧道线程
-            pass
+            self._tunnel_stop.set()
+            self.ssh_tunnel_thread.join(timeout=2)
     
     def execute_command(self, command: str, show_console: bool = True) -> Tuple[bool, str, int]:
         """
@@ -156,61 +186,202 @@ class SSHService:
                 return False
             
             def forward_tunnel():
-                """转发隧道线程"""
+                """
+                转发隧道线程：单线程selector事件循环，同时处理监听和所有连接的双向转发
+                
+                本地套接字和远程通道均为非阻塞模式，未能立即发出的数据按方向暂存在_TunnelPair中，
+                积压过多时暂停读取来源一端；打开远程通道需要一次网络往返，交给线程池完成，
+                不会阻塞其他连接的转发。
+                """
+                selector = selectors.DefaultSelector()
+                server_socket = None
+                # 线程池打开远程通道后通过wake_w唤醒事件循环，再从opened中取出新连接
+                wake_r, wake_w = socket.socketpair()
+                opened = collections.deque()
+                opener = ThreadPoolExecutor(max_workers=4)
+                pairs = set()
+                
+                def open_remote(local_socket):
+                    """在线程池中打开远程通道"""
+                    try:
+                        channel = transport.open_channel(
+                            'direct-tcpip',
+                            (remote_host, remote_port),
+                            local_socket.getpeername()
+                        )
+                    except Exception:
+                        local_socket.close()
+                        return
+                    opened.append((local_socket, channel))
+                    try:
+                        wake_w.send(b'\0')
+                    except OSError:
+                        pass
+                
+                def set_events(fileobj, events, pair):
+                    """注册、修改或注销fileobj关注的事件（events为0时注销）"""
+                    try:
+                        key = selector.get_key(fileobj)
+                    except KeyError:
+                        if events:
+                            selector.register(fileobj, events, pair)
+                        return
+                    if not events:
+                        selector.unregister(fileobj)
+                    elif key.events != events:
+                        selector.modify(fileobj, events, pair)
+                
+                def update_events(pair):
+                    """按两个方向的积压情况更新关注的事件：积压达到TUNNEL_BUFSIZE时暂停读取来源一端"""
+                    local_events = 0
+                    if not pair.local_eof and len(pair.to_remote) < TUNNEL_BUFSIZE:
+                        local_events |= selectors.EVENT_READ
+                    if pair.to_local:
+                        local_events |= selectors.EVENT_WRITE
+                    set_events(pair.local, local_events, pair)
+                    remote_events = 0
+                    if not pair.remote_eof and len(pair.to_local) < TUNNEL_BUFSIZE:
+                        remote_events = selectors.EVENT_READ
+                    set_events(pair.channel, remote_events, pair)
+                
+                def close_pair(pair):
+                    """关闭一对转发连接（本地套接字与远程通道）"""
+                    pairs.discard(pair)
+                    for obj in (pair.local, pair.channel):
+                        try:
+                            selector.unregister(obj)
+                        except (KeyError, ValueError):
+                            pass
+                        try:
+                            obj.close()
+                        except:
+                            pass
+                
+                def flush_local(pair):
+                    """尽量把积压的数据写入本地套接字，远程已结束且数据写完后关闭本地写方向"""
+                    if pair.to_local:
+                        try:
+                            sent = pair.local.send(pair.to_local)
+                        except BlockingIOError:
+                            return
+                        del pair.to_local[:sent]
+                    if pair.remote_eof and not pair.to_local and not pair.local_shut:
+                        pair.local.shutdown(socket.SHUT_WR)
+                        pair.local_shut = True
+                
+                def flush_remote(pair):
+                    """尽量把积压的数据写入远程通道（SSH窗口已满时留到下一轮），本地已结束且数据写完后发送EOF"""
+                    if pair.to_remote and pair.channel.send_ready():
+                        try:
+                            sent = pair.channel.send(pair.to_remote)
+                        except socket.timeout:
+                            return
+                        del pair.to_remote[:sent]
+                    if pair.local_eof and not pair.to_remote and not pair.remote_shut:
+                        pair.channel.shutdown_write()
+                        pair.remote_shut = True
+                
+                def handle_event(pair, fileobj, mask):
+                    if fileobj is pair.local:
+                        if mask & selectors.EVENT_WRITE:
+                            flush_local(pair)
+                        if mask & selectors.EVENT_READ:
+                            try:
+                                data = pair.local.recv(TUNNEL_BUFSIZE)
+                            except BlockingIOError:
+                                data = None
+                            if data:
+                                pair.to_remote += data
+                            elif data is not None:
+                                # 本地半关闭：只结束本地->远程方向，远程->本地方向继续转发
+                                pair.local_eof = True
+                            flush_remote(pair)
+                    else:
+                        try:
+                            data = pair.channel.recv(TUNNEL_BUFSIZE)
+                        except socket.timeout:
+                            data = None
+                        if data:
+                            pair.to_local += data
+                        elif data is not None:
+                            pair.remote_eof = True
+                        flush_local(pair)
+                
                 try:
                     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                     server_socket.bind(('localhost', local_port))
                     server_socket.listen(5)
+                    # 监听套接字和唤醒套接字的data为None，转发连接的data为所属的_TunnelPair
+                    selector.register(server_socket, selectors.EVENT_READ, None)
+                    wake_r.setblocking(False)
+                    selector.register(wake_r, selectors.EVENT_READ, None)
                     
-                    while True:
-                        try:
-                            local_sock, addr = server_socket.accept()
-                            
-                            def handle_connection(local_socket):
+                    while not self._tunnel_stop.is_set():
+                        # 有数据因SSH窗口已满积压时，缩短等待时间以便尽快重试发送
+                        blocked = [pair for pair in pairs if pair.to_remote]
+                        for pair in blocked:
+                            try:
+                                flush_remote(pair)
+                            except Exception:
+                                close_pair(pair)
+                                continue
+                            update_events(pair)
+                        timeout = 0.05 if any(pair.to_remote for pair in pairs) else 1
+                        
+                        for key, mask in selector.select(timeout=timeout):
+                            if key.fileobj is server_socket:
+                                local_socket, addr = server_socket.accept()
+                                opener.submit(open_remote, local_socket)
+                                continue
+                            if key.fileobj is wake_r:
                                 try:
-                                    remote_channel = transport.open_channel(
-                                        'direct-tcpip',
-                                        (remote_host, remote_port),
-                                        local_socket.getpeername()
-                                    )
-                                    
-                                    def forward_data(source, dest):
-                                        try:
-                                            while True:
-                                                data = source.recv(4096)
-                                                if not data:
-                                                    break
-                                                dest.send(data)
-                                        except:
-                                            pass
-                                    
-                                    t1 = threading.Thread(target=forward_data, args=(local_socket, remote_channel), daemon=True)
-                                    t2 = threading.Thread(target=forward_data, args=(remote_channel, local_socket), daemon=True)
-                                    t1.start()
-                                    t2.start()
-                                    t1.join()
-                                    t2.join()
-                                except Exception:
+                                    wake_r.recv(1024)
+                                except BlockingIOError:
                                     pass
-                                finally:
-                                    try:
-                                        local_socket.close()
-                                        remote_channel.close()
-                                    except:
-                                        pass
+                                while opened:
+                                    local_socket, channel = opened.popleft()
+                                    local_socket.setblocking(False)
+                                    channel.setblocking(0)
+                                    pair = _TunnelPair(local_socket, channel)
+                                    pairs.add(pair)
+                                    update_events(pair)
+                                continue
                             
-                            threading.Thread(target=handle_connection, args=(local_sock,), daemon=True).start()
-                        except Exception:
-                            break
+                            pair = key.data
+                            if pair not in pairs:
+                                continue  # 已在本轮事件中关闭
+                            # 出错或两个方向都已结束时关闭这对连接
+                            try:
+                                handle_event(pair, key.fileobj, mask)
+                            except Exception:
+                                close_pair(pair)
+                                continue
+                            if pair.local_shut and pair.remote_shut:
+                                close_pair(pair)
+                            else:
+                                update_events(pair)
                 except Exception as e:
                     self.log(f"SSH隧道线程错误: {e}", "ERROR")
                 finally:
-                    try:
-                        server_socket.close()
-                    except:
-                        pass
+                    opener.shutdown(wait=False)
+                    for pair in list(pairs):
+                        close_pair(pair)
+                    while opened:
+                        for obj in opened.popleft():
+                            try:
+                                obj.close()
+                            except:
+                                pass
+                    for obj in (server_socket, wake_r, wake_w):
+                        if obj is not None:
+                            try:
+                                obj.close()
+                            except:
+                                pass
+                    selector.close()
             
+            self._tunnel_stop.clear()
             self.ssh_tunnel_thread = threading.Thread(target=forward_tunnel, daemon=True)
             self.ssh_tunnel_thread.start()
             
@@ -220,7 +391,7 @@ class SSHService:
             # 验证隧道
             try:
                 test_url = f"http://localhost:{local_port}/api/tags"
-                response = requests.get(test_url, timeout=3)
+                response = get_http_session().get(test_url, timeout=3)
                 if response.status_code == 200:
                     self.log("✓ SSH隧道已建立", "SUCCESS")
                     return True
@@ -4,10 +4,12 @@
 """
 
 import os
-import time
+import queue
+import hashlib
 import tempfile
 import subprocess
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable, Dict, Any
 
 import sys
@@ -16,8 +18,71 @@ import os
 # 添加父目录到路径以便导入
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import GITHUB_API_URL, CURRENT_VERSION
+from config import GITHUB_API_URL, CURRENT_VERSION, UPDATE_CACHE_FILE
 from utils.version_utils import compare_versions
+from utils.file_utils import load_json, save_json
+from utils.http_utils import get_http_session
+
+# GitHub请求共用的请求头（检查更新与下载更新文件复用同一会话和连接池）
+GITHUB_HEADERS = {
+    "Accept": "application/vnd.github.v3+json",
+    "User-Agent": "PaperResearchTool"
+}
+# 下载更新文件的超时时间：(连接超时, 读取超时)
+DOWNLOAD_TIMEOUT = (10, 30)
+
+
+class _HashingWriter:
+    """写入文件的同时计算SHA-256摘要"""
+    
+    def __init__(self, f):
+        self._f = f
+        self._hash = hashlib.sha256()
+    
+    def write(self, data):
+        self._hash.update(data)
+        return self._f.write(data)
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def _copy_stream_threaded(src, dst, chunk_size: int = 1024 * 1024, max_pending: int = 8):
+    """
+    在当前线程读取src、在后台线程写入dst，两者通过有界队列衔接
+    
+    Args:
+        src: 可读对象（如响应的原始流）
+        dst: 可写对象
+        chunk_size: 每次读取的字节数
+        max_pending: 队列中最多积压的数据块数（限制内存占用）
+    """
+    chunks = queue.Queue(maxsize=max_pending)
+    
+    def write_chunks():
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                dst.write(chunk)
+        except BaseException:
+            # 写入失败时继续取走剩余数据块，避免读取端阻塞在put上
+            while chunks.get() is not None:
+                pass
+            raise
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        write_future = executor.submit(write_chunks)
+        try:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                chunks.put(chunk)
+        finally:
+            chunks.put(None)
+        write_future.result()
 
 
 class UpdateService:
@@ -32,6 +97,7 @@ class UpdateService:
         """
         self.log_callback = log_callback
         self.pending_update_file: Optional[str] = None
+        self._session = get_http_session()  # 共享HTTP会话，复用keep-alive连接
     
     def log(self, message: str, level: str = "INFO"):
         """记录日志"""
@@ -46,14 +112,22 @@ class UpdateService:
             如果有更新，返回release数据字典；否则返回None
         """
         try:
-            headers = {
-                "Accept": "application/vnd.github.v3+json",
-                "User-Agent": "PaperResearchTool"
-            }
-            response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
-            response.raise_for_status()
+            # 带上次的ETag发起条件请求，Release未变化时GitHub返回304且无响应体（也不计入API限额）
+            headers = GITHUB_HEADERS
+            update_cache = load_json(UPDATE_CACHE_FILE)
+            cached_release = update_cache.get("release")
+            if cached_release and update_cache.get("etag"):
+                headers = {**GITHUB_HEADERS, "If-None-Match": update_cache["etag"]}
             
-            release_data = response.json()
+            response = self._session.get(GITHUB_API_URL, headers=headers, timeout=10)
+            if response.status_code == 304 and cached_release:
+                release_data = cached_release
+            else:
+                response.raise_for_status()
+                release_data = response.json()
+                etag = response.headers.get("ETag")
+                if etag:
+                    save_json({"etag": etag, "release": release_data}, UPDATE_CACHE_FILE)
             latest_version = release_data.get("tag_name", "").lstrip("v")
             
             has_update = compare_versions(CURRENT_VERSION, latest_version)
@@ -84,12 +158,17 @@ class UpdateService:
             assets = release_data.get("assets", [])
             download_url = None
             filename = None
+            expected_sha256 = None
             
             for asset in assets:
                 name = asset.get("name", "")
                 if name.endswith(".exe") or name.endswith(".zip"):
                     download_url = asset.get("browser_download_url", "")
                     filename = name
+                    # GitHub提供的摘要格式为"sha256:<十六进制>"
+                    digest = asset.get("digest") or ""
+                    if digest.startswith("sha256:"):
+                        expected_sha256 = digest[len("sha256:"):].lower()
                     break
             
             if not download_url:
@@ -97,20 +176,41 @@ class UpdateService:
                 return None
             
             if save_path is None:
-                temp_dir = tempfile.gettempdir()
-                save_path = os.path.join(temp_dir, f"PaperResearchTool_update_{int(time.time())}.exe")
-            
-            response = requests.get(download_url, stream=True, timeout=30)
-            response.raise_for_status()
+                # 由系统原子地生成唯一文件名，避免同一秒内多次下载时文件名冲突
+                with tempfile.NamedTemporaryFile(prefix="PaperResearchTool_update_", suffix=".exe", delete=False) as tf:
+                    save_path = tf.name
             
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
+            with self._session.get(
+                download_url,
+                headers={"User-Agent": GITHUB_HEADERS["User-Agent"]},
+                stream=True,
+                timeout=DOWNLOAD_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                
+                total_size = int(response.headers.get('content-length', 0))
+                response.raw.decode_content = True  # 按Content-Encoding自动解压
+                
+                with open(save_path, 'wb') as f:
+                    # Linux上预先分配磁盘空间，减少写入过程中的文件扩展
+                    if total_size > 0 and hasattr(os, 'posix_fallocate'):
+                        try:
+                            os.posix_fallocate(f.fileno(), 0, total_size)
+                        except OSError:
+                            pass
+                    # 以1 MiB为单位读取，网络读取与磁盘写入在两个线程中重叠进行；
+                    # 写入的同时计算SHA-256，无需下载后再读一遍文件
+                    writer = _HashingWriter(f)
+                    _copy_stream_threaded(response.raw, writer)
+                    f.truncate()  # 实际写入量小于预分配大小时去掉多余部分
             
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+            if expected_sha256 and writer.hexdigest() != expected_sha256:
+                self.log(f"更新文件校验失败（SHA-256不匹配）：{filename}", "ERROR")
+                try:
+                    os.remove(save_path)
+                except OSError:
+                    pass
+                return None
             
             self.pending_update_file = save_path
             return save_path
@@ -133,10 +233,14 @@ class UpdateService:
             return None
         
         try:
-            temp_dir = tempfile.gettempdir()
-            batch_file = os.path.join(temp_dir, f"PaperResearchTool_update_{int(time.time())}.bat")
-            
-            with open(batch_file, 'w', encoding='utf-8') as f:
+            with tempfile.NamedTemporaryFile(
+                'w',
+                encoding='utf-8',
+                prefix="PaperResearchTool_update_",
+                suffix=".bat",
+                delete=False
+            ) as f:
+                batch_file = f.name
                 f.write('@echo off\n')
                 f.write('chcp 65001 >nul\n')
                 f.write('timeout /t 2 /nobreak >nul\n')
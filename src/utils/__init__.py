@@ -3,14 +3,16 @@
 """
 
 from .path_utils import get_app_dir, get_user_data_dir
-from .file_utils import load_json, save_json
-from .version_utils import compare_versions
+from .file_utils import load_json, load_json_many, save_json
+from .version_utils import Version, compare_versions
 
 __all__ = [
     'get_app_dir',
     'get_user_data_dir',
     'load_json',
+    'load_json_many',
     'save_json',
+    'Version',
     'compare_versions',
 ]
 
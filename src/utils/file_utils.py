@@ -3,9 +3,36 @@
 文件操作工具函数
 """
 
+import copy
 import json
+import logging
 import os
-from typing import Any, Dict, Optional
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 以此后缀结尾的文件（如 "papers.json.zst"）按zstd压缩格式读写，大文件可显著减少磁盘I/O
+ZSTD_SUFFIX = '.zst'
+ZSTD_LEVEL = 3
+_ZSTD_ERRORS = (zstandard.ZstdError,) if HAS_ZSTD else ()
+# 本进程中已确认存在的目录，避免每次保存都调用os.makedirs
+_MKDIR_DONE = set()
 
 
 def load_json(file_path: str, default: Optional[Dict] = None) -> Dict:
@@ -17,41 +44,116 @@ def load_json(file_path: str, default: Optional[Dict] = None) -> Dict:
         default: 如果文件不存在，返回的默认值
     
     Returns:
-        解析后的字典，如果文件不存在且未提供default则返回空字典
+        解析后的字典，如果文件不存在且未提供default则返回新的空字典（调用方可以直接修改）
     """
-    if default is None:
-        default = {}
-    
-    if not os.path.exists(file_path):
-        return default
+    compressed = file_path.endswith(ZSTD_SUFFIX)
+    if compressed and not HAS_ZSTD:
+        logger.warning("加载JSON文件失败 %s: 未安装zstandard，无法读取压缩文件", file_path)
+        return {} if default is None else default
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"加载JSON文件失败 {file_path}: {e}")
-        return default
+        # 文件不存在时os.stat直接抛出FileNotFoundError，无需先用os.path.exists检查
+        st = os.stat(file_path)
+        
+        # 复用os.stat得到的文件大小，一次read调用读入整个文件再解析；
+        # 多读1字节用于判断stat之后文件是否变大，此时再读完剩余内容
+        with open(file_path, 'rb', buffering=0) as f:
+            content = f.read(st.st_size + 1)
+            if len(content) > st.st_size:
+                content += f.readall()
+        if compressed:
+            content = zstandard.ZstdDecompressor().decompress(content)
+        return orjson.loads(content) if HAS_ORJSON else json.loads(content)
+    except FileNotFoundError:
+        # 只在确实需要时才创建空字典，读取成功的路径不产生多余分配
+        return {} if default is None else default
+    except (json.JSONDecodeError, OSError) + _ZSTD_ERRORS as e:
+        logger.warning("加载JSON文件失败 %s: %s", file_path, e)
+        return {} if default is None else default
+
+
+def load_json_many(file_paths: List[str], default: Optional[Dict] = None, max_workers: int = 8) -> List[Dict]:
+    """
+    并发加载多个JSON文件
+    
+    读取文件时会释放GIL，多个文件的打开/读取延迟可以相互重叠，
+    在网络盘、WSL等单次文件访问较慢的环境下效果明显。
+    
+    Args:
+        file_paths: JSON文件路径列表
+        default: 文件不存在时返回的默认值（每个文件各自得到一份副本）
+        max_workers: 最大线程数
+    
+    Returns:
+        与file_paths顺序一致的解析结果列表
+    """
+    if not file_paths:
+        return []
+    if len(file_paths) == 1:
+        return [load_json(file_paths[0], copy.deepcopy(default))]
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths))) as executor:
+        return list(executor.map(lambda path: load_json(path, copy.deepcopy(default)), file_paths))
 
 
-def save_json(data: Dict, file_path: str) -> bool:
+def save_json(data: Dict, file_path: str, pretty: bool = False) -> bool:
     """
     保存数据到JSON文件
     
     Args:
         data: 要保存的数据字典
         file_path: JSON文件路径
+        pretty: 是否缩进排版，仅需人工查看/编辑的文件（如配置文件）才需要；
+            默认紧凑输出，json模块可走C编码器快速路径，文件也更小
     
     Returns:
         是否保存成功
     """
+    compressed = file_path.endswith(ZSTD_SUFFIX)
+    if compressed and not HAS_ZSTD:
+        logger.warning("保存JSON文件失败 %s: 未安装zstandard，无法写入压缩文件", file_path)
+        return False
+    
     try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(file_path) if os.path.dirname(file_path) else '.', exist_ok=True)
+        # 确保目录存在（每个目录只检查一次）
+        dir_path = os.path.dirname(file_path) or '.'
+        if dir_path not in _MKDIR_DONE:
+            os.makedirs(dir_path, exist_ok=True)
+            _MKDIR_DONE.add(dir_path)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 先在内存中序列化为完整的字节串，再一次写入（json.dump会产生大量小的write调用）
+        if HAS_ORJSON:
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            content = orjson.dumps(data, option=option)
+        elif pretty:
+            content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        else:
+            content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if compressed:
+            content = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+        # 先写入同目录下的临时文件再原子替换，写入中途崩溃也不会损坏原文件
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('wb', dir=dir_path, prefix='.tmp_', suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                f.write(content)
+            # 临时文件创建时权限为0600，覆盖已有文件时替换前改为原文件的权限；新文件保持0600
+            try:
+                os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if isinstance(e, FileNotFoundError):
+                # 目录在确认存在之后被删除，下次保存时重新创建
+                _MKDIR_DONE.discard(dir_path)
+            raise
         return True
     except IOError as e:
-        print(f"保存JSON文件失败 {file_path}: {e}")
+        logger.warning("保存JSON文件失败 %s: %s", file_path, e)
         return False
 
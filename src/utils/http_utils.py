@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+HTTP工具函数
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    获取各服务共用的HTTP会话（首次调用时创建）
+
+    同一主机的请求复用keep-alive连接，避免每次调用都重新进行DNS解析和TCP/TLS握手。
+    只对429/5xx状态码自动重试，连接失败不重试（轮询服务是否启动时需要立即返回）。
+
+    Returns:
+        共享的requests.Session实例
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=3,
+                    connect=0,
+                    read=0,
+                    backoff_factor=0.3,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
@@ -5,21 +5,31 @@
 
 import os
 import sys
+import shutil
+import functools
+
+# 运行环境在进程内不会变化，导入时判断一次即可
+_IS_FROZEN = hasattr(sys, '_MEIPASS')
+_IS_WIN = sys.platform == 'win32'
+if _IS_FROZEN:
+    # PyInstaller打包后的exe，使用exe所在目录
+    _APP_DIR = os.path.dirname(sys.executable)
+else:
+    # 开发环境，使用脚本所在目录
+    _APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# 应用目录下自带的Ollama可执行文件
+_OLLAMA_LOCAL = os.path.join(_APP_DIR, "ollama")
 
 
 def get_app_dir():
     """获取应用程序目录（支持打包后的exe）"""
-    if hasattr(sys, '_MEIPASS'):
-        # PyInstaller打包后的exe，使用exe所在目录
-        return os.path.dirname(sys.executable)
-    else:
-        # 开发环境，使用脚本所在目录
-        return os.path.dirname(os.path.abspath(__file__))
+    return _APP_DIR
 
 
+@functools.lru_cache(maxsize=None)
 def get_user_data_dir():
-    """获取用户数据目录（隐藏目录，用户不容易找到）"""
-    if sys.platform == 'win32':
+    """获取用户数据目录（隐藏目录，用户不容易找到；只在首次调用时创建目录）"""
+    if _IS_WIN:
         # Windows: 使用 AppData\Local
         appdata = os.getenv('LOCALAPPDATA')
         if appdata:
@@ -36,19 +46,14 @@ def get_user_data_dir():
     return user_dir
 
 
+@functools.lru_cache(maxsize=None)
 def get_ollama_cmd():
-    """获取Ollama命令路径"""
-    app_dir = get_app_dir()
+    """获取Ollama命令路径（结果在进程内缓存）"""
     # 检查当前目录
-    ollama_path = os.path.join(app_dir, "ollama")
-    if os.path.exists(ollama_path):
-        return ollama_path
-    # 检查系统PATH
-    import shutil
-    ollama_cmd = shutil.which("ollama")
-    if ollama_cmd:
-        return ollama_cmd
-    return None
+    if os.path.exists(_OLLAMA_LOCAL):
+        return _OLLAMA_LOCAL
+    # 检查系统PATH（未找到时为None）
+    return shutil.which("ollama")
 
 
 def get_full_model_name(base_name, size=""):
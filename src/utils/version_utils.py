@@ -3,6 +3,96 @@
 版本比较工具函数
 """
 
+import re
+import functools
+from itertools import zip_longest
+from typing import Optional, Tuple
+
+
+# 合法的数字版本号：由点分隔的非负整数（如 "1.0.2"）
+_VERSION_RE = re.compile(r'\d+(?:\.\d+)*')
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_version(version: str) -> Tuple[int, ...]:
+    """将版本号解析为整数元组（如 "1.0.2" -> (1, 0, 2)），结果缓存"""
+    return tuple(int(x) for x in version.split('.'))
+
+
+@functools.lru_cache(maxsize=1024)
+def _encode_version(version: str) -> Optional[int]:
+    """
+    将版本号打包为一个64位整数（最多4段，每段16位），比较版本只需一次整数比较
+    
+    Returns:
+        打包后的整数；段数超过4或某段超出0~65535时返回None
+    """
+    parts = _parse_version(version)
+    if len(parts) > 4:
+        return None
+    encoded = 0
+    for part in parts + (0,) * (4 - len(parts)):
+        if not 0 <= part <= 0xFFFF:
+            return None
+        encoded = (encoded << 16) | part
+    return encoded
+
+
+class Version:
+    """
+    轻量的不可变版本号对象，可排序、可哈希，适合放入集合或作为字典键
+    
+    使用__slots__避免每个实例携带__dict__，哈希值在创建时计算一次。
+    只接受由点分隔的非负整数组成的版本号，否则抛出ValueError。
+    """
+    
+    __slots__ = ('parts', '_s', '_h')
+    
+    def __init__(self, version: str):
+        if not _VERSION_RE.fullmatch(version):
+            raise ValueError(f"无效的版本号: {version!r}")
+        # 去掉末尾的0段，使 "1.0" 与 "1.0.0" 相等且哈希值相同
+        parts = _parse_version(version)
+        while len(parts) > 1 and parts[-1] == 0:
+            parts = parts[:-1]
+        self.parts = parts
+        self._s = version
+        self._h = hash(parts)
+    
+    def __str__(self) -> str:
+        return self._s
+    
+    def __repr__(self) -> str:
+        return f"Version({self._s!r})"
+    
+    def __hash__(self) -> int:
+        return self._h
+    
+    def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.parts == other.parts
+    
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.parts < other.parts
+    
+    def __le__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.parts <= other.parts
+    
+    def __gt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.parts > other.parts
+    
+    def __ge__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.parts >= other.parts
+
 
 def compare_versions(current: str, latest: str) -> bool:
     """
@@ -15,23 +105,38 @@ def compare_versions(current: str, latest: str) -> bool:
     Returns:
         True表示latest版本更新，False表示current版本更新或相同
     """
+    # 最常见的情况是已是最新版本（两个字符串相同），直接返回，无需解析
+    if current == latest:
+        return False
+    
+    if not (isinstance(current, str) and isinstance(latest, str)):
+        return latest > current
+    
+    # 最常见的三段式版本号（如 "1.2.3"）走快速路径，直接比较整数三元组
+    cs = current.split('.')
+    ls = latest.split('.')
+    if (len(cs) == 3 == len(ls) and '' not in cs and '' not in ls
+            and current.replace('.', '').isdecimal() and latest.replace('.', '').isdecimal()):
+        return (int(ls[0]), int(ls[1]), int(ls[2])) > (int(cs[0]), int(cs[1]), int(cs[2]))
+    
+    # 常规格式（点分隔的数字）的版本号打包为整数后一次比较
+    if _VERSION_RE.fullmatch(current) and _VERSION_RE.fullmatch(latest):
+        current_code = _encode_version(current)
+        latest_code = _encode_version(latest)
+        if current_code is not None and latest_code is not None:
+            return latest_code > current_code
+    
+    # 其余情况按int()的语法解析各段（允许前后空白、正负号、数字间的下划线，如 "1.0.10 "），
+    # 仍无法解析时使用字符串比较
     try:
-        current_parts = [int(x) for x in current.split('.')]
-        latest_parts = [int(x) for x in latest.split('.')]
-        
-        # 补齐长度
-        max_len = max(len(current_parts), len(latest_parts))
-        current_parts.extend([0] * (max_len - len(current_parts)))
-        latest_parts.extend([0] * (max_len - len(latest_parts)))
-        
-        # 逐位比较
-        for i in range(max_len):
-            if latest_parts[i] > current_parts[i]:
-                return True
-            elif latest_parts[i] < current_parts[i]:
-                return False
-        return False  # 版本相同
-    except (ValueError, AttributeError):
-        # 如果版本号格式不正确，使用字符串比较
+        current_parts = _parse_version(current)
+        latest_parts = _parse_version(latest)
+    except ValueError:
         return latest > current
+    
+    # 逐位比较，较短的一方按0补齐，遇到第一个不同的位即得出结果
+    for current_part, latest_part in zip_longest(current_parts, latest_parts, fillvalue=0):
+        if latest_part != current_part:
+            return latest_part > current_part
+    return False  # 版本相同
 